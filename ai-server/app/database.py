@@ -1,14 +1,13 @@
-from fastapi import FastAPI
 import psycopg2
+from psycopg2 import errors, pool
 from psycopg2.extras import Json
 import os
+import threading
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Complaint Analyzer AI")
-
 # DB 연결 정보 (환경 변수 또는 .env 활용 권장)
 DB_CONFIG = {
     "dbname": os.getenv("POSTGRES_DB", "postgres"),
@@ -18,18 +17,126 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 5432))
 }
 
+# 커넥션 풀 (서버 lifespan에서 init_pool()로 생성, 없으면 요청마다 직접 연결)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # 빈 커넥션을 기다리는 최대 시간(초)
+
+_pool: Optional[pool.ThreadedConnectionPool] = None
+# ThreadedConnectionPool은 maxconn을 넘으면 기다리지 않고 PoolError를 내므로,
+# 세마포어로 대여 수를 maxconn 이하로 묶어 빈 커넥션이 생길 때까지 기다리게 함
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+# 풀이 계속 고갈되어 직접 연 커넥션 (반납 시 풀에 넣지 않고 닫음)
+_overflow_conns = set()
+_overflow_lock = threading.Lock()
+
+
+def init_pool(minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX):
+    """커넥션 풀을 생성 (이미 있으면 그대로 사용)"""
+    global _pool, _pool_slots
+    if _pool is None:
+        _pool = pool.ThreadedConnectionPool(minconn, maxconn, **DB_CONFIG, client_encoding='UTF8')
+        _pool_slots = threading.BoundedSemaphore(maxconn)
+        print(f"[*] DB 커넥션 풀 생성 완료 (min={minconn}, max={maxconn})")
+    return _pool
+
+
+def close_pool():
+    """커넥션 풀의 모든 연결을 닫음"""
+    global _pool, _pool_slots
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+        _pool_slots = None
+
+
+def _borrow_from_pool(db_pool, slots):
+    """빈 커넥션이 생길 때까지 기다렸다가 풀에서 대여 (DB_POOL_TIMEOUT 초과 시 직접 연결)"""
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        print(f"⚠️ DB 커넥션 풀 고갈: {DB_POOL_TIMEOUT:g}초 동안 빈 커넥션이 없어 직접 연결합니다 (DB_POOL_MAX 조정 필요)")
+        conn = psycopg2.connect(**DB_CONFIG, client_encoding='UTF8')
+        with _overflow_lock:
+            _overflow_conns.add(conn)
+        return conn
+    try:
+        return db_pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+
+
 def get_db_connection():
-    """DB에 연결하고 커넥션 객체를 반환하는 함수"""
+    """DB에 연결하고 커넥션 객체를 반환하는 함수 (풀이 있으면 풀에서 대여)"""
+    db_pool, slots = _pool, _pool_slots
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        if db_pool is not None:
+            return _borrow_from_pool(db_pool, slots)
+        conn = psycopg2.connect(**DB_CONFIG, client_encoding='UTF8')
         return conn
     except Exception as e:
         print(f" DB 연결 실패: {e}")
         return None
 
+
+def release_db_connection(conn):
+    """get_db_connection()으로 얻은 커넥션을 반납 (풀이 없거나 풀 밖에서 연 커넥션이면 닫음)"""
+    if conn is None:
+        return
+    with _overflow_lock:
+        overflow = conn in _overflow_conns
+        _overflow_conns.discard(conn)
+    db_pool, slots = _pool, _pool_slots
+    if overflow or db_pool is None:
+        conn.close()
+        return
+    try:
+        db_pool.putconn(conn)
+    finally:
+        slots.release()
+
+
+def warm_up(preload: bool = True):
+    """서버 기동 직후 커넥션과 벡터 인덱스를 미리 데움
+
+    Args:
+        preload (bool): True면 law_chunks / complaint_normalizations 벡터 검색을 한 번씩 실행해
+            인덱스 페이지를 shared buffer에 올려둠 (첫 요청 지연 감소)
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("DB 연결 실패")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+    finally:
+        release_db_connection(conn)
+
+    if not preload:
+        return
+
+    for table, search in (("law_chunks", search_laws_by_text), ("complaint_normalizations", search_cases_by_text)):
+        conn = get_db_connection()
+        if not conn:
+            raise RuntimeError("DB 연결 실패")
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT embedding::text FROM {table} WHERE embedding IS NOT NULL LIMIT 1")
+                row = cur.fetchone()
+            conn.rollback()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ [Warm-up] {table} 조회 실패: {e}")
+            row = None
+        finally:
+            release_db_connection(conn)
+        if row:
+            search(row[0], limit=1)
+
 def save_complaint(title, body, district=None, address_text=None):
     """민원 원본 내용을 저장하는 함수"""
-    conn = psycopg2.connect(**DB_CONFIG, client_encoding='UTF8')
+    conn = get_db_connection()
+    if not conn: raise RuntimeError("DB 연결 실패")
     cur = conn.cursor()
     
     try:
@@ -49,7 +156,7 @@ def save_complaint(title, body, district=None, address_text=None):
         raise e
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 def save_normalization(complaint_id, analysis, embedding):
@@ -57,7 +164,8 @@ def save_normalization(complaint_id, analysis, embedding):
     1. 기존 데이터의 is_current를 false로 업데이트 
     2. 새로운 정규화 데이터 및 임베딩 벡터 저장 
     """
-    conn = psycopg2.connect(**DB_CONFIG, client_encoding='UTF8')
+    conn = get_db_connection()
+    if not conn: raise RuntimeError("DB 연결 실패")
     cur = conn.cursor()
     
     try:
@@ -94,91 +202,212 @@ def save_normalization(complaint_id, analysis, embedding):
         raise e
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
 
 
 # ========================================================
 #  유사 민원 검색 (Case Search)
 # ========================================================
 
-def search_cases_by_id(complaint_id: int, limit: int = 3) -> List[Dict]:
+# 벡터 검색 모드
+# - exact   : 1024차원 float 벡터 전체 비교 (기존 방식)
+# - halfvec : 1단계 후보를 half-precision(halfvec) 인덱스로 찾고, 상위 후보만 원본 벡터로 재정렬
+# - binary  : 1단계 후보를 부호 비트(binary_quantize, 1024bit) Hamming 인덱스로 찾고 재정렬
+# - short   : 1단계 후보를 앞 256차원 재정규화 벡터(embedding_short)로 찾고 재정렬 (Matryoshka)
+# (인덱스: db/migrations/001_compact_vector_indexes.sql, 002_embedding_short.sql)
+SEARCH_MODES = ("exact", "halfvec", "binary", "short")
+SHORT_EMBEDDING_DIM = 256
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "exact")
+# 재정렬 후보 수 = limit * RESCORE_FACTOR (최소 RESCORE_MIN_CANDIDATES)
+RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", 10))
+RESCORE_MIN_CANDIDATES = int(os.getenv("VECTOR_RESCORE_MIN_CANDIDATES", 40))
+# HNSW 는 ef_search(기본 40)개까지만 돌려주므로 1단계 후보 수만큼 올림 (pgvector 상한 1000)
+HNSW_EF_SEARCH_MAX = 1000
+
+# 1단계 후보 검색 정렬식 ({a}: 테이블 별칭, {vec}: 질의 벡터 식) - 인덱스 표현식과 동일해야 함
+_FIRST_STAGE_ORDER = {
+    "halfvec": "{a}.embedding::halfvec(1024) <=> {vec}::halfvec(1024)",
+    "binary": "binary_quantize({a}.embedding)::bit(1024) <~> binary_quantize({vec})::bit(1024)",
+    "short": (
+        "{a}.embedding_short <=> "
+        f"l2_normalize(subvector({{vec}}, 1, {SHORT_EMBEDDING_DIM}))::vector({SHORT_EMBEDDING_DIM})"
+    ),
+}
+
+# 검색 대상별 테이블/조인/필터
+_SEARCH_TARGETS = {
+    "case": {
+        "table": "complaint_normalizations cn",
+        "alias": "cn",
+        "columns": "c.id, c.body, c.answer, cn.neutral_summary",
+        "joins": "JOIN complaints c ON cn.complaint_id = c.id",
+        "where": "cn.is_current = true",
+    },
+    "law": {
+        "table": "law_chunks lc",
+        "alias": "lc",
+        "columns": "d.title, lc.article_no, lc.chunk_text",
+        "joins": "JOIN law_documents d ON lc.document_id = d.id",
+        "where": "true",
+    },
+}
+
+_QUERY_VEC_BY_ID = """
+    SELECT embedding AS vec FROM complaint_normalizations
+    WHERE complaint_id = %(complaint_id)s AND is_current = true LIMIT 1
+"""
+_QUERY_VEC_BY_TEXT = "SELECT %(vec)s::vector AS vec"
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = mode or VECTOR_SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"지원하지 않는 검색 모드: {mode} (가능: {SEARCH_MODES})")
+    return mode
+
+
+def _two_stage_sql(target: str, query_vec_sql: str, mode: str, extra_where: str = "") -> str:
+    """압축/축약 표현으로 후보를 찾고 원본 벡터로 재정렬하는 2단계(coarse-to-fine) 검색 SQL"""
+    t = _SEARCH_TARGETS[target]
+    a = t["alias"]
+    order = _FIRST_STAGE_ORDER[mode].format(a=a, vec="(SELECT vec FROM q)")
+    return f"""
+    WITH q AS ({query_vec_sql}),
+    candidates AS (
+        SELECT {a}.id
+        FROM {t['table']}
+        WHERE {t['where']}{extra_where}
+        ORDER BY {order}
+        LIMIT %(candidates)s
+    )
+    SELECT {t['columns']},
+        ({a}.embedding <=> (SELECT vec FROM q)) as distance
+    FROM candidates
+    JOIN {t['table']} ON {a}.id = candidates.id
+    {t['joins']}
+    ORDER BY distance ASC
+    LIMIT %(limit)s;
+    """
+
+
+def _set_statement_timeout(cur, timeout_ms: Optional[int]):
+    """요청 마감(deadline)에 맞춰 현재 트랜잭션의 쿼리 제한 시간 설정"""
+    if timeout_ms is not None:
+        cur.execute("SET LOCAL statement_timeout = %s", (max(int(timeout_ms), 1),))
+
+
+def _set_ann_search(cur, candidates: int):
+    """1단계 HNSW 스캔이 후보 수를 채우도록 현재 트랜잭션의 ef_search / iterative_scan 설정
+
+    ef_search 보다 큰 LIMIT 은 조용히 잘리고, is_current 등 필터는 스캔 뒤에 적용되므로
+    필터로 걸러지는 행이 많으면 반복 스캔(pgvector 0.8+, 없으면 기본 스캔)으로 후보를 더 찾는다.
+    """
+    cur.execute("SET LOCAL hnsw.ef_search = %s", (min(max(int(candidates), 40), HNSW_EF_SEARCH_MAX),))
+    cur.execute("SAVEPOINT ann_settings")
+    try:
+        cur.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT ann_settings")
+
+
+def _run_search(query: str, params: Dict[str, Any], type: str, timeout_ms: Optional[int],
+                mode: str = "exact") -> List[Dict]:
+    """검색 쿼리 실행 + 결과 변환 (제한 시간 초과 시 빈 리스트)"""
+    conn = get_db_connection()
+    if not conn: return []
+    cur = conn.cursor()
+
+    try:
+        _set_statement_timeout(cur, timeout_ms)
+        if mode != "exact":
+            _set_ann_search(cur, params["candidates"])
+        cur.execute(query, params)
+        return _parse_results(cur.fetchall(), type=type)
+    except errors.QueryCanceled:
+        print(f"⏱️ [DB] 벡터 검색 제한 시간({timeout_ms}ms) 초과 - 빈 결과 반환")
+        conn.rollback()
+        return []
+    finally:
+        cur.close()
+        release_db_connection(conn)
+
+
+def _search_params(limit: int, **extra) -> Dict[str, Any]:
+    return {"limit": limit, "candidates": max(limit * RESCORE_FACTOR, RESCORE_MIN_CANDIDATES), **extra}
+
+
+def search_cases_by_id(complaint_id: int, limit: int = 3, timeout_ms: Optional[int] = None,
+                       mode: Optional[str] = None) -> List[Dict]:
     """[자동 모드] 특정 민원 ID를 기준으로 유사한 과거 사례를 검색
 
     Args:
         complaint_id (int): 기준 민원 ID
         limit (int): 가져올 최대 개수
+        timeout_ms (int): 쿼리 제한 시간(ms), 초과 시 빈 리스트 반환
+        mode (str): 검색 모드 (SEARCH_MODES, 기본값 VECTOR_SEARCH_MODE)
 
     Returns:
         List[Dict]: 유사도 순으로 정렬된 민원 사례 리스트
     """
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-    
-    try:
+    mode = _resolve_mode(mode)
+    if mode == "exact":
         query = """
         WITH current_vec AS (
             SELECT embedding FROM complaint_normalizations 
-            WHERE complaint_id = %s AND is_current = true LIMIT 1
+            WHERE complaint_id = %(complaint_id)s AND is_current = true LIMIT 1
         )
         SELECT 
             c.id, c.body, c.answer, cn.neutral_summary,
             (cn.embedding <=> (SELECT embedding FROM current_vec)) as distance
         FROM complaint_normalizations cn
         JOIN complaints c ON cn.complaint_id = c.id
-        WHERE cn.complaint_id != %s  -- 자기 자신 제외
+        WHERE cn.complaint_id != %(complaint_id)s  -- 자기 자신 제외
           AND cn.is_current = true
         ORDER BY distance ASC
-        LIMIT %s;
+        LIMIT %(limit)s;
         """
-        cur.execute(query, (complaint_id, complaint_id, limit))
-        return _parse_results(cur.fetchall(), type="case")
-    finally:
-        cur.close()
-        conn.close()
+    else:
+        query = _two_stage_sql("case", _QUERY_VEC_BY_ID, mode, " AND cn.complaint_id != %(complaint_id)s")
+    return _run_search(query, _search_params(limit, complaint_id=complaint_id), "case", timeout_ms, mode)
 
-def search_cases_by_text(embedding_vector: List[float], limit: int = 3) -> List[Dict]:
+def search_cases_by_text(embedding_vector: List[float], limit: int = 3, timeout_ms: Optional[int] = None,
+                         mode: Optional[str] = None) -> List[Dict]:
     """[수동 모드] 사용자의 질문 벡터와 유사한 과거 사례를 검색
 
     Args:
         embedding_vector (list): 사용자 질문의 임베딩 벡터
         limit (int): 가져올 최대 개수
+        timeout_ms (int): 쿼리 제한 시간(ms), 초과 시 빈 리스트 반환
+        mode (str): 검색 모드 (SEARCH_MODES, 기본값 VECTOR_SEARCH_MODE)
 
     Returns:
         List[Dict]: 유사도 순으로 정렬된 민원 사례 리스트
     """
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-    
-    try:
+    mode = _resolve_mode(mode)
+    if mode == "exact":
         query = """
         SELECT 
             c.id, c.body, c.answer, cn.neutral_summary, 
-            (cn.embedding <=> %s::vector) as distance
+            (cn.embedding <=> %(vec)s::vector) as distance
         FROM complaint_normalizations cn
         JOIN complaints c ON cn.complaint_id = c.id
         WHERE cn.is_current = true
         ORDER BY distance ASC
-        LIMIT %s;
+        LIMIT %(limit)s;
         """
-        cur.execute(query, (embedding_vector, limit))
-        return _parse_results(cur.fetchall(), type="case")
-    finally:
-        cur.close()
-        conn.close()
+    else:
+        query = _two_stage_sql("case", _QUERY_VEC_BY_TEXT, mode)
+    return _run_search(query, _search_params(limit, vec=embedding_vector), "case", timeout_ms, mode)
 
-def search_laws_by_id(complaint_id: int, limit: int = 3) -> List[Dict]:
+def search_laws_by_id(complaint_id: int, limit: int = 3, timeout_ms: Optional[int] = None,
+                      mode: Optional[str] = None) -> List[Dict]:
     """[자동 모드] 민원 ID 기준 법령 검색 (테이블명 law_chunks로 수정됨)"""
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-    
-    try:
+    mode = _resolve_mode(mode)
+    if mode == "exact":
         query = """
         WITH current_vec AS (
             SELECT embedding FROM complaint_normalizations 
-            WHERE complaint_id = %s AND is_current = true LIMIT 1
+            WHERE complaint_id = %(complaint_id)s AND is_current = true LIMIT 1
         )
         SELECT 
             d.title, lc.article_no, lc.chunk_text,
@@ -186,37 +415,30 @@ def search_laws_by_id(complaint_id: int, limit: int = 3) -> List[Dict]:
         FROM law_chunks lc
         JOIN law_documents d ON lc.document_id = d.id
         ORDER BY distance ASC
-        LIMIT %s;
+        LIMIT %(limit)s;
         """
-        cur.execute(query, (complaint_id, limit))
-        return _parse_results(cur.fetchall(), type="law")
-    finally:
-        cur.close()
-        conn.close()
+    else:
+        query = _two_stage_sql("law", _QUERY_VEC_BY_ID, mode)
+    return _run_search(query, _search_params(limit, complaint_id=complaint_id), "law", timeout_ms, mode)
 
 
-def search_laws_by_text(embedding_vector: List[float], limit: int = 3, keyword: str = None) -> List[Dict]:
+def search_laws_by_text(embedding_vector: List[float], limit: int = 3, keyword: str = None,
+                        timeout_ms: Optional[int] = None, mode: Optional[str] = None) -> List[Dict]:
     """[수동 모드] 텍스트 임베딩 기준 법령 검색 (키워드 필터 제거 버전)"""
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-
-    try:
-        # [수정됨] keyword가 있어도 ILIKE로 필터링하지 않고, 순수 벡터 유사도로만 검색합니다.
-        # 이유: 사용자가 문장으로 질문하면 ILIKE 매칭이 0건이 되기 때문입니다.
+    mode = _resolve_mode(mode)
+    # [수정됨] keyword가 있어도 ILIKE로 필터링하지 않고, 순수 벡터 유사도로만 검색합니다.
+    # 이유: 사용자가 문장으로 질문하면 ILIKE 매칭이 0건이 되기 때문입니다.
+    if mode == "exact":
         query = """
-        SELECT d.title, lc.article_no, lc.chunk_text, (lc.embedding <=> %s::vector) as distance
+        SELECT d.title, lc.article_no, lc.chunk_text, (lc.embedding <=> %(vec)s::vector) as distance
         FROM law_chunks lc
         JOIN law_documents d ON lc.document_id = d.id
         ORDER BY distance ASC
-        LIMIT %s;
+        LIMIT %(limit)s;
         """
-        cur.execute(query, (embedding_vector, limit))
-
-        return _parse_results(cur.fetchall(), type="law")
-    finally:
-        cur.close()
-        conn.close()
+    else:
+        query = _two_stage_sql("law", _QUERY_VEC_BY_TEXT, mode)
+    return _run_search(query, _search_params(limit, vec=embedding_vector), "law", timeout_ms, mode)
 
 def _cosine_distance_to_percent(distance: float) -> float:
     """pgvector의 Cosine Distance를 백분율 유사도로 변환
@@ -335,22 +557,51 @@ def get_reference_answer(complaint_id: int) -> Optional[str]:
     except Exception as e:
         print(f"❌ [DB] 과거 답변 조회 실패: {e}")
         return None
+    finally:
+        release_db_connection(conn)
+
+_district_cache: Dict[int, Optional[int]] = {}
 
-def save_chat_log(complaint_id: int, role: str, message: str):
-    """채팅 로그 저장"""
+
+def get_complaint_district(complaint_id: int) -> Optional[int]:
+    """민원의 구(district) ID 조회 (LLM 스케줄러 공정성 키, 변하지 않으므로 캐시)"""
+    if complaint_id in _district_cache:
+        return _district_cache[complaint_id]
     conn = get_db_connection()
-    if not conn: return
+    if not conn: return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT district_id FROM complaints WHERE id = %s", (complaint_id,))
+            row = cur.fetchone()
+    except Exception as e:
+        print(f"❌ 민원 구 조회 실패: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+    district_id = row[0] if row else None
+    if len(_district_cache) > 10000:
+        _district_cache.clear()
+    _district_cache[complaint_id] = district_id
+    return district_id
+
+def save_chat_log(complaint_id: int, role: str, message: str) -> Optional[int]:
+    """채팅 로그 저장 (저장된 로그 id 반환, 실패 시 None)"""
+    conn = get_db_connection()
+    if not conn: return None
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO complaint_chat_logs (complaint_id, role, message) VALUES (%s, %s, %s)",
+                "INSERT INTO complaint_chat_logs (complaint_id, role, message) VALUES (%s, %s, %s) RETURNING id",
                 (complaint_id, role, message)
             )
+            log_id = cur.fetchone()[0]
             conn.commit()
+            return log_id
     except Exception as e:
         print(f"❌ 채팅 로그 저장 실패: {e}")
+        return None
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_chat_logs(complaint_id: int) -> List[Dict]:
     """과거 채팅 기록 조회"""
@@ -368,4 +619,96 @@ def get_chat_logs(complaint_id: int) -> List[Dict]:
         print(f"❌ 채팅 로그 조회 실패: {e}")
         return []
     finally:
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
+
+
+# ==========================================
+# 대화 메모리 (누적 요약 + 최근 N턴)
+# ==========================================
+
+def get_chat_context(complaint_id: int, recent_limit: int, before_id: Optional[int] = None) -> Dict[str, Any]:
+    """누적 요약과 최근 recent_limit개 로그를 한 번에 조회
+
+    Args:
+        before_id (int): 이 id 미만 로그만 (방금 저장한 현재 질문 제외용)
+
+    Returns:
+        dict: summary, summarized_until_log_id, recent([{id, role, content}], 오래된 순)
+    """
+    conn = get_db_connection()
+    if not conn: return {"summary": "", "summarized_until_log_id": 0, "recent": []}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT summary, summarized_until_log_id FROM complaint_chat_memory WHERE complaint_id = %s",
+                (complaint_id,)
+            )
+            memory = cur.fetchone()
+            cur.execute(
+                """
+                SELECT id, role, message FROM complaint_chat_logs
+                WHERE complaint_id = %s AND (%s::bigint IS NULL OR id < %s::bigint)
+                ORDER BY id DESC
+                LIMIT %s
+                """,
+                (complaint_id, before_id, before_id, recent_limit)
+            )
+            rows = cur.fetchall()
+        return {
+            "summary": memory[0] if memory else "",
+            "summarized_until_log_id": memory[1] if memory else 0,
+            "recent": [{"id": r[0], "role": r[1], "content": r[2]} for r in reversed(rows)],
+        }
+    except Exception as e:
+        print(f"❌ 대화 메모리 조회 실패: {e}")
+        return {"summary": "", "summarized_until_log_id": 0, "recent": []}
+    finally:
+        release_db_connection(conn)
+
+def get_chat_logs_after(complaint_id: int, after_id: int, before_id: int) -> List[Dict]:
+    """after_id < id < before_id 구간 로그 (요약에 아직 반영되지 않은 부분)"""
+    conn = get_db_connection()
+    if not conn: return []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, role, message FROM complaint_chat_logs
+                WHERE complaint_id = %s AND id > %s AND id < %s
+                ORDER BY id ASC
+                """,
+                (complaint_id, after_id, before_id)
+            )
+            return [{"id": r[0], "role": r[1], "content": r[2]} for r in cur.fetchall()]
+    except Exception as e:
+        print(f"❌ 채팅 로그 조회 실패: {e}")
+        return []
+    finally:
+        release_db_connection(conn)
+
+def save_chat_memory(complaint_id: int, summary: str, summarized_until_log_id: int) -> bool:
+    """누적 요약 저장 (이미 더 뒤까지 요약된 값이 있으면 덮어쓰지 않음)"""
+    conn = get_db_connection()
+    if not conn: return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO complaint_chat_memory (complaint_id, summary, summarized_until_log_id, updated_at)
+                VALUES (%s, %s, %s, now())
+                ON CONFLICT (complaint_id) DO UPDATE
+                SET summary = EXCLUDED.summary,
+                    summarized_until_log_id = EXCLUDED.summarized_until_log_id,
+                    updated_at = now()
+                WHERE complaint_chat_memory.summarized_until_log_id < EXCLUDED.summarized_until_log_id
+                """,
+                (complaint_id, summary, summarized_until_log_id)
+            )
+            updated = cur.rowcount > 0
+            conn.commit()
+            return updated
+    except Exception as e:
+        print(f"❌ 대화 메모리 저장 실패: {e}")
+        return False
+    finally:
+        release_db_connection(conn)
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from app import database
+from app.services.llm_scheduler import SchedulerRejected
+from app.services.text_tokens import count_tokens, truncate_to_tokens
+
+# 프롬프트에 그대로 넣는 최근 메시지 수 (user/assistant 각각 1개 = 1메시지)
+CHAT_MEMORY_RECENT_MESSAGES = int(os.getenv("CHAT_MEMORY_RECENT_MESSAGES", 6))
+# 요약 + 최근 대화에 쓰는 전체 토큰 예산
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", 1500))
+# 누적 요약 최대 길이
+CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", 400))
+# 최근 창 밖으로 밀려난 미요약 메시지가 이만큼 쌓이면 요약 갱신
+CHAT_MEMORY_SUMMARIZE_MIN = int(os.getenv("CHAT_MEMORY_SUMMARIZE_MIN", 4))
+# 요약 1회에 넣는 최대 메시지 수 / 메시지별 최대 토큰
+CHAT_MEMORY_SUMMARIZE_BATCH = 40
+CHAT_MEMORY_MESSAGE_TOKENS = 300
+
+
+class ConversationMemory:
+    """민원별 대화 메모리 (누적 요약 + 최근 N턴, 고정 토큰 예산)
+
+    - load(): complaint_chat_memory 요약 1행 + 최근 로그 몇 건만 읽어 프롬프트용 메시지 구성
+    - update(): 최근 창 밖으로 밀려난 로그만 기존 요약에 반영 (BATCH 우선순위, 응답 후 백그라운드)
+
+    요약이 갱신되기 전까지는 창 밖 미요약 로그(최대 CHAT_MEMORY_SUMMARIZE_MIN - 1건)도 함께 읽어
+    요약과 최근 대화 사이에 빈 구간이 생기지 않게 한다.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self._updating = set()
+
+    def load(self, complaint_id: int, before_id: Optional[int] = None) -> List[Dict[str, str]]:
+        """프롬프트에 넣을 이전 대화 메시지 (토큰 예산 이내)
+
+        Args:
+            before_id (int): 이 로그 id 이전까지만 (방금 저장한 현재 질문 제외)
+        """
+        ctx = database.get_chat_context(
+            complaint_id, CHAT_MEMORY_RECENT_MESSAGES + CHAT_MEMORY_SUMMARIZE_MIN, before_id
+        )
+        budget = CHAT_MEMORY_TOKEN_BUDGET
+        messages = []
+
+        summary = truncate_to_tokens(ctx["summary"], CHAT_MEMORY_SUMMARY_TOKENS) if ctx["summary"] else ""
+        if summary:
+            summary_msg = {"role": "system", "content": f"[이전 대화 요약]\n{summary}"}
+            budget -= count_tokens(summary_msg["content"])
+
+        # 요약에 이미 반영된 로그는 제외하고, 최신 메시지부터 예산이 허락하는 만큼
+        recent = []
+        for log in reversed(ctx["recent"]):
+            if log["id"] <= ctx["summarized_until_log_id"] or log["role"] not in ("user", "assistant"):
+                continue
+            content = truncate_to_tokens(log["content"] or "", min(CHAT_MEMORY_MESSAGE_TOKENS, budget))
+            if not content:
+                break
+            budget -= count_tokens(content)
+            recent.append({"role": log["role"], "content": content})
+            if budget <= 0:
+                break
+
+        if summary:
+            messages.append(summary_msg)
+        messages.extend(reversed(recent))
+        return messages
+
+    async def update(self, complaint_id: int, district_id: Optional[int] = None):
+        """창 밖으로 밀려난 미요약 로그를 누적 요약에 반영 (실패해도 다음 턴에 다시 시도)"""
+        if complaint_id in self._updating:
+            return
+        self._updating.add(complaint_id)
+        try:
+            ctx = await asyncio.to_thread(database.get_chat_context, complaint_id, CHAT_MEMORY_RECENT_MESSAGES)
+            if len(ctx["recent"]) < CHAT_MEMORY_RECENT_MESSAGES:
+                return
+            pending = await asyncio.to_thread(
+                database.get_chat_logs_after, complaint_id, ctx["summarized_until_log_id"], ctx["recent"][0]["id"]
+            )
+            if len(pending) < CHAT_MEMORY_SUMMARIZE_MIN:
+                return
+
+            pending = pending[:CHAT_MEMORY_SUMMARIZE_BATCH]
+            summary = await self.llm.summarize_conversation(
+                ctx["summary"],
+                [{"role": m["role"], "content": truncate_to_tokens(m["content"] or "", CHAT_MEMORY_MESSAGE_TOKENS)}
+                 for m in pending],
+                CHAT_MEMORY_SUMMARY_TOKENS,
+                district_id,
+            )
+            summary = truncate_to_tokens(summary or "", CHAT_MEMORY_SUMMARY_TOKENS)
+            await asyncio.to_thread(database.save_chat_memory, complaint_id, summary, pending[-1]["id"])
+            print(f"🧠 [Memory] 민원 #{complaint_id} 요약 갱신 (로그 {len(pending)}건 반영)")
+        except SchedulerRejected as e:
+            print(f"⚠️ [Memory] 민원 #{complaint_id} 요약 보류 (대기열 혼잡): {e}")
+        except Exception as e:
+            print(f"❌ [Memory] 민원 #{complaint_id} 요약 실패: {e!r}")
+        finally:
+            self._updating.discard(complaint_id)
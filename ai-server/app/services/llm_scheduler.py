@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+
+class Priority(IntEnum):
+    """LLM 호출 우선순위 (값이 작을수록 먼저 처리)"""
+    INTERACTIVE = 0  # 일반 채팅
+    BUTTON = 1       # '관련 규정' / '유사 사례' 버튼
+    DRAFT = 2        # AI 답변 초안
+    BATCH = 3        # 배치 작업 (대화 요약 등)
+
+
+class SchedulerRejected(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 거절함
+
+    status_code: 429 (해당 우선순위 대기열 초과) / 503 (대기 시간 초과)
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# 우선순위별 기본 대기열 한도 (초과 시 즉시 429)
+DEFAULT_QUEUE_LIMITS = {
+    Priority.INTERACTIVE: 64,
+    Priority.BUTTON: 32,
+    Priority.DRAFT: 16,
+    Priority.BATCH: 8,
+}
+
+# 우선순위별 최대 대기 시간(초) (초과 시 503)
+DEFAULT_MAX_WAIT = {
+    Priority.INTERACTIVE: 10.0,
+    Priority.BUTTON: 15.0,
+    Priority.DRAFT: 30.0,
+    Priority.BATCH: 120.0,
+}
+
+
+class _Ticket:
+    __slots__ = ("future", "enqueued_at", "district")
+
+    def __init__(self, future: asyncio.Future, district: Any):
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.district = district
+
+
+class _WaitStats:
+    """우선순위별 대기 시간 지표 (최근 window개 기준 분위수)"""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rejected = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))], 4) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "rejected": self.rejected,
+            "avg_wait": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50_wait": pct(0.50),
+            "p95_wait": pct(0.95),
+            "max_wait": round(self.max, 4),
+        }
+
+
+class LLMScheduler:
+    """OpenAI 호출용 동시 실행 제한 + 우선순위 스케줄러
+
+    - 동시에 실행되는 LLM 호출 수를 max_concurrency로 제한
+    - 빈 슬롯은 항상 높은 우선순위(INTERACTIVE > BUTTON > DRAFT > BATCH)부터 배정
+    - 같은 우선순위 안에서는 구(district)별로 라운드 로빈하여 한 구가 독점하지 못하게 함
+    - 대기열이 가득 차면 쌓지 않고 즉시 SchedulerRejected(429), 대기 시간 초과 시 503
+
+    이벤트 루프 하나에서만 사용 (상태 변경은 모두 루프 스레드에서 일어나므로 락 불필요)
+    """
+
+    def __init__(self, max_concurrency: int = 8, queue_limits: Optional[Dict[Priority, int]] = None,
+                 max_wait: Optional[Dict[Priority, float]] = None):
+        self.max_concurrency = max_concurrency
+        self.queue_limits = {**DEFAULT_QUEUE_LIMITS, **(queue_limits or {})}
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+        self._in_flight = 0
+        # 우선순위 -> (district -> 대기 티켓 deque), OrderedDict 순서가 라운드 로빈 순서
+        self._queues = {p: OrderedDict() for p in Priority}
+        self._depth = {p: 0 for p in Priority}
+        self._stats = {p: _WaitStats() for p in Priority}
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        queue_limits = {
+            p: int(os.getenv(f"LLM_QUEUE_LIMIT_{p.name}", DEFAULT_QUEUE_LIMITS[p])) for p in Priority
+        }
+        max_wait = {
+            p: float(os.getenv(f"LLM_MAX_WAIT_{p.name}", DEFAULT_MAX_WAIT[p])) for p in Priority
+        }
+        return cls(int(os.getenv("LLM_MAX_CONCURRENCY", 8)), queue_limits, max_wait)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, district: Any = None, timeout: Optional[float] = None):
+        """실행 슬롯을 얻을 때까지 대기 후 진입
+
+        Args:
+            priority (Priority): 요청 우선순위
+            district: 공정성 기준 키 (구 ID, 없으면 공용 버킷)
+            timeout (float): 최대 대기 시간, None이면 우선순위 기본값
+
+        Raises:
+            SchedulerRejected: 대기열 초과(429) 또는 대기 시간 초과(503)
+        """
+        await self._acquire(priority, district, timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority, district: Any, timeout: Optional[float]):
+        stats = self._stats[priority]
+
+        # 빈 슬롯이 있고 앞선 대기자가 없으면 바로 실행
+        if self._in_flight < self.max_concurrency and not any(self._depth.values()):
+            self._in_flight += 1
+            stats.observe(0.0)
+            return
+
+        if self._depth[priority] >= self.queue_limits[priority]:
+            stats.rejected += 1
+            raise SchedulerRejected(
+                f"LLM 대기열 초과 ({priority.name}, {self._depth[priority]}건 대기 중)", status_code=429
+            )
+
+        ticket = _Ticket(asyncio.get_running_loop().create_future(), district)
+        self._queues[priority].setdefault(district, deque()).append(ticket)
+        self._depth[priority] += 1
+
+        wait_limit = self.max_wait[priority] if timeout is None else min(timeout, self.max_wait[priority])
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=max(wait_limit, 0.0))
+        except asyncio.TimeoutError:
+            if ticket.future.done():
+                # 타임아웃 직전에 슬롯을 받은 경우: 사용하지 않고 반납
+                self._release()
+            else:
+                self._remove(priority, ticket)
+            stats.rejected += 1
+            raise SchedulerRejected(
+                f"LLM 대기 시간 초과 ({priority.name}, {wait_limit:.1f}초)", status_code=503, retry_after=2
+            )
+        except asyncio.CancelledError:
+            if ticket.future.done():
+                self._release()
+            else:
+                self._remove(priority, ticket)
+            raise
+
+        stats.observe(time.perf_counter() - ticket.enqueued_at)
+
+    def _remove(self, priority: Priority, ticket: _Ticket):
+        queue = self._queues[priority].get(ticket.district)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self._depth[priority] -= 1
+            if not queue:
+                del self._queues[priority][ticket.district]
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """빈 슬롯을 우선순위 -> 구 라운드 로빈 순으로 대기자에게 배정"""
+        while self._in_flight < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            self._in_flight += 1
+            ticket.future.set_result(True)
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        for priority in Priority:
+            districts = self._queues[priority]
+            while districts:
+                district, queue = next(iter(districts.items()))
+                ticket = queue.popleft()
+                if queue:
+                    districts.move_to_end(district)
+                else:
+                    del districts[district]
+                self._depth[priority] -= 1
+                if not ticket.future.done():
+                    return ticket
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        """대기열 깊이, 실행 중 건수, 우선순위별 대기 시간 지표"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queues": {
+                p.name: {
+                    "depth": self._depth[p],
+                    "limit": self.queue_limits[p],
+                    "districts_waiting": len(self._queues[p]),
+                    **self._stats[p].snapshot(),
+                }
+                for p in Priority
+            },
+        }
+
+
+# 서버 전역 스케줄러 (모든 OpenAI 호출이 공유)
+scheduler = LLMScheduler.from_env()
@@ -1,7 +1,13 @@
+import asyncio
 import os
 from app import database
-from typing import List, Dict, Any
-from openai import OpenAI
+from app.services.llm_scheduler import Priority, SchedulerRejected, scheduler
+from app.services.resilience import (
+    Deadline, CircuitOpen, hedged, openai_breaker, embedding_latency, embedding_hedge_slots, HEDGE_QUANTILE,
+    LLM_MIN_BUDGET_SECONDS
+)
+from typing import List, Dict, Any, Optional
+from openai import OpenAI, NOT_GIVEN
 
 # [필수] OpenAI API Key 설정
 # 환경 변수에서 가져오기
@@ -10,7 +16,24 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     print("⚠️ 경고: OPENAI_API_KEY가 설정되지 않았습니다. .env 파일을 확인하세요.")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# import 시점이 아니라 첫 사용(또는 서버 warm-up) 시점에 생성
+_client: Optional[OpenAI] = None
+
+
+def get_client() -> OpenAI:
+    """공용 OpenAI 클라이언트 반환 (내부 HTTP 커넥션 풀 재사용)"""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+
+def close_client():
+    """OpenAI 클라이언트의 HTTP 커넥션 풀 정리"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
 
 
 class LLMService:
@@ -20,31 +43,103 @@ class LLMService:
         # 빠르고 성능 좋은 GPT-4o-mini 사용
         self.chat_model = "gpt-4o-mini"
 
-    async def get_embedding(self, text: str) -> List[float]:
-        """OpenAI를 사용하여 텍스트를 벡터로 변환 (DB와 호환)"""
-        try:
-            # 줄바꿈 제거 (OpenAI 권장)
-            text = text.replace("\n", " ")
+    async def get_embedding(self, text: str, priority: Priority = Priority.INTERACTIVE,
+                            district_id: Optional[int] = None, deadline: Optional[Deadline] = None) -> List[float]:
+        """OpenAI를 사용하여 텍스트를 벡터로 변환 (DB와 호환)
+
+        - 스케줄러 슬롯을 얻은 뒤 호출하므로 대기열 초과 시 SchedulerRejected가 전파됨
+        - 최근 지연시간 분위수(EMBED_HEDGE_QUANTILE)를 넘으면 같은 요청을 한 번 더 보내 먼저 온 결과 사용
+          (추가 시도는 전역 EMBED_MAX_HEDGES개까지)
+        - deadline 초과, 차단기 OPEN, API 오류 시 빈 리스트 반환
+        """
+        # 줄바꿈 제거 (OpenAI 권장)
+        text = text.replace("\n", " ")
 
+        def call():
             # ★ 수정됨: OpenAI API 호출로 변경
-            response = client.embeddings.create(
+            return get_client().embeddings.create(
                 input=[text],
                 model=self.embed_model,
-                dimensions=1024  # DB와 차원수 일치 필수
+                dimensions=1024,  # DB와 차원수 일치 필수
+                timeout=deadline.remaining() if deadline else NOT_GIVEN
             )
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"❌ OpenAI 임베딩 생성 실패: {e}")
-            return []
 
-    async def generate_response(self, complaint_id: int, user_query: str = None, action: str = "chat") -> Dict[
-        str, Any]:
+        async with scheduler.slot(priority, district_id, timeout=deadline.remaining() if deadline else None):
+            try:
+                response = await openai_breaker.call(
+                    lambda: hedged(call, embedding_latency, HEDGE_QUANTILE, deadline, embedding_hedge_slots)
+                )
+                return response.data[0].embedding
+            except Exception as e:
+                print(f"❌ OpenAI 임베딩 생성 실패: {e!r}")
+                return []
+
+    async def _chat_completion(self, messages: List[Dict[str, str]], priority: Priority,
+                               district_id: Optional[int] = None, temperature: float = 0.3,
+                               deadline: Optional[Deadline] = None) -> str:
+        """스케줄러 슬롯 안에서 Chat Completion 호출 (블로킹 호출은 스레드로 분리)
+
+        Raises:
+            CircuitOpen: 차단기가 열려 있음
+            asyncio.TimeoutError: deadline 안에 응답이 오지 않음
+        """
+        async def call():
+            request = asyncio.to_thread(
+                get_client().chat.completions.create,
+                model=self.chat_model,
+                messages=messages,
+                temperature=temperature,
+                timeout=deadline.remaining() if deadline else NOT_GIVEN
+            )
+            if deadline is None:
+                return await request
+            return await asyncio.wait_for(request, timeout=deadline.remaining())
+
+        async with scheduler.slot(priority, district_id, timeout=deadline.remaining() if deadline else None):
+            response = await openai_breaker.call(call)
+        return response.choices[0].message.content
+
+    @staticmethod
+    def _timeout_ms(deadline: Optional[Deadline]) -> Optional[int]:
+        return deadline.remaining_ms() if deadline else None
+
+    @staticmethod
+    def _degraded_response(action: str, laws: List[Dict], cases: List[Dict], reason: str) -> Dict[str, Any]:
+        """LLM 없이 검색 결과만으로 만드는 응답 (차단기 OPEN / 마감 임박 시)"""
+        lines = [f"⚠️ AI 응답이 지연되어 검색된 자료만 우선 제공합니다. ({reason})"]
+        if action == "search_case":
+            for i, case in enumerate(cases, 1):
+                lines.append(f"[사례 {i}] (유사도 {case.get('similarity', 0)}%) {(case.get('summary') or case.get('body') or '')[:100]}")
+                lines.append(f"   - 처리결과: {(case.get('answer') or '')[:150]}")
+        else:
+            for i, law in enumerate(laws, 1):
+                lines.append(f"[{i}] {law.get('title', '법령')} {law.get('section') or ''} (유사도 {law.get('similarity', 0)}%)")
+                lines.append(f"   - {(law.get('content') or '')[:150]}...")
+        if len(lines) == 1:
+            lines.append("관련 자료를 찾지 못했습니다. 잠시 후 다시 시도해 주세요.")
+        return {
+            "answer": "\n".join(lines),
+            "documents": laws if action != 'search_case' else cases,
+            "degraded": True
+        }
+
+    async def generate_response(self, complaint_id: int, user_query: str = None, action: str = "chat",
+                                district_id: Optional[int] = None,
+                                deadline: Optional[Deadline] = None,
+                                history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """
         action 종류:
          - 'search_law': '관련 규정...' 버튼 (법령 검색)
          - 'search_case': '유사 사례...' 버튼 (과거 사례 요약) ★ 추가됨
-         - 'chat': 일반 채팅
+         - 'chat': 일반 채팅 (history가 있으면 system 다음에 이전 대화로 넣음)
+
+        history: ConversationMemory.load()가 만든 메시지 (누적 요약 + 최근 N턴, 토큰 예산 이내)
+
+        LLM 호출 우선순위: chat(INTERACTIVE) > 버튼(BUTTON)
+        deadline이 주어지면 검색/생성 모두 남은 시간 안에서만 실행하고,
+        차단기가 열려 있거나 마감이 임박하면 LLM 없이 검색 결과만 반환 (degraded=True)
         """
+        priority = Priority.INTERACTIVE if action not in ("search_law", "search_case") else Priority.BUTTON
         laws = []
         cases = []
         system_role = ""
@@ -53,7 +148,9 @@ class LLMService:
         # 1. 분기 처리
         if action == "search_law":
             print(f"🔍 [Button] 민원 #{complaint_id} 법령 검색")
-            laws = database.search_laws_by_id(complaint_id, limit=3)
+            laws = await asyncio.to_thread(
+                database.search_laws_by_id, complaint_id, 3, self._timeout_ms(deadline)
+            )
 
             # 법령 컨텍스트 조립
             context_text = ""
@@ -69,7 +166,9 @@ class LLMService:
         elif action == "search_case":
             print(f"🔍 [Button] 민원 #{complaint_id} 유사 사례 검색")
             # 1. DB에서 유사 사례 조회
-            raw_cases = database.search_cases_by_id(complaint_id, limit=3)
+            raw_cases = await asyncio.to_thread(
+                database.search_cases_by_id, complaint_id, 3, self._timeout_ms(deadline)
+            )
 
             # [디버깅]
             print(f"   --> 1차 검색된 개수: {len(raw_cases)}개")
@@ -98,9 +197,11 @@ class LLMService:
         else:  # 'chat'
             print(f"🔍 [Chat] 사용자 질문: {user_query}")
             if user_query:
-                vec = await self.get_embedding(user_query)
+                vec = await self.get_embedding(user_query, priority, district_id, deadline)
                 if vec:
-                    laws = database.search_laws_by_text(vec, limit=3, keyword=user_query)
+                    laws = await asyncio.to_thread(
+                        database.search_laws_by_text, vec, 3, user_query, self._timeout_ms(deadline)
+                    )
 
             context_text = ""
             for i, law in enumerate(laws, 1):
@@ -111,18 +212,30 @@ class LLMService:
             system_role = "당신은 법률 상담 AI입니다. [참고 자료]를 근거로 답변하세요. 근거가 없으면 없다고 하세요."
             user_msg = f"질문: {user_query}\n\n[참고 자료]:\n{context_text}"
 
-        # 2. LLM 호출
+        # 2. LLM 호출 (차단기 OPEN / 마감 임박이면 검색 결과만 반환)
+        if openai_breaker.is_open():
+            return self._degraded_response(action, laws, cases, "AI 서비스 일시 차단")
+        if deadline and deadline.near(LLM_MIN_BUDGET_SECONDS):
+            return self._degraded_response(action, laws, cases, "응답 시간 초과 임박")
+
         ai_answer = ""
         try:
-            response = client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
+            ai_answer = await self._chat_completion(
+                [
                     {"role": "system", "content": system_role},
+                    *(history if action == "chat" and history else []),
                     {"role": "user", "content": user_msg}
                 ],
-                temperature=0.3
+                priority,
+                district_id,
+                deadline=deadline
             )
-            ai_answer = response.choices[0].message.content
+        except SchedulerRejected:
+            if deadline is None:
+                raise
+            return self._degraded_response(action, laws, cases, "AI 요청 대기열 혼잡")
+        except (CircuitOpen, asyncio.TimeoutError):
+            return self._degraded_response(action, laws, cases, "AI 응답 지연")
         except Exception as e:
             ai_answer = f"오류 발생: {str(e)}"
 
@@ -132,10 +245,34 @@ class LLMService:
             "documents": laws if action != 'search_case' else cases  # 사례 검색이면 사례를 반환
         }
 
-    async def generate_draft(self, complaint_id: int, complaint_body: str) -> str:
+    async def summarize_conversation(self, previous_summary: str, messages: List[Dict[str, str]],
+                                     max_tokens: int, district_id: Optional[int] = None) -> str:
+        """기존 요약에 새 대화를 반영한 누적 요약 생성 (BATCH 우선순위, 실패 시 예외 전파)"""
+        dialogue = "\n".join(
+            f"{'담당자' if m['role'] == 'user' else 'AI'}: {m['content']}" for m in messages
+        )
+        prompt = (
+            f"[기존 요약]\n{previous_summary or '(없음)'}\n\n"
+            f"[새 대화]\n{dialogue}\n\n"
+            f"기존 요약에 새 대화 내용을 반영해 하나의 요약으로 다시 작성하세요. "
+            f"담당자가 확인한 사실, 질문 의도, AI가 제시한 법령/사례와 결론을 남기고 "
+            f"인사말 등은 빼세요. 한국어로 {max_tokens}토큰 이내."
+        )
+        return await self._chat_completion(
+            [
+                {"role": "system", "content": "당신은 민원 상담 대화를 요약하는 도우미입니다."},
+                {"role": "user", "content": prompt}
+            ],
+            Priority.BATCH,
+            district_id,
+            temperature=0.0
+        )
+
+    async def generate_draft(self, complaint_id: int, complaint_body: str, district_id: Optional[int] = None) -> str:
         """
         [AI 초안 작성]
         - 과거 유사 답변(Reference) + RAG(법령) -> 최종 초안 생성
+        - LLM 호출 우선순위: DRAFT (채팅/버튼보다 뒤)
         """
         # 1. 과거 답변 가져오기 (Step 1~3)
 
@@ -145,7 +282,7 @@ class LLMService:
         law_text = ""
         if complaint_body:
             # (1) 텍스트 -> 벡터 변환 (기존 메서드 활용)
-            vec = await self.get_embedding(complaint_body)
+            vec = await self.get_embedding(complaint_body, Priority.DRAFT, district_id)
 
             if vec:
                 # (2) 벡터로 법령 검색 (기존에 있던 함수!)
@@ -201,16 +338,18 @@ class LLMService:
 
         # 4. LLM 호출
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # 또는 gpt-4o
-                messages=[
+            draft_content = await self._chat_completion(
+                [
                     {"role": "system", "content": system_role},
                     {"role": "user", "content": prompt}
                 ],
+                Priority.DRAFT,
+                district_id,
                 temperature=0.3  # 초안은 일관성 있게
             )
-            draft_content = response.choices[0].message.content
             return warning_msg + draft_content
 
+        except SchedulerRejected:
+            raise
         except Exception as e:
             return f"오류가 발생하여 초안을 작성하지 못했습니다. ({str(e)})"
\ No newline at end of file
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class Deadline:
+    """요청 단위 마감 시각 (검색 -> 생성 단계로 그대로 전달)"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """남은 시간(초), 이미 지났으면 0"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self) -> int:
+        return int(self.remaining() * 1000)
+
+    def near(self, margin: float) -> bool:
+        """남은 시간이 margin초 미만인지"""
+        return self.remaining() < margin
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class LatencyTracker:
+    """최근 호출 지연시간 분위수 (hedge 시점 계산용)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20, default: float = 1.0):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default = default
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        """표본이 부족하면 default 반환"""
+        if len(self.samples) < self.min_samples:
+            return self.default
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def hedged(call: Callable[[], Any], tracker: LatencyTracker, quantile: float = 0.95,
+                 deadline: Optional[Deadline] = None, hedge_slots: Optional[threading.Semaphore] = None) -> Any:
+    """블로킹 호출을 스레드에서 실행하고, 지연이 quantile 분위수를 넘으면 같은 호출을 한 번 더 보냄
+
+    먼저 끝난 결과를 사용 (늦은 쪽 결과는 버림). 첫 시도가 예외로 끝나면 두 번째 시도를 기다림.
+    - 지연시간은 시도마다 스레드가 끝날 때 기록 (버려진 느린 시도도 분위수에 반영)
+    - hedge_slots가 있으면 슬롯을 얻은 경우에만 추가 시도를 보내고, 두 스레드가 모두 끝나야 반납
+      (호출자가 잡은 스케줄러 슬롯 밖에서 도는 스레드 수를 제한)
+
+    Raises:
+        asyncio.TimeoutError: deadline 안에 어느 쪽도 끝나지 않은 경우
+    """
+    lock = threading.Lock()
+    alive = 0
+    holds_slot = False
+
+    def run():
+        nonlocal alive
+        started = time.perf_counter()
+        try:
+            result = call()
+            tracker.observe(time.perf_counter() - started)
+            return result
+        finally:
+            with lock:
+                alive -= 1
+                release = holds_slot and alive == 0
+            if release:
+                hedge_slots.release()
+
+    def start() -> asyncio.Task:
+        nonlocal alive
+        with lock:
+            alive += 1
+        return asyncio.create_task(asyncio.to_thread(run))
+
+    def acquire_hedge() -> bool:
+        nonlocal holds_slot
+        if hedge_slots is None:
+            return True
+        with lock:
+            holds_slot = hedge_slots.acquire(blocking=False)
+        return holds_slot
+
+    timeout = deadline.remaining() if deadline else None
+    hedge_after = tracker.quantile(quantile)
+    first = start()
+    done, _ = await asyncio.wait({first}, timeout=hedge_after if timeout is None else min(hedge_after, timeout))
+    if first in done and first.exception() is None:
+        return first.result()
+    if deadline and deadline.expired:
+        first.cancel()
+        raise asyncio.TimeoutError("deadline exceeded before hedge")
+
+    pending = {first} if first not in done else set()
+    error: Optional[BaseException] = first.exception() if first in done else None
+    if acquire_hedge():
+        pending.add(start())
+    elif error is not None:
+        # 추가 시도 슬롯이 없으면 재시도하지 않음
+        raise error
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=deadline.remaining() if deadline else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise asyncio.TimeoutError("deadline exceeded while hedging")
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitBreaker:
+    """연속/최근 실패가 쌓이면 일정 시간 호출을 차단 (OPEN -> HALF_OPEN -> CLOSED)
+
+    - CLOSED: 정상. window초 안의 실패가 failure_threshold회 이상이면 OPEN
+    - OPEN: cooldown초 동안 allow()가 False (호출 없이 바로 degraded 응답)
+    - HALF_OPEN: cooldown 후 시험 호출 1건만 허용, 성공하면 CLOSED / 실패하면 다시 OPEN
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "CLOSED", "OPEN", "HALF_OPEN"
+
+    def __init__(self, name: str, failure_threshold: int = 5, window: float = 30.0, cooldown: float = 20.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._failures = deque()
+        self._probe_in_flight = False
+
+    def is_open(self) -> bool:
+        """쿨다운 중인 OPEN 상태인지 (상태를 바꾸지 않는 조회)"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._failures.clear()
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._trip(now)
+            return
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self._failures.clear()
+        self._probe_in_flight = False
+        print(f"🚨 [CircuitBreaker] {self.name} 차단 ({self.cooldown}초)")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """fn을 실행하며 결과를 기록 (차단 중이면 CircuitOpen)"""
+        if not self.allow():
+            raise CircuitOpen(self.name)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class CircuitOpen(Exception):
+    """차단기가 열려 있어 호출하지 않음"""
+
+
+# 서버 전역 설정/인스턴스
+AI_CHAT_DEADLINE_SECONDS = float(os.getenv("AI_CHAT_DEADLINE_SECONDS", 8))
+LLM_MIN_BUDGET_SECONDS = float(os.getenv("LLM_MIN_BUDGET_SECONDS", 2))
+HEDGE_QUANTILE = float(os.getenv("EMBED_HEDGE_QUANTILE", 0.95))
+
+openai_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURES", 5)),
+    window=float(os.getenv("OPENAI_BREAKER_WINDOW", 30)),
+    cooldown=float(os.getenv("OPENAI_BREAKER_COOLDOWN", 20)),
+)
+embedding_latency = LatencyTracker()
+# 스케줄러 슬롯 밖에서 동시에 돌 수 있는 임베딩 추가 시도 수
+embedding_hedge_slots = threading.BoundedSemaphore(int(os.getenv("EMBED_MAX_HEDGES", 2)))
@@ -0,0 +1,71 @@
+import math
+import re
+from typing import List
+
+# tiktoken이 설치되어 있으면 OpenAI 임베딩/채팅 모델과 같은 cl100k_base로 정확히 계산,
+# 없으면 보수적으로 추정 (한글 등 비ASCII 1자 = 1토큰, ASCII 4자 = 1토큰)
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。다])\s+|\n+")
+
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """max_tokens 이하가 되는 가장 긴 앞부분 (문자 단위 이진 탐색)"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _sentences(text: str) -> List[str]:
+    """문장/줄 단위 조각 (구분 공백을 조각 끝에 남겨 이어 붙이면 원문과 같음)"""
+    pieces, pos = [], 0
+    for m in _SENTENCE_SPLIT.finditer(text):
+        pieces.append(text[pos:m.end()])
+        pos = m.end()
+    if pos < len(text):
+        pieces.append(text[pos:])
+    return pieces
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """문장/줄 경계를 최대한 유지하며 max_tokens 이하 조각으로 분할 (조각 내부 원문 그대로)"""
+    chunks = []
+    current = ""
+    for piece in _sentences(text):
+        candidate = current + piece
+        if count_tokens(candidate.strip()) <= max_tokens:
+            current = candidate
+            continue
+        if current.strip():
+            chunks.append(current.strip())
+        # 한 문장이 한도를 넘으면 강제로 자름
+        piece = piece.strip()
+        while count_tokens(piece) > max_tokens:
+            head = truncate_to_tokens(piece, max_tokens)
+            chunks.append(head)
+            piece = piece[len(head):].strip()
+        current = piece + " " if piece else ""
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
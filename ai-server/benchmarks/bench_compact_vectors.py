@@ -0,0 +1,135 @@
+"""압축 벡터 2단계 검색 벤치마크 (recall vs 지연시간/메모리)
+
+사용법 (ai-server 디렉터리에서):
+    # 1) 합성 데이터 (DB 불필요, numpy로 각 압축 방식을 재현)
+    python -m benchmarks.bench_compact_vectors --n 50000 --queries 200
+
+    # 2) 실제 DB (database.py 검색 함수를 모드별로 호출, exact 결과 대비 recall)
+    python -m benchmarks.bench_compact_vectors --db --queries 100
+
+합성 모드의 recall/메모리는 pgvector 인덱스와 같은 압축 방식으로 계산한 값이다.
+numpy에는 float16/int8 SIMD 행렬곱이 없으므로 합성 모드의 지연시간은 binary/exact만 참고하고,
+halfvec 지연시간은 --db 모드로 측정한다.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+DIM = 1024
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def make_corpus(n, dim=DIM, n_topics=200, noise=0.6, seed=42):
+    """토픽 중심 주변에 뭉친 정규화 벡터 (실제 임베딩처럼 군집 구조가 있음)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, n)
+    x = centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def _top_k(scores, k):
+    idx = np.argpartition(-scores, k)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def _rescore(corpus, q, candidates, k):
+    exact = corpus[candidates] @ q
+    return candidates[np.argsort(-exact)[:k]]
+
+
+def run_synthetic(n, n_queries, k, factor):
+    corpus = make_corpus(n)
+    # 질의: 코퍼스 문서 주변의 변형 (같은 토픽 구조 공유)
+    rng = np.random.default_rng(7)
+    queries = corpus[rng.integers(0, n, n_queries)] + 0.02 * rng.standard_normal((n_queries, DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    n_cand = max(k * factor, 40)
+
+    truth = [_top_k(corpus @ q, k) for q in queries]
+
+    half = corpus.astype(np.float16)
+    scale = np.abs(corpus).max(axis=0) / 127.0
+    int8 = np.round(corpus / scale).astype(np.int8)
+    bits = np.packbits(corpus > 0, axis=1)
+
+    def exact(q):
+        return _top_k(corpus @ q, k)
+
+    def halfvec(q):
+        cand = _top_k((half @ q.astype(np.float16)).astype(np.float32), n_cand)
+        return _rescore(corpus, q, cand, k)
+
+    def scalar_int8(q):
+        cand = _top_k(int8 @ (q * scale), n_cand)
+        return _rescore(corpus, q, cand, k)
+
+    def binary(q):
+        qb = np.packbits(q > 0)
+        hamming = _POPCOUNT[np.bitwise_xor(bits, qb)].sum(axis=1, dtype=np.int32)
+        cand = np.argpartition(hamming, n_cand)[:n_cand]
+        return _rescore(corpus, q, cand, k)
+
+    methods = {
+        "exact": (exact, corpus.nbytes),
+        "halfvec+rescore": (halfvec, half.nbytes),
+        "int8+rescore": (scalar_int8, int8.nbytes + scale.nbytes),
+        "binary+rescore": (binary, bits.nbytes),
+    }
+    report = {"n": n, "queries": n_queries, "k": k, "candidates": n_cand, "results": {}}
+    for name, (fn, code_bytes) in methods.items():
+        started = time.perf_counter()
+        found = [fn(q) for q in queries]
+        elapsed = time.perf_counter() - started
+        report["results"][name] = {
+            "recall@k": round(recall_at_k(found, truth), 4),
+            "ms_per_query": round(elapsed / n_queries * 1000, 3),
+            "first_stage_mb": round(code_bytes / 1024 / 1024, 2),
+        }
+    return report
+
+
+def run_db(n_queries, k):
+    from app import database
+
+    conn = database.get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT embedding::text FROM complaint_normalizations WHERE embedding IS NOT NULL "
+            "ORDER BY random() LIMIT %s", (n_queries,)
+        )
+        queries = [row[0] for row in cur.fetchall()]
+    database.release_db_connection(conn)
+
+    report = {"queries": len(queries), "k": k, "results": {}}
+    for name, search in (("cases", database.search_cases_by_text), ("laws", database.search_laws_by_text)):
+        truth = [[str(r) for r in search(q, limit=k, mode="exact")] for q in queries]
+        for mode in database.SEARCH_MODES:
+            started = time.perf_counter()
+            found = [[str(r) for r in search(q, limit=k, mode=mode)] for q in queries]
+            elapsed = time.perf_counter() - started
+            hits = [len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)]
+            report["results"][f"{name}/{mode}"] = {
+                "recall@k": round(float(np.mean(hits)) if hits else 0.0, 4),
+                "ms_per_query": round(elapsed / max(len(queries), 1) * 1000, 3),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", action="store_true", help="합성 데이터 대신 실제 DB 검색 함수로 측정")
+    parser.add_argument("--n", type=int, default=50000, help="합성 코퍼스 크기")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=10, help="재정렬 후보 배수 (VECTOR_RESCORE_FACTOR)")
+    args = parser.parse_args()
+
+    result = run_db(args.queries, args.k) if args.db else run_synthetic(args.n, args.queries, args.k, args.factor)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,259 @@
+"""법령 코퍼스 수집 (law_documents / law_chunks)
+
+사용법 (ai-server 디렉터리에서, 사전에 db/migrations/000_law_corpus.sql 적용):
+    # 법령별 텍스트 파일 (파일명 = 법령명, 본문은 '제1조(목적) ...' 형식)
+    python -m data_preprocess.law_ingest laws/*.txt
+
+    # CSV 덤프 (열: 법령명/title, 조문번호/article_no, 조문내용/text)
+    python -m data_preprocess.law_ingest law_dump.csv
+
+- 조문(article_no) 단위로 자르고, 긴 조문은 MAX_CHUNK_TOKENS 이하로 다시 나눔
+- 청크별 content_hash(조문 번호 + 본문 SHA-256)가 DB 값과 같으면 임베딩/쓰기를 건너뜀
+  → 법 개정 후 다시 돌려도 바뀐 조문만 재임베딩
+- 임베딩은 EMBED_BATCH_SIZE개씩 묶어 한 번에 요청, 쓰기는 execute_values 일괄 upsert
+- 파일에서 사라진 조문의 청크는 삭제 (--keep-stale 로 유지 가능)
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from app import database
+from app.services.llm_service import LLMService, get_client
+from app.services.text_tokens import count_tokens, split_by_tokens
+
+MAX_CHUNK_TOKENS = int(os.getenv("LAW_MAX_CHUNK_TOKENS", 800))
+EMBED_BATCH_SIZE = int(os.getenv("LAW_EMBED_BATCH_SIZE", 64))
+EMBED_MAX_RETRIES = 5
+PREAMBLE_ARTICLE_NO = "본문"  # 첫 조문 앞의 텍스트(목차, 전문 등)
+
+# '제3조', '제3조의2', '제 3 조 (목적)' 등 조문 머리
+_ARTICLE_HEAD = re.compile(r"^\s*(제\s*\d+\s*조(?:\s*의\s*\d+)?)", re.MULTILINE)
+
+_CSV_COLUMNS = {
+    "title": ("title", "법령명", "law_name", "document"),
+    "article_no": ("article_no", "조문번호", "article"),
+    "text": ("text", "조문내용", "chunk_text", "content", "body"),
+}
+
+Chunk = Tuple[str, int, str, str, int]  # (article_no, chunk_index, chunk_text, content_hash, token_count)
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, encoding="utf-8-sig") as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(path, encoding="cp949") as f:
+            return f.read()
+
+
+def split_articles(text: str) -> List[Tuple[str, str]]:
+    """법령 본문을 (article_no, 조문 텍스트) 목록으로 분리"""
+    heads = list(_ARTICLE_HEAD.finditer(text))
+    articles = []
+    preamble = text[:heads[0].start()].strip() if heads else text.strip()
+    if preamble:
+        articles.append((PREAMBLE_ARTICLE_NO, preamble))
+    for i, head in enumerate(heads):
+        end = heads[i + 1].start() if i + 1 < len(heads) else len(text)
+        body = text[head.start():end].strip()
+        if body:
+            articles.append((re.sub(r"\s+", "", head.group(1)), body))
+    return _merge_duplicate_articles(articles)
+
+
+def _merge_duplicate_articles(articles: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """본문 안에서 다른 조문을 인용해 같은 번호가 다시 잡힌 경우 앞 조문에 이어 붙임"""
+    merged: Dict[str, str] = {}
+    for article_no, body in articles:
+        merged[article_no] = f"{merged[article_no]}\n{body}" if article_no in merged else body
+    return list(merged.items())
+
+
+def build_chunks(articles: List[Tuple[str, str]]) -> List[Chunk]:
+    """조문을 토큰 한도 이하 청크로 나누고 content_hash 계산"""
+    chunks = []
+    for article_no, body in articles:
+        for idx, chunk_text in enumerate(split_by_tokens(body, MAX_CHUNK_TOKENS)):
+            digest = hashlib.sha256(f"{article_no}\n{chunk_text}".encode("utf-8")).hexdigest()
+            chunks.append((article_no, idx, chunk_text, digest, count_tokens(chunk_text)))
+    return chunks
+
+
+def load_documents(paths: List[str]) -> Dict[str, Tuple[str, List[Tuple[str, str]]]]:
+    """입력 파일들을 {법령명: (원본 경로, 조문 목록)}으로 읽음"""
+    documents = {}
+    for path in paths:
+        if path.lower().endswith(".csv"):
+            for title, articles in _load_csv(path).items():
+                documents[title] = (path, articles)
+        else:
+            title = os.path.splitext(os.path.basename(path))[0]
+            documents[title] = (path, split_articles(_read_text(path)))
+    return documents
+
+
+def _load_csv(path: str) -> Dict[str, List[Tuple[str, str]]]:
+    try:
+        df = pd.read_csv(path, encoding="utf-8-sig", dtype=str)
+    except UnicodeDecodeError:
+        df = pd.read_csv(path, encoding="cp949", dtype=str)
+
+    rename = {}
+    for target, aliases in _CSV_COLUMNS.items():
+        for col in df.columns:
+            if col.strip() in aliases:
+                rename[col] = target
+                break
+    df = df.rename(columns=rename)
+    if "title" not in df.columns or "text" not in df.columns:
+        raise ValueError(f"{path}: 법령명(title)과 조문내용(text) 열이 필요합니다. (현재 열: {list(df.columns)})")
+    df = df.dropna(subset=["title", "text"])
+
+    result = {}
+    for title, group in df.groupby("title", sort=False):
+        if "article_no" in group.columns:
+            articles = [
+                (re.sub(r"\s+", "", str(no)) if pd.notna(no) and str(no).strip() else PREAMBLE_ARTICLE_NO, text)
+                for no, text in zip(group["article_no"], group["text"])
+            ]
+            result[title] = _merge_duplicate_articles(articles)
+        else:
+            # 조문 번호 열이 없으면 본문을 이어 붙여 조문 머리로 분리
+            result[title] = split_articles("\n".join(group["text"]))
+    return result
+
+
+def embed_batch(texts: List[str], model: str) -> List[List[float]]:
+    """한 번의 API 요청으로 여러 청크 임베딩 (rate limit 등 오류 시 지수 백오프 재시도)"""
+    for attempt in range(EMBED_MAX_RETRIES):
+        try:
+            response = get_client().embeddings.create(input=texts, model=model, dimensions=1024)
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES - 1:
+                raise
+            wait = 2 ** attempt
+            print(f"⚠️ 임베딩 요청 실패 ({e!r}), {wait}초 후 재시도")
+            time.sleep(wait)
+
+
+def _get_or_create_document(cur, title: str, source_path: str) -> int:
+    cur.execute("SELECT id FROM law_documents WHERE title = %s ORDER BY id LIMIT 1", (title,))
+    row = cur.fetchone()
+    if row:
+        cur.execute("UPDATE law_documents SET source_path = %s WHERE id = %s", (source_path, row[0]))
+        return row[0]
+    cur.execute("INSERT INTO law_documents (title, source_path) VALUES (%s, %s) RETURNING id", (title, source_path))
+    return cur.fetchone()[0]
+
+
+def ingest_document(conn, title: str, source_path: str, articles: List[Tuple[str, str]],
+                    model: str, keep_stale: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """법령 하나를 수집 (문서 단위 트랜잭션)
+
+    Returns:
+        dict: total / unchanged / embedded / deleted 청크 수
+    """
+    chunks = build_chunks(articles)
+    with conn.cursor() as cur:
+        document_id = _get_or_create_document(cur, title, source_path)
+        cur.execute(
+            "SELECT article_no, chunk_index, content_hash, embedding IS NOT NULL FROM law_chunks WHERE document_id = %s",
+            (document_id,),
+        )
+        existing = {(r[0], r[1]): (r[2], r[3]) for r in cur.fetchall()}
+
+        changed = [c for c in chunks if existing.get((c[0], c[1])) != (c[3], True)]
+        current_keys = {(c[0], c[1]) for c in chunks}
+        stale = [key for key in existing if key not in current_keys]
+
+        if dry_run:
+            conn.rollback()
+            return {"total": len(chunks), "unchanged": len(chunks) - len(changed),
+                    "embedded": len(changed), "deleted": 0 if keep_stale else len(stale)}
+
+        for start in range(0, len(changed), EMBED_BATCH_SIZE):
+            batch = changed[start:start + EMBED_BATCH_SIZE]
+            vectors = embed_batch([c[2].replace("\n", " ") for c in batch], model)
+            execute_values(
+                cur,
+                """
+                INSERT INTO law_chunks (document_id, article_no, chunk_index, chunk_text, content_hash, token_count, embedding)
+                VALUES %s
+                ON CONFLICT (document_id, article_no, chunk_index) DO UPDATE
+                SET chunk_text = EXCLUDED.chunk_text,
+                    content_hash = EXCLUDED.content_hash,
+                    token_count = EXCLUDED.token_count,
+                    embedding = EXCLUDED.embedding,
+                    updated_at = now()
+                """,
+                [(document_id, c[0], c[1], c[2], c[3], c[4], str(vec)) for c, vec in zip(batch, vectors)],
+                template="(%s, %s, %s, %s, %s, %s, %s::vector)",
+            )
+
+        deleted = 0
+        if stale and not keep_stale:
+            execute_values(
+                cur,
+                """
+                DELETE FROM law_chunks lc
+                USING (VALUES %s) AS s(document_id, article_no, chunk_index)
+                WHERE lc.document_id = s.document_id AND lc.article_no = s.article_no
+                  AND lc.chunk_index = s.chunk_index
+                """,
+                [(document_id, article_no, idx) for article_no, idx in stale],
+                template="(%s::bigint, %s, %s::int)",
+            )
+            deleted = len(stale)
+
+        if changed or deleted:
+            cur.execute("UPDATE law_documents SET updated_at = now() WHERE id = %s", (document_id,))
+    conn.commit()
+    return {"total": len(chunks), "unchanged": len(chunks) - len(changed), "embedded": len(changed), "deleted": deleted}
+
+
+def run(paths: List[str], keep_stale: bool = False, dry_run: bool = False, model: Optional[str] = None):
+    documents = load_documents(paths)
+    model = model or LLMService().embed_model
+    print(f"📚 법령 {len(documents)}건 수집 시작 (모델: {model}, 청크 최대 {MAX_CHUNK_TOKENS}토큰)")
+
+    conn = database.get_db_connection()
+    if conn is None:
+        sys.exit(1)
+    totals = {"total": 0, "unchanged": 0, "embedded": 0, "deleted": 0}
+    try:
+        for title, (source_path, articles) in documents.items():
+            try:
+                stats = ingest_document(conn, title, source_path, articles, model, keep_stale, dry_run)
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ [{title}] 수집 실패: {e!r}")
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+            print(f"  - {title}: 청크 {stats['total']}개 (변경 없음 {stats['unchanged']}, "
+                  f"임베딩 {stats['embedded']}, 삭제 {stats['deleted']})")
+    finally:
+        database.release_db_connection(conn)
+
+    mode = " [dry-run]" if dry_run else ""
+    print(f"✅ 완료{mode}: 청크 {totals['total']}개 중 {totals['embedded']}개 임베딩, "
+          f"{totals['unchanged']}개 건너뜀, {totals['deleted']}개 삭제")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="법령 텍스트 파일(.txt) 또는 CSV 덤프")
+    parser.add_argument("--keep-stale", action="store_true", help="입력에서 사라진 조문 청크를 삭제하지 않음")
+    parser.add_argument("--dry-run", action="store_true", help="DB를 바꾸지 않고 재임베딩 대상 수만 출력")
+    parser.add_argument("--model", default=None, help="임베딩 모델 (기본: LLMService.embed_model)")
+    args = parser.parse_args()
+    run(args.paths, args.keep_stale, args.dry_run, args.model)
@@ -1,26 +1,68 @@
-from fastapi import FastAPI, HTTPException, Request
-from openai import OpenAI
-from pydantic import BaseModel
-from app import database
-from app.services.llm_service import LLMService
-from fastapi.middleware.cors import CORSMiddleware
-import requests
-import os
-import uuid
+import time
+
+# 콜드 스타트 측정 기준점 (무거운 import 이전에 기록)
+_PROCESS_START = time.perf_counter()
+
+import asyncio
+import json
 import os
 import re
-import json
 import uuid
+from contextlib import asynccontextmanager
+
 import requests
-import textwrap
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from datetime import datetime
-from sqlalchemy import Integer, create_engine, Column, BigInteger, String, Text, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.dialects.postgresql import JSONB
+from typing import Optional
+
+from app import database
+from app.services.conversation_memory import ConversationMemory
+from app.services.llm_scheduler import Priority, SchedulerRejected, scheduler
+from app.services.llm_service import LLMService, get_client, close_client
+from app.services.resilience import Deadline, AI_CHAT_DEADLINE_SECONDS
+
+# 기동 시 벡터 인덱스/캐시 선로딩 여부 (0이면 커넥션 풀만 열고 바로 ready)
+WARMUP_PRELOAD = os.getenv("WARMUP_PRELOAD", "1") == "1"
+
+
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 5))
+
 
-app = FastAPI(title="Complaint Analyzer AI")
+async def _warm_up(app: FastAPI):
+    """DB 커넥션/인덱스, OpenAI 클라이언트를 미리 데운 뒤 ready 표시 (실패 시 재시도)"""
+    while True:
+        try:
+            await asyncio.to_thread(database.warm_up, WARMUP_PRELOAD)
+            get_client()
+            break
+        except Exception as e:
+            print(f"⚠️ [Warm-up] 실패, {WARMUP_RETRY_SECONDS}초 후 재시도: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    app.state.warmup_seconds = round(time.perf_counter() - _PROCESS_START, 3)
+    app.state.ready = True
+    print(f"✅ [Warm-up] 완료 - 프로세스 시작 후 {app.state.warmup_seconds}초")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warmup_seconds = None
+    app.state.http = requests.Session()
+    try:
+        database.init_pool()
+    except Exception as e:
+        print(f"⚠️ DB 커넥션 풀 생성 실패 (요청마다 직접 연결): {e}")
+    warmup_task = asyncio.create_task(_warm_up(app))
+    yield
+    warmup_task.cancel()
+    app.state.http.close()
+    close_client()
+    database.close_pool()
+
+
+app = FastAPI(title="Complaint Analyzer AI", lifespan=lifespan)
 
 
 # (CORS 설정)
@@ -33,36 +75,39 @@ app.add_middleware(
 )
 
 my_ai_bot = LLMService()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def get_embedding(text: str):
-    try:
-        response = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text,
-            dimensions=1024
-        )
-
-        embedding_vector = response.data[0].embedding
-
-        # 디버깅용 차원 확인
-        print(f"임베딩된 차원: {len(embedding_vector)}")
+chat_memory = ConversationMemory(my_ai_bot)
 
-        return embedding_vector
-
-    except Exception as e:
-        print(f"OpenAI Embedding Error: {e}")
-        return None
+def _rejected_response(e: SchedulerRejected) -> JSONResponse:
+    """LLM 스케줄러 거절을 429/503 + Retry-After로 변환"""
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"status": "error", "message": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-# 테스트
+# 테스트 (liveness)
 @app.get("/")
 async def root():
     return {"message": "서버 연결 성공 "}
 
+# readiness: warm-up이 끝나야 200
+@app.get("/ready")
+async def ready():
+    uptime = round(time.perf_counter() - _PROCESS_START, 3)
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "uptime_seconds": uptime})
+    return {"status": "ready", "warmup_seconds": app.state.warmup_seconds, "uptime_seconds": uptime}
+
+# LLM 스케줄러 대기열/대기 시간 지표
+@app.get("/metrics/llm-scheduler")
+async def llm_scheduler_metrics():
+    return scheduler.metrics()
+
 # 요청 데이터 구조 정의
 class ChatRequest(BaseModel):
     query: str = None
     action: str = "chat"
+    district_id: Optional[int] = None  # 없으면 민원 ID로 조회 (스케줄러 공정성 키)
 
 
 # --- AI 초안 작성 엔드포인트 ---
@@ -76,35 +121,54 @@ async def generate_draft_endpoint(complaint_id: int, request: ChatRequest):
         # request.query가 비어있으면 DB에서 직접 조회하는 로직을 추가해도 됨
         # 여기서는 프론트가 보내준다고 가정
         user_complaint_body = request.query
+        district_id = request.district_id or database.get_complaint_district(complaint_id)
 
-        result_text = await my_ai_bot.generate_draft(complaint_id, user_complaint_body)
+        result_text = await my_ai_bot.generate_draft(complaint_id, user_complaint_body, district_id)
 
         return {"status": "success", "data": result_text}
 
+    except SchedulerRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         print(f"Error generating draft: {e}")
         return {"status": "error", "message": str(e)}
 
 # --- 통합 AI 채팅 엔드포인트 ---
 @app.post("/api/complaints/{complaint_id}/ai-chat")
-async def chat_with_ai(complaint_id: int, request: ChatRequest):
+async def chat_with_ai(complaint_id: int, request: ChatRequest, background_tasks: BackgroundTasks):
+    # 요청 단위 마감 (검색 -> 생성 전 단계에 전달, 임박하면 검색 결과만 반환)
+    deadline = Deadline(AI_CHAT_DEADLINE_SECONDS)
     try:
+        district_id = request.district_id or database.get_complaint_district(complaint_id)
+
         # (1) 사용자 질문 저장 (버튼 클릭 등 query가 있을 때만)
+        user_log_id = None
         if request.query:
-            database.save_chat_log(complaint_id, "user", request.query)
+            user_log_id = database.save_chat_log(complaint_id, "user", request.query)
+
+        # (2) 이전 대화 (누적 요약 + 최근 N턴, 일반 채팅만)
+        history = []
+        if request.action == "chat":
+            history = await asyncio.to_thread(chat_memory.load, complaint_id, user_log_id)
 
-        # (2) AI 응답 생성
+        # (3) AI 응답 생성
         result = await my_ai_bot.generate_response(
             complaint_id=complaint_id,
             user_query=request.query,
-            action=request.action
+            action=request.action,
+            district_id=district_id,
+            deadline=deadline,
+            history=history
         )
 
-        # (3) AI 답변 저장
+        # (4) AI 답변 저장 후 응답과 별개로 요약 갱신
         if result and "answer" in result:
             database.save_chat_log(complaint_id, "assistant", result["answer"])
+            background_tasks.add_task(chat_memory.update, complaint_id, district_id)
 
         return {"status": "success", "data": result}
+    except SchedulerRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         print(f"Error: {e}")
         return {"status": "error", "message": str(e)}
@@ -161,8 +225,9 @@ async def preprocess_complaint(req: ComplaintRequest, request: Request):
         payload["session_id"] = str(uuid.uuid4())
         headers = {"x-api-key": api_key}
 
-        # Send API request
-        response = requests.request("POST", url, json=payload, headers=headers)
+        # Send API request (Langflow도 같은 OpenAI 한도를 쓰므로 스케줄러 슬롯 안에서 호출)
+        async with scheduler.slot(Priority.INTERACTIVE, req.districtId):
+            response = await asyncio.to_thread(app.state.http.post, url, json=payload, headers=headers)
         response.raise_for_status()
         
         # 4. 결과 파싱 (Langflow 응답 구조에서 텍스트만 추출)
@@ -182,8 +247,10 @@ async def preprocess_complaint(req: ComplaintRequest, request: Request):
             
             # 3. 임베딩 생성 호출
             if text_to_embed.strip():
-                embedding_vector = get_embedding(text_to_embed)
+                embedding_vector = await my_ai_bot.get_embedding(text_to_embed, Priority.INTERACTIVE, req.districtId) or None
                 print(f"임베딩 생성 완료 (차원: {len(embedding_vector)})")
+        except SchedulerRejected:
+            raise
         except Exception as parse_err:
             print(f"임베딩 처리 중 파싱 오류: {parse_err}")
 
@@ -194,6 +261,8 @@ async def preprocess_complaint(req: ComplaintRequest, request: Request):
             "embedding": embedding_vector  # Java의 double[]로 매핑됨
         }
         
+    except SchedulerRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         print(f"처리 중 오류 발생: {str(e)}")
         return {
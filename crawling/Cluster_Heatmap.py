@@ -1,91 +1,241 @@
-import psycopg2
-import pandas as pd
-import numpy as np
+"""군집화 결과 2D 시각화 (PNG + 관리자 대시보드용 좌표 JSON)
+
+사용법 (crawling 디렉터리에서):
+    python Cluster_Heatmap.py                 # 캐시된 좌표 재사용, 새 민원만 투영
+    python Cluster_Heatmap.py --refresh       # 전체 다시 계산
+
+- 1024차원 임베딩을 PCA 로 50차원까지 줄인 뒤 t-SNE (openTSNE 가 있으면 FFT 가속, 없으면 sklearn Barnes-Hut)
+- 민원 id 별 2D 좌표, PCA 모델, t-SNE 임베딩을 캐시 파일에 저장하고,
+  다음 실행에서는 캐시에 없는 민원만 기존 지도 위로 투영 (openTSNE transform, 없으면 PCA 공간 k-최근접 이웃 가중 평균)
+- 새 민원이 캐시의 REFIT_RATIO 배를 넘으면 지도를 다시 계산
+- 화면 없이 Agg 백엔드로 PNG 저장, 같은 좌표를 JSON 으로도 저장
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import warnings
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")  # 화면(display) 없이 파일로만 렌더링
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
-import json
+from sklearn.decomposition import PCA
 from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
 
-# DB 설정
-DB_CONFIG = { "host": "localhost", "dbname": "postgres", "user": "postgres", "password": "0000", "port": "5432" }
+from clustering.db import get_db_connection
+from clustering.vector_io import load_normalization_vectors
+
+try:
+    from openTSNE import TSNE as OpenTSNE
+except ImportError:  # 선택 의존성 (pip install openTSNE)
+    OpenTSNE = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, ".heatmap_cache.pkl")
+OUTPUT_PNG = os.path.join(BASE_DIR, "final_polished_result.png")
+OUTPUT_JSON = os.path.join(BASE_DIR, "cluster_coords.json")
+
+PCA_DIM = 50
+PERPLEXITY = 40
+REFIT_RATIO = 0.5      # 새 민원 수가 캐시된 민원 수의 이 비율을 넘으면 전체 재계산
+PROJECT_NEIGHBORS = 10  # openTSNE 가 없을 때 새 점 투영에 쓰는 이웃 수
+TOP_N = 20              # 색으로 강조할 상위 군집 수
+OTHERS_LABEL = "기타 (소규모 군집)"
 
-import platform
 if platform.system() == 'Darwin': plt.rc('font', family='AppleGothic')
 else: plt.rc('font', family='Malgun Gothic')
 plt.rc('axes', unicode_minus=False)
+warnings.filterwarnings('ignore')
 
-def parse_vector(val):
-    if isinstance(val, str):
-        try: return np.array(json.loads(val))
-        except: return np.zeros(1024)
-    return np.array(val) if val is not None else np.zeros(1024)
 
-def plot_final_polished():
-    conn = psycopg2.connect(**DB_CONFIG)
-    print("📥 데이터 불러오는 중...")
-    
-    sql = """
-        SELECT c.id, c.incident_id, n.embedding
-        FROM complaints c
-        JOIN complaint_normalizations n ON c.id = n.complaint_id
-        WHERE c.incident_id IS NOT NULL AND n.embedding IS NOT NULL
-    """
-    
-    import warnings
-    warnings.filterwarnings('ignore')
-    df = pd.read_sql(sql, conn)
-    conn.close()
-    
-    if df.empty: 
-        print("❌ 군집화된 데이터가 없습니다.")
-        return
+# ==========================================
+# 1. 데이터 로드
+# ==========================================
+
+def load_clustered():
+    """사건에 연결된 민원 (id, incident_id) + 임베딩 행렬"""
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql("""
+            SELECT c.id, c.incident_id, n.id as norm_id
+            FROM complaints c
+            JOIN complaint_normalizations n ON c.id = n.complaint_id
+            WHERE c.incident_id IS NOT NULL AND n.embedding IS NOT NULL
+            ORDER BY c.id, n.id
+        """, conn)
+        if df.empty:
+            return df, np.zeros((0, 0), dtype=np.float32)
+        # 임베딩은 binary COPY 로 float32 행렬에 바로 적재, 차원이 맞지 않는 행은 제외
+        matrix, valid = load_normalization_vectors(conn, df['norm_id'].values)
+    finally:
+        conn.close()
+    # 같은 민원에 정규화가 여러 개면 마지막(가장 최근 n.id) 것만
+    keep = valid & ~df['id'].duplicated(keep='last').values
+    return df[keep].reset_index(drop=True), matrix[keep]
+
+
+# ==========================================
+# 2. 좌표 계산 (캐시 + 새 민원 투영)
+# ==========================================
+
+def _fit(matrix):
+    """PCA(50) -> t-SNE 전체 계산, (pca, 축소 행렬, 2D 좌표, openTSNE 임베딩 또는 None)"""
+    pca = PCA(n_components=min(PCA_DIM, matrix.shape[0], matrix.shape[1]), random_state=42)
+    reduced = pca.fit_transform(matrix).astype(np.float32)
+    perplexity = min(PERPLEXITY, max(1, (len(reduced) - 1) // 3))
+
+    if OpenTSNE is not None:
+        embedding = OpenTSNE(perplexity=perplexity, n_jobs=-1, random_state=42).fit(reduced)
+        return pca, reduced, np.asarray(embedding, dtype=np.float32), embedding
+
+    coords = TSNE(n_components=2, perplexity=perplexity, method="barnes_hut", init="pca",
+                  random_state=42).fit_transform(reduced)
+    return pca, reduced, coords.astype(np.float32), None
+
+
+def _project(cache, reduced_new):
+    """기존 지도는 그대로 두고 새 점만 투영"""
+    if cache["embedding"] is not None:
+        return np.asarray(cache["embedding"].transform(reduced_new), dtype=np.float32)
+
+    # openTSNE 가 없으면 PCA 공간 최근접 이웃 좌표의 거리 가중 평균
+    k = min(PROJECT_NEIGHBORS, len(cache["reduced"]))
+    dist, idx = NearestNeighbors(n_neighbors=k).fit(cache["reduced"]).kneighbors(reduced_new)
+    weights = 1.0 / np.maximum(dist, 1e-6)
+    weights /= weights.sum(axis=1, keepdims=True)
+    return (cache["coords"][idx] * weights[:, :, None]).sum(axis=1).astype(np.float32)
 
-    df['vec'] = df['embedding'].apply(parse_vector)
-    
-    print("🎨 t-SNE 좌표 계산 중... (n_iter 옵션 제거)")
-    matrix = np.vstack(df['vec'].values)
-    
-    # [수정] n_iter=1000 삭제
-    tsne = TSNE(n_components=2, random_state=42, perplexity=40)
-    visual_data = tsne.fit_transform(matrix)
-    
-    df['x'] = visual_data[:, 0]
-    df['y'] = visual_data[:, 1]
-    
-    # 상위 20개 군집 강조 전략
-    top_n = 20
-    top_clusters = df['incident_id'].value_counts().nlargest(top_n).index
-    
-    def get_label(iid):
-        if iid in top_clusters:
-            return f"Cluster {iid}"
-        return "기타 (소규모 군집)"
-        
-    df['Label'] = df['incident_id'].apply(get_label)
-    df = df.sort_values('Label', ascending=(df['Label'].iloc[0] == '기타 (소규모 군집)'))
 
+def load_cache(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ 좌표 캐시를 읽지 못해 다시 계산합니다: {e}")
+        return None
+
+
+def save_cache(cache, path=CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def compute_coordinates(ids, matrix, refresh=False, cache_path=CACHE_PATH):
+    """민원 id 순서대로 2D 좌표 (캐시에 있는 민원은 재사용, 없는 민원만 투영)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    cache = None if refresh else load_cache(cache_path)
+    method = "openTSNE" if OpenTSNE is not None else "sklearn-barnes_hut"
+
+    if cache is not None and cache.get("dim") == matrix.shape[1] and cache.get("method") == method:
+        pos = pd.Index(cache["ids"]).get_indexer(ids)
+        new = pos < 0
+        if new.sum() <= REFIT_RATIO * len(cache["ids"]):
+            if new.any():
+                print(f"🧭 새 민원 {int(new.sum())}건만 기존 지도에 투영")
+                reduced_new = cache["pca"].transform(matrix[new]).astype(np.float32)
+                coords_new = _project(cache, reduced_new)
+                cache["ids"] = np.concatenate([cache["ids"], ids[new]])
+                cache["reduced"] = np.vstack([cache["reduced"], reduced_new])
+                cache["coords"] = np.vstack([cache["coords"], coords_new])
+                save_cache(cache, cache_path)
+                pos = pd.Index(cache["ids"]).get_indexer(ids)
+            else:
+                print("🧭 모든 민원 좌표를 캐시에서 재사용")
+            return cache["coords"][pos], method
+        print(f"🧭 새 민원 {int(new.sum())}건이 많아 지도를 다시 계산")
+
+    print(f"🎨 PCA({PCA_DIM}) -> t-SNE 좌표 계산 중... ({method}, {len(ids)}건)")
+    pca, reduced, coords, embedding = _fit(matrix)
+    save_cache({
+        "ids": ids, "dim": matrix.shape[1], "method": method,
+        "pca": pca, "reduced": reduced, "coords": coords, "embedding": embedding,
+    }, cache_path)
+    return coords, method
+
+
+# ==========================================
+# 3. 출력 (PNG + JSON)
+# ==========================================
+
+def label_top_clusters(df, top_n=TOP_N):
+    top_clusters = set(df['incident_id'].value_counts().nlargest(top_n).index)
+    return df['incident_id'].map(lambda iid: f"Cluster {iid}" if iid in top_clusters else OTHERS_LABEL)
+
+
+def render_png(df, path=OUTPUT_PNG):
     plt.figure(figsize=(12, 10))
-    
+
     # 기타(회색) 그리기
-    others = df[df['Label'] == "기타 (소규모 군집)"]
+    others = df[df['Label'] == OTHERS_LABEL]
     plt.scatter(others['x'], others['y'], c='#e0e0e0', s=30, label='기타 (소규모)', alpha=0.5)
-    
+
     # 메인 군집(컬러) 그리기
-    main = df[df['Label'] != "기타 (소규모 군집)"]
+    main = df[df['Label'] != OTHERS_LABEL]
     sns.scatterplot(
-        data=main, x='x', y='y', 
-        hue='Label', 
-        palette='tab20', 
+        data=main, x='x', y='y',
+        hue='Label',
+        palette='tab20',
         s=80, alpha=0.9, edgecolor='white'
     )
-    
-    plt.title('민원 데이터 군집화 최종 결과 (Top 20 이슈 강조)', fontsize=18, fontweight='bold', pad=20)
+
+    plt.title(f'민원 데이터 군집화 최종 결과 (Top {TOP_N} 이슈 강조)', fontsize=18, fontweight='bold', pad=20)
     plt.legend(bbox_to_anchor=(1.02, 1), loc='upper left', title='주요 군집 ID')
-    plt.axis('off') 
+    plt.axis('off')
     plt.tight_layout()
-    plt.savefig('final_polished_result.png', dpi=300)
-    plt.show()
-    print("✅ 저장 완료: final_polished_result.png")
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def export_json(df, method, path=OUTPUT_JSON):
+    payload = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "method": f"pca{PCA_DIM}+{method}",
+        "points": [
+            {"complaint_id": int(cid), "incident_id": int(iid), "x": round(float(x), 4), "y": round(float(y), 4),
+             "label": label}
+            for cid, iid, x, y, label in df[['id', 'incident_id', 'x', 'y', 'Label']].itertuples(index=False, name=None)
+        ],
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def plot_final_polished(refresh=False, png_path=OUTPUT_PNG, json_path=OUTPUT_JSON):
+    print("📥 데이터 불러오는 중...")
+    df, matrix = load_clustered()
+    if df.empty:
+        print("❌ 군집화된 데이터가 없습니다.")
+        return
+
+    coords, method = compute_coordinates(df['id'].values, matrix, refresh=refresh)
+    df['x'] = coords[:, 0]
+    df['y'] = coords[:, 1]
+
+    # 상위 20개 군집 강조 전략 (기타를 먼저 그려 컬러 점이 위로 오도록)
+    df['Label'] = label_top_clusters(df)
+    df = df.sort_values('Label', key=lambda s: s != OTHERS_LABEL, kind='stable')
+
+    render_png(df, png_path)
+    export_json(df, method, json_path)
+    print(f"✅ 저장 완료: {png_path} / {json_path}")
+
 
 if __name__ == "__main__":
-    plot_final_polished()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="군집화 결과 2D 시각화 (PNG + 좌표 JSON)")
+    parser.add_argument("--refresh", action="store_true", help="좌표 캐시를 무시하고 전체 다시 계산")
+    parser.add_argument("--png", default=OUTPUT_PNG, help="PNG 저장 경로")
+    parser.add_argument("--json", default=OUTPUT_JSON, help="좌표 JSON 저장 경로")
+    args = parser.parse_args()
+    plot_final_polished(refresh=args.refresh, png_path=args.png, json_path=args.json)
@@ -0,0 +1,369 @@
+"""군집화 경로 벤치마크 (합성 민원 데이터, DB 불필요)
+
+사용법 (crawling 디렉터리에서):
+    python bench_clustering.py --sizes 1000 10000 --out bench_result.json
+    python bench_clustering.py --sizes 100000 --paths daily incident
+
+합성 데이터:
+    - 임베딩: 1024차원 가우시안 혼합 (군집 중심 + 잡음, 단위 벡터), 약 10%는 어느 군집에도 속하지 않는 노이즈
+    - 키워드: Zipf 분포 어휘에서 군집별 주제어를 뽑고, 민원마다 일부 + 가끔 임의 단어
+    - core_request: 군집별 한국어 문장 틀(장소/대상/문제)에 요청 표현만 바꿔 채운 문장 (장소는 20% 확률로 다름)
+    - district_id / target_object: 군집마다 하나씩 배정
+
+경로별로 실행 시간, tracemalloc 최대 메모리, 품질(정답 군집 대비 ARI/NMI, 노이즈 비율, 실루엣)을
+JSON 한 줄씩 출력하고 --out 이 있으면 전체 결과(커밋 해시 포함)를 파일로 저장해 커밋 간 비교에 사용.
+    - daily         : clustering.daily.cluster_district (구별 DBSCAN)
+    - daily_pipeline: daily 배치 한 주기 - IncidentIndex.best_matches 병합 후 남은 민원을 run_groups 로 구별 DBSCAN
+                      (앞 70% 민원의 정답 군집을 기존 사건으로 인덱스에 넣고 뒤 30%를 처리)
+    - init          : clustering.initial.cluster_group (구 + 대상별 3단계)
+    - incident      : clustering.incident 중심점 매칭 + 미배정 DBSCAN (앞 70% 민원으로 중심점을 만들고 뒤 30%를 처리)
+
+--check-text: Level 3 텍스트 거리(kernels.text_distance)의 Dice 근사를 SequenceMatcher 와 비교
+    구 + 대상 그룹(최대 TEXT_CHECK_MAX_PAIRS 쌍)에서 근사-정확 거리 차이 범위, 재확인 후 eps 판정이 다른 쌍 수,
+    두 거리 행렬로 돌린 Level 3 DBSCAN 라벨 일치도(ARI)를 출력 (TEXT_RECHECK_MARGIN 이 차이 범위를 덮는지 확인)
+
+측정 범위: 계산만 (결과 행의 scope). DB 조회, 저장(link_complaints / save_incidents / insert_incidents),
+사건 인덱스 변경분 반영(_apply_deltas), ann 병합 모드(pgvector 쿼리)는 포함하지 않으므로
+운영 주기 시간은 여기에 DB 왕복이 더해진 값.
+"""
+import argparse
+import json
+import logging
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+
+from clustering import daily, incident, initial
+from clustering.kernels import TEXT_RECHECK_MARGIN, exact_text_distance, text_distance
+from clustering.parallel import run_groups
+from clustering.quality import cosine_silhouette, summarize_silhouette
+
+DIM = 1024
+NOISE_RATIO = 0.1
+SILHOUETTE_SAMPLE = 2000
+TEXT_CHECK_MAX_PAIRS = 200_000  # --check-text 에서 SequenceMatcher 로 계산할 최대 쌍 수
+
+_PLACES = ["역삼동", "신림동", "망원동", "상계동", "화곡동", "목동", "잠실동", "수유동", "연남동", "길음동"]
+_OBJECTS = ["가로등", "보도블록", "불법 주차", "쓰레기 무단투기", "소음", "도로 파손", "공원 벤치", "하수구 악취",
+            "현수막", "버스 정류장", "횡단보도 신호", "자전거 보관대"]
+_ISSUES = ["고장 났습니다", "파손되어 위험합니다", "계속 반복되고 있습니다", "방치되어 있습니다",
+           "밤마다 심합니다", "민원이 해결되지 않았습니다"]
+_REQUESTS = ["빠른 수리 부탁드립니다", "단속 요청합니다", "현장 확인 바랍니다", "조치해 주세요", "개선 요청드립니다"]
+_TARGETS = ["도로", "환경", "교통", "안전", "시설", "기타"]
+
+
+def make_dataset(n, seed=42, cluster_size=12, spread=0.008, vocab_size=3000, districts=25):
+    """합성 민원 n건 (정답 군집 라벨 포함, 노이즈는 -1)"""
+    rng = np.random.default_rng(seed)
+    n_noise = int(n * NOISE_RATIO)
+    n_clusters = max(1, (n - n_noise) // cluster_size)
+
+    centers = rng.normal(size=(n_clusters, DIM)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    truth = np.concatenate([rng.integers(0, n_clusters, n - n_noise), np.full(n_noise, -1)])
+    rng.shuffle(truth)
+
+    vectors = np.empty((n, DIM), dtype=np.float32)
+    member = truth >= 0
+    # float32 로 바로 생성 (100k x 1024 에서 float64 임시 행렬을 만들지 않도록)
+    vectors[member] = centers[truth[member]] + spread * rng.standard_normal((member.sum(), DIM), dtype=np.float32)
+    vectors[~member] = rng.standard_normal(((~member).sum(), DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    vocab = np.array([f"단어{i}" for i in range(vocab_size)])
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    weights /= weights.sum()
+    topic = rng.choice(vocab_size, size=(n_clusters, 4), p=weights)
+    cluster_district = rng.integers(1, districts + 1, n_clusters)
+    cluster_target = rng.integers(0, len(_TARGETS), n_clusters)
+    cluster_object = rng.integers(0, len(_OBJECTS), n_clusters)
+    cluster_issue = rng.integers(0, len(_ISSUES), n_clusters)
+    cluster_place = rng.integers(0, len(_PLACES), n_clusters)
+
+    keywords, texts, district_ids, targets = [], [], [], []
+    for label in truth:
+        if label < 0:
+            keywords.append(list(vocab[rng.choice(vocab_size, size=rng.integers(1, 5), p=weights)]))
+            texts.append(f"{rng.choice(_PLACES)} {rng.choice(_OBJECTS)} {rng.choice(_ISSUES)} {rng.choice(_REQUESTS)}")
+            district_ids.append(int(rng.integers(1, districts + 1)))
+            targets.append(_TARGETS[rng.integers(0, len(_TARGETS))])
+            continue
+        kws = list(vocab[topic[label][:rng.integers(3, 5)]])
+        if rng.random() < 0.2:
+            kws.append(str(vocab[rng.choice(vocab_size, p=weights)]))
+        keywords.append(kws)
+        # 같은 군집은 대부분 같은 장소, 요청 표현만 다름
+        place = _PLACES[cluster_place[label]] if rng.random() < 0.8 else rng.choice(_PLACES)
+        texts.append(f"{place} {_OBJECTS[cluster_object[label]]} {_ISSUES[cluster_issue[label]]} {rng.choice(_REQUESTS)}")
+        district_ids.append(int(cluster_district[label]))
+        targets.append(_TARGETS[cluster_target[label]])
+
+    return {
+        "vectors": vectors,
+        "keywords": keywords,
+        "texts": texts,
+        "district_id": np.array(district_ids),
+        "target_object": np.array(targets),
+        "truth": truth,
+    }
+
+
+# ==========================================
+# 경로별 실행 (반환: 민원별 예측 군집 라벨, 노이즈 -1)
+# ==========================================
+
+def _groups(data, keys):
+    """같은 키를 가진 행 번호 배열 목록"""
+    _, inverse = np.unique(keys, return_inverse=True, axis=0)
+    order = np.argsort(inverse, kind="stable")
+    return np.split(order, np.flatnonzero(np.diff(inverse[order])) + 1)
+
+
+def run_daily(data):
+    labels = np.full(len(data["truth"]), -1)
+    next_label = 0
+    for rows in _groups(data, data["district_id"]):
+        if len(rows) < 2:
+            continue
+        group_labels = daily.cluster_district(data["vectors"][rows], [data["keywords"][i] for i in rows])
+        clustered = group_labels >= 0
+        labels[rows[clustered]] = group_labels[clustered] + next_label
+        next_label += group_labels.max() + 1 if clustered.any() else 0
+    return labels
+
+
+def run_init(data):
+    labels = np.full(len(data["truth"]), -1)
+    next_label = 0
+    keys = np.stack([data["district_id"].astype(str), data["target_object"]], axis=1)
+    for rows in _groups(data, keys):
+        if len(rows) < 2:
+            continue
+        result = initial.cluster_group(
+            data["vectors"][rows], [data["keywords"][i] for i in rows], [data["texts"][i] for i in rows]
+        )
+        for positions, is_noise in result["parts"]:
+            if not is_noise:
+                labels[rows[positions]] = next_label
+                next_label += 1
+    return labels
+
+
+def run_incident(data, history_ratio=0.7):
+    """앞쪽 민원은 정답 군집으로 사건을 만들어 두고, 나머지를 도착 순서대로 매칭 + 미배정 DBSCAN
+
+    품질은 처리한 신규 민원에 대해서만 계산 (반환 라벨도 신규 민원 구간만 유효, 나머지는 -2)
+    """
+    n = len(data["truth"])
+    split = int(n * history_ratio)
+    truth = data["truth"]
+    kws = [incident.parse_keywords(k) for k in data["keywords"]]
+
+    history = np.flatnonzero(truth[:split] >= 0)
+    incident_ids, centroids, centroid_kws, counts = incident.member_centroids(
+        truth[history], data["vectors"][history], [kws[i] for i in history]
+    )
+    matcher = incident.CentroidMatcher(incident_ids, centroids, centroid_kws, counts)
+
+    labels = np.full(n, -2)
+    new_rows = np.arange(split, n)
+    assigned = matcher.assign(data["vectors"][new_rows], [kws[i] for i in new_rows], 0.15)
+    done = np.zeros(len(new_rows), dtype=bool)
+    for pos, incident_id, _ in assigned:
+        labels[new_rows[pos]] = incident_id
+        done[pos] = True
+
+    rest = new_rows[~done]
+    if len(rest):
+        new_labels = incident.cluster_new_incidents(data["vectors"][rest], [kws[i] for i in rest])
+        labels[rest] = new_labels + truth.max() + 1
+    return labels
+
+
+def run_daily_pipeline(data, history_ratio=0.7):
+    """daily 배치 한 주기 (DB 왕복 제외): 사건 인덱스 병합 -> 남은 민원 구별 DBSCAN
+
+    앞쪽 민원의 정답 군집을 기존 사건(대표 민원 = 군집의 첫 민원)으로 인덱스에 올리고,
+    뒤쪽 민원을 try_merge_to_existing_incidents / cluster_remaining_complaints 와 같은 순서로 처리.
+    품질은 처리한 신규 민원에 대해서만 계산 (나머지 라벨은 -2)
+    """
+    n = len(data["truth"])
+    split = int(n * history_ratio)
+    truth = data["truth"]
+
+    history = np.flatnonzero(truth[:split] >= 0)
+    _, first = np.unique(truth[history], return_index=True)
+    reps = history[first]
+    index = daily.IncidentIndex()
+    index.load(
+        [(int(truth[i]), int(data["district_id"][i]), int(i), data["keywords"][i], float("inf")) for i in reps],
+        data["vectors"][reps],
+    )
+
+    new_rows = np.arange(split, n)
+    new_df = pd.DataFrame({
+        "id": new_rows,
+        "keywords_jsonb": [data["keywords"][i] for i in new_rows],
+        "district_id": data["district_id"][new_rows],
+        "_row": new_rows,
+    })
+    labels = np.full(n, -2)
+    matches = index.best_matches(new_df, data["vectors"])
+    for complaint_id, (incident_id, _) in matches.items():
+        labels[complaint_id] = incident_id
+
+    remaining = new_df[~new_df["id"].isin(list(matches))]
+    labels[remaining["_row"].values] = -1
+    jobs = [
+        (dist_id, group["_row"].values, (list(group["keywords_jsonb"]), daily.GRAPH_MODE))
+        for dist_id, group in remaining.groupby("district_id") if len(group) > 1
+    ]
+    next_label = truth.max() + 1
+    for dist_id, group_labels in run_groups(data["vectors"], jobs, daily.cluster_district).items():
+        rows = remaining.loc[remaining["district_id"] == dist_id, "_row"].values
+        clustered = group_labels >= 0
+        labels[rows[clustered]] = group_labels[clustered] + next_label
+        next_label += group_labels.max() + 1 if clustered.any() else 0
+    return labels
+
+
+PATHS = {"daily": run_daily, "daily_pipeline": run_daily_pipeline, "init": run_init, "incident": run_incident}
+
+
+# ==========================================
+# 품질 지표
+# ==========================================
+
+def _singletons_as_noise(labels):
+    """크기 1 군집(민원 1건 사건)도 노이즈로 간주"""
+    labels = labels.copy()
+    values, counts = np.unique(labels[labels >= 0], return_counts=True)
+    labels[np.isin(labels, values[counts == 1])] = -1
+    return labels
+
+
+def quality(data, labels, seed=0):
+    mask = labels != -2
+    pred = _singletons_as_noise(labels[mask])
+    truth = data["truth"][mask]
+    # 노이즈는 각자 다른 군집으로 보고 비교 (노이즈끼리 한 군집으로 묶이지 않도록)
+    def _unique_noise(x, offset):
+        x = x.copy()
+        noise = x < 0
+        x[noise] = offset + np.arange(noise.sum())
+        return x
+    offset = max(int(pred.max(initial=0)), int(truth.max(initial=0))) + 1
+    pred_u, truth_u = _unique_noise(pred, offset), _unique_noise(truth, offset)
+
+    result = {
+        "ari": round(float(adjusted_rand_score(truth_u, pred_u)), 4),
+        "nmi": round(float(normalized_mutual_info_score(truth_u, pred_u)), 4),
+        "noise_ratio": round(float((pred < 0).mean()), 4),
+        "true_noise_ratio": round(float((truth < 0).mean()), 4),
+        "clusters": int(len(np.unique(pred[pred >= 0]))),
+    }
+
+    # 표본 점 -> 전체 군집 점 거리로 계산하는 표본 실루엣 (clustering.quality, 95% 신뢰구간 포함)
+    mean, low, high, n = summarize_silhouette(
+        cosine_silhouette(data["vectors"][mask], pred, sample_size=SILHOUETTE_SAMPLE, seed=seed)
+    )
+    if mean is not None:
+        result["silhouette"] = round(mean, 4)
+        result["silhouette_ci"] = [round(low, 4), round(high, 4)]
+    return result
+
+
+def check_text_distance(data, eps=0.25):
+    """Dice 근사 텍스트 거리 vs SequenceMatcher (Level 3 입력과 같은 구 + 대상 그룹, 큰 그룹부터)"""
+    keys = np.stack([data["district_id"].astype(str), data["target_object"]], axis=1)
+    groups = sorted((rows for rows in _groups(data, keys) if len(rows) > 1), key=len, reverse=True)
+    gaps, approx_labels, exact_labels = [], [], []
+    flips = pairs = 0
+    offset = 0
+    for rows in groups:
+        n_pairs = len(rows) * (len(rows) - 1) // 2
+        if pairs + n_pairs > TEXT_CHECK_MAX_PAIRS:
+            continue
+        texts = [data["texts"][i] for i in rows]
+        exact = exact_text_distance(texts)
+        upper = np.triu_indices(len(rows), k=1)
+        gaps.append((text_distance(texts, eps=eps, exact_recheck=False) - exact)[upper])
+        rechecked = text_distance(texts, eps=eps)
+        flips += int(((rechecked[upper] <= eps) != (exact[upper] <= eps)).sum())
+        pairs += n_pairs
+        # 그룹마다 라벨이 겹치지 않도록 offset, 노이즈는 그룹 안 위치로 각자 다른 라벨
+        for matrix, out in ((rechecked, approx_labels), (exact, exact_labels)):
+            labels = DBSCAN(eps=eps, min_samples=2, metric="precomputed").fit_predict(matrix)
+            out.append(np.where(labels >= 0, labels, len(rows) + np.arange(len(rows))) + offset)
+        offset += 2 * len(rows)
+    if not gaps:
+        return {"pairs": 0}
+    gaps = np.concatenate(gaps)
+    return {
+        "groups": len(approx_labels),
+        "pairs": pairs,
+        "margin": list(TEXT_RECHECK_MARGIN),
+        "gap_min": round(float(gaps.min()), 4),
+        "gap_max": round(float(gaps.max()), 4),
+        "gap_p99": round(float(np.percentile(np.abs(gaps), 99)), 4),
+        "decision_flips": flips,
+        "label_ari": round(float(adjusted_rand_score(np.concatenate(exact_labels), np.concatenate(approx_labels))), 4),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, paths, seed, measure_memory=True, check_text=False):
+    report = {"commit": _commit(), "seed": seed, "results": []}
+    for n in sizes:
+        data = make_dataset(n, seed=seed)
+        if check_text:
+            row = {"n": n, "path": "text_distance_check", **check_text_distance(data)}
+            report["results"].append(row)
+            print(json.dumps(row, ensure_ascii=False))
+        for name in paths:
+            started = time.perf_counter()
+            labels = PATHS[name](data)
+            wall = time.perf_counter() - started
+            row = {"n": n, "path": name, "scope": "compute", "wall_sec": round(wall, 3)}
+            if measure_memory:
+                # tracemalloc 은 실행을 느리게 하므로 시간 측정과 분리해 한 번 더 실행
+                tracemalloc.start()
+                PATHS[name](data)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                row["peak_mb"] = round(peak / 1024 / 1024, 1)
+            row.update(quality(data, labels, seed=seed))
+            report["results"].append(row)
+            print(json.dumps(row, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="전체 결과 JSON 저장 경로")
+    parser.add_argument("--no-memory", action="store_true", help="최대 메모리 측정 생략 (경로를 한 번만 실행)")
+    parser.add_argument("--check-text", action="store_true", help="Level 3 Dice 근사 vs SequenceMatcher 비교 추가")
+    args = parser.parse_args()
+
+    # 경로 내부의 진행 로그(그룹별 시간 등)는 숨김
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run(args.sizes, args.paths, args.seed, measure_memory=not args.no_memory,
+                 check_text=args.check_text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
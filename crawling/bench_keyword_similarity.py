@@ -0,0 +1,75 @@
+"""키워드 Jaccard 유사도 벤치마크 (기존 set 이중 루프 vs 희소 행렬 커널)
+
+사용법 (crawling 디렉터리에서):
+    python bench_keyword_similarity.py --sizes 500 1000 2000 4000
+
+각 크기마다 두 방식의 실행 시간과 결과 일치 여부(기존 루프 결과를 float32로 변환한 값과 비교)를 출력.
+기존 루프는 n=4000에서 수십 초가 걸리므로 --loop-max 보다 큰 크기는 커널만 측정.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from clustering.kernels import jaccard_similarity
+
+
+def loop_jaccard(keywords_list):
+    """calculate_hybrid_distance 에 있던 기존 구현 (비교 기준)"""
+    n = len(keywords_list)
+    key_sim = np.zeros((n, n))
+    keyword_sets = [set(k) if k else set() for k in keywords_list]
+    for i in range(n):
+        for j in range(i, n):
+            if i == j: key_sim[i][j] = 1.0; continue
+            u_len = len(keyword_sets[i].union(keyword_sets[j]))
+            sim = len(keyword_sets[i].intersection(keyword_sets[j])) / u_len if u_len > 0 else 0.0
+            key_sim[i][j] = key_sim[j][i] = sim
+    return key_sim
+
+
+def make_keywords(n, vocab_size=3000, seed=42):
+    """민원 키워드와 비슷한 분포 (일부 단어가 자주 등장하는 Zipf 분포, 5% 빈 리스트)"""
+    rng = np.random.default_rng(seed)
+    vocab = [f"키워드{i}" for i in range(vocab_size)]
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    weights /= weights.sum()
+    result = []
+    for _ in range(n):
+        if rng.random() < 0.05:
+            result.append([])
+            continue
+        k = rng.integers(2, 9)
+        result.append([vocab[i] for i in rng.choice(vocab_size, size=k, p=weights)])
+    return result
+
+
+def run(sizes, loop_max):
+    report = []
+    for n in sizes:
+        keywords = make_keywords(n)
+        started = time.perf_counter()
+        fast = jaccard_similarity(keywords)
+        fast_sec = time.perf_counter() - started
+        row = {"n": n, "kernel_sec": round(fast_sec, 4), "kernel_mb": round(fast.nbytes / 1024 / 1024, 1)}
+        if n <= loop_max:
+            started = time.perf_counter()
+            slow = loop_jaccard(keywords)
+            slow_sec = time.perf_counter() - started
+            row.update({
+                "loop_sec": round(slow_sec, 4),
+                "speedup": round(slow_sec / fast_sec, 1) if fast_sec > 0 else None,
+                "identical": bool(np.array_equal(slow.astype(np.float32), fast)),
+            })
+        report.append(row)
+        print(json.dumps(row, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--loop-max", type=int, default=2000, help="기존 루프를 측정할 최대 n")
+    args = parser.parse_args()
+    run(args.sizes, args.loop_max)
@@ -0,0 +1,357 @@
+"""DBSCAN eps / 병합 임계값 보정 도구 (k-거리 곡선 캐시 + knee 검출)
+
+사용법 (crawling 디렉터리에서):
+    python calibrate_eps.py propose                      # DB 최근 90일 민원으로 수준별 eps 제안
+    python calibrate_eps.py propose --synthetic 5000     # 합성 데이터 (bench_clustering) 로 확인
+    python calibrate_eps.py sweep --level daily --eps 0.10 0.12 0.15 0.18 0.20
+    python calibrate_eps.py sweep --level init_l1 --eps 0.09 0.11 0.13 --min-samples 2 3
+
+구별로 eps 후보 상한(--max-radius) 이내 이웃 쌍만 담은 희소 거리 그래프를 한 번 계산해 캐시(.eps_cache/)에 저장.
+    - propose: 그래프에서 k번째 이웃 거리 곡선(k = max(min_samples, KNEE_K))을 구해 꺾이는 점(elbow)들을 찾고,
+               노이즈 꼬리 직전의 마지막 elbow(연결 규모)를 eps 로 제안. 합성 데이터면 후보마다 ARI 도 출력
+    - sweep  : 캐시된 그래프를 eps 로 잘라 DBSCAN 만 다시 실행 (거리 재계산 없음, 수 초)
+같은 거리 정의를 쓰는 수준(daily / init_l1, incident / incident_match)은 그래프를 공유.
+데이터(민원 id)나 파라미터가 바뀌면 캐시 키가 달라져 자동으로 다시 계산.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+
+from clustering.kernels import hybrid_radius_graph, text_distance
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".eps_cache")
+DEFAULT_MAX_RADIUS = 0.35
+DEFAULT_DAYS = 90
+TEXT_SAMPLE = 3000  # Level 3 텍스트 거리는 n x n 이므로 구별 최대 이 수만큼만 표본
+# k-거리 곡선의 k (min_samples 가 더 크면 min_samples). k = min_samples - 1 = 1 이면 1-NN 거리라
+# 군집 안쪽 밀도만 보이고 군집이 이어지는 거리(연결 규모)가 드러나지 않음
+KNEE_K = 4
+KNEE_MIN_HEIGHT = 0.3   # 위쪽 구간에서 다시 찾은 elbow 를 인정할 최소 Kneedle 높이 (정규화 곡선과 현의 거리)
+KNEE_MIN_TAIL = 0.05    # elbow 위에 남은 점이 이 비율보다 적으면 더 찾지 않음 (노이즈 꼬리)
+
+# 수준별 거리 정의와 현재 값
+#   graph: 그래프 종류 (같으면 캐시 공유), current: 코드에 박힌 현재 값
+#   similarity=True 면 제안값을 1 - eps (코사인 유사도) 로 표시
+LEVELS = {
+    "daily":          {"graph": ("hybrid", 0.6, "jaccard"),  "min_samples": 2, "current": 0.15,
+                       "where": "clustering.daily.cluster_district"},
+    "init_l1":        {"graph": ("hybrid", 0.6, "jaccard"),  "min_samples": 2, "current": 0.11,
+                       "where": "clustering.initial Level 1"},
+    "init_l2":        {"graph": ("hybrid", 0.5, "jaccard"),  "min_samples": 2, "current": 0.17,
+                       "where": "clustering.initial Level 2"},
+    "init_l3":        {"graph": ("text",),                   "min_samples": 2, "current": 0.25,
+                       "where": "clustering.initial Level 3"},
+    "incident":       {"graph": ("hybrid", 0.7, "incident"), "min_samples": 1, "current": 0.13,
+                       "where": "clustering.incident.cluster_new_incidents"},
+    "incident_match": {"graph": ("hybrid", 0.7, "incident"), "min_samples": 1, "current": 0.15,
+                       "where": "clustering.incident MATCH_THRESHOLD"},
+    "daily_merge":    {"graph": ("hybrid", 1.0, "jaccard"),  "min_samples": 2, "current": 0.85,
+                       "where": "clustering.daily MERGE_THRESHOLD (코사인 유사도)", "similarity": True},
+}
+
+
+# ==========================================
+# 데이터 로드
+# ==========================================
+
+def load_db(days):
+    """최근 days 일 민원 (id, 구, 키워드, core_request) + 임베딩 행렬"""
+    from clustering.db import get_db_connection
+    from clustering.vector_io import load_normalization_vectors
+
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql_query("""
+            SELECT DISTINCT ON (n.complaint_id)
+                   n.complaint_id AS id, n.id AS norm_id, COALESCE(n.district_id, 0) AS district_id,
+                   n.keywords_jsonb, n.core_request
+            FROM complaint_normalizations n
+            JOIN complaints c ON c.id = n.complaint_id
+            WHERE c.created_at > NOW() - %(days)s * INTERVAL '1 day' AND n.embedding IS NOT NULL
+            ORDER BY n.complaint_id, n.id DESC
+        """, conn, params={"days": days})
+        vectors, valid = load_normalization_vectors(conn, df['norm_id'].values)
+    finally:
+        conn.close()
+    df = df[valid].reset_index(drop=True)
+    return df, vectors[valid], None
+
+
+def load_synthetic(n, seed):
+    """bench_clustering 합성 데이터 (정답 라벨 포함)"""
+    from bench_clustering import make_dataset
+
+    data = make_dataset(n, seed=seed)
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "district_id": data["district_id"],
+        "keywords_jsonb": data["keywords"],
+        "core_request": data["texts"],
+    })
+    return df, data["vectors"], data["truth"]
+
+
+# ==========================================
+# 이웃 그래프 (캐시)
+# ==========================================
+
+def _cache_path(graph, district_id, ids, max_radius):
+    digest = hashlib.sha1(np.sort(np.asarray(ids, dtype=np.int64)).tobytes())
+    digest.update(repr((graph, max_radius, TEXT_SAMPLE)).encode())
+    name = "_".join(str(g) for g in graph)
+    return os.path.join(CACHE_DIR, f"{name}_d{district_id}_{digest.hexdigest()[:12]}.npz")
+
+
+def _build_graph(graph, vectors, keywords, texts, max_radius):
+    """max_radius 이내 쌍 + 대각선만 담은 CSR 거리 그래프와 그래프에 포함된 행 위치"""
+    n = len(vectors)
+    if graph[0] == "text":
+        rows = np.arange(n)
+        if n > TEXT_SAMPLE:
+            rows = np.sort(np.random.default_rng(0).choice(n, size=TEXT_SAMPLE, replace=False))
+        dist = text_distance([texts[i] for i in rows], exact_recheck=False)
+        r, c = np.nonzero((dist <= max_radius) | np.eye(len(rows), dtype=bool))
+        return csr_matrix((dist[r, c].astype(np.float64), (r, c)), shape=dist.shape), rows
+
+    if graph[2] == "incident":
+        from clustering.incident import parse_keywords
+        keywords = [parse_keywords(k) for k in keywords]
+    else:
+        keywords = [k if k else [] for k in keywords]
+    _, emb_weight, keyword_mode = graph
+    return hybrid_radius_graph(vectors, keywords, eps=max_radius, emb_weight=emb_weight,
+                               keyword_mode=keyword_mode), np.arange(n)
+
+
+def district_graphs(df, vectors, graph, max_radius, refresh=False):
+    """구별 (district_id, CSR 그래프, df 행 번호) - 캐시가 있으면 읽고 없으면 계산 후 저장"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    result = []
+    for district_id, group in df.groupby('district_id'):
+        positions = group.index.to_numpy()
+        path = _cache_path(graph, district_id, group['id'].to_numpy(), max_radius)
+        if os.path.exists(path) and not refresh:
+            saved = np.load(path)
+            g = csr_matrix((saved["data"], saved["indices"], saved["indptr"]), shape=tuple(saved["shape"]))
+            result.append((district_id, g, positions[saved["rows"]]))
+            continue
+        g, rows = _build_graph(graph, vectors[positions], group['keywords_jsonb'].tolist(),
+                               group['core_request'].tolist(), max_radius)
+        np.savez_compressed(path, data=g.data, indices=g.indices, indptr=g.indptr,
+                            shape=np.array(g.shape), rows=rows)
+        result.append((district_id, g, positions[rows]))
+    return result
+
+
+# ==========================================
+# k-거리 곡선 / knee
+# ==========================================
+
+def k_distances(graph, k):
+    """행별 k번째 이웃 거리 (자기 자신 제외, max_radius 안에 k개가 없으면 inf)"""
+    out = np.full(graph.shape[0], np.inf)
+    for i in range(graph.shape[0]):
+        start, stop = graph.indptr[i], graph.indptr[i + 1]
+        others = graph.data[start:stop][graph.indices[start:stop] != i]
+        if len(others) >= k:
+            out[i] = np.partition(others, k - 1)[k - 1]
+    return out
+
+
+def _kneedle(y):
+    """오름차순 곡선 y 에서 현(첫 점-끝 점)과 가장 멀리 떨어진 점의 (위치, 높이) (Kneedle)"""
+    x = np.linspace(0.0, 1.0, len(y))
+    diff = x - (y - y[0]) / (y[-1] - y[0])
+    pos = int(np.argmax(diff))
+    return pos, float(diff[pos])
+
+
+def find_elbows(values, min_height=KNEE_MIN_HEIGHT, min_tail=KNEE_MIN_TAIL):
+    """오름차순 k-거리 곡선의 elbow 값 목록 (아래쪽부터)
+
+    반경 밖(inf) 점은 제외. 첫 elbow 를 찾은 뒤 그 위 구간에서 Kneedle 을 반복하고,
+    위 구간의 elbow 가 충분히 뚜렷하고(min_height) 그 위에 점이 min_tail 이상 남아 있을 때만 추가.
+    키워드 거리처럼 값이 계단 모양이면 첫 elbow 는 군집 안쪽(같은 키워드) 거리에서 나오므로,
+    DBSCAN 이 군집을 잇는 데 필요한 거리는 마지막 elbow 쪽이다.
+    """
+    y = np.sort(np.asarray(values, dtype=np.float64))
+    y = y[np.isfinite(y)]
+    if len(y) < 3 or y[-1] == y[0]:
+        return [float(y[-1])] if len(y) else []
+    elbows = []
+    start = 0
+    while len(y) - start >= 3 and y[-1] > y[start]:
+        pos, height = _kneedle(y[start:])
+        if elbows and height < min_height:
+            break
+        elbows.append(float(y[start + pos]))
+        start += pos + 1
+        if len(y) - start < min_tail * len(y):
+            break
+    return elbows
+
+
+def propose(df, vectors, levels, max_radius, truth=None, refresh=False):
+    report = []
+    graphs = {}
+    for level in levels:
+        spec = LEVELS[level]
+        k = max(spec["min_samples"], KNEE_K)
+        if spec["graph"] not in graphs:
+            started = time.perf_counter()
+            graphs[spec["graph"]] = district_graphs(df, vectors, spec["graph"], max_radius, refresh)
+            print(f"📐 [{level}] 이웃 그래프 {len(graphs[spec['graph']])}개 구 준비 ({time.perf_counter() - started:.1f}초)")
+
+        curves = [k_distances(g, k) for _, g, _ in graphs[spec["graph"]]]
+        per_district = {}
+        for (d, _, _), c in zip(graphs[spec["graph"]], curves):
+            elbows = find_elbows(c)
+            per_district[int(d)] = elbows[-1] if elbows else None
+        all_k = np.concatenate(curves) if curves else np.zeros(0)
+        elbows = find_elbows(all_k)
+        knees = [v for v in per_district.values() if v is not None]
+        row = {
+            "level": level,
+            "where": spec["where"],
+            "k": k,
+            "current": spec["current"],
+            # 전체 곡선의 마지막 elbow, 전체 elbow 목록, 구별 마지막 elbow 중앙값
+            "proposed": elbows[-1] if elbows else None,
+            "elbows": elbows,
+            "district_median": float(np.median(knees)) if knees else None,
+            "beyond_radius_ratio": round(float(np.mean(~np.isfinite(all_k))), 4) if len(all_k) else None,
+            "districts": per_district,
+        }
+        if truth is not None and elbows:
+            # 합성 데이터: 후보(elbow 들 + 현재 값)마다 캐시 그래프로 다시 라벨링해 ARI 확인
+            candidates = sorted(set(elbows) | {spec["current"] if not spec.get("similarity") else 1.0 - spec["current"]})
+            row["ari"] = {round(eps, 4): _label_ari(graphs[spec["graph"]], len(df), truth, eps, spec["min_samples"])
+                          for eps in candidates if eps <= max_radius}
+        if spec.get("similarity"):
+            for key in ("proposed", "district_median"):
+                if row[key] is not None:
+                    row[key] = 1.0 - row[key]
+            row["elbows"] = [1.0 - v for v in elbows]
+            row["districts"] = {d: (1.0 - v if v is not None else None) for d, v in per_district.items()}
+            if "ari" in row:
+                row["ari"] = {round(1.0 - eps, 4): v for eps, v in row["ari"].items()}
+        for key in ("proposed", "district_median"):
+            if row[key] is not None:
+                row[key] = round(row[key], 4)
+        row["elbows"] = [round(v, 4) for v in row["elbows"]]
+        report.append(row)
+        print(f"   👉 {level:15s} 현재 {spec['current']:<6} 제안 {row['proposed']} "
+              f"(elbow {row['elbows']}, 구별 중앙값 {row['district_median']}, 반경 밖 {row['beyond_radius_ratio']})")
+        if "ari" in row:
+            print(f"      ARI {row['ari']}")
+    return report
+
+
+# ==========================================
+# sweep: 캐시 그래프로 재라벨링
+# ==========================================
+
+def _cut(graph, eps):
+    """eps 이하 쌍 + 대각선만 남긴 그래프 (DBSCAN 이 빈 대각선을 이웃 없음으로 보지 않도록 대각선 유지)"""
+    coo = graph.tocoo()
+    keep = (coo.data <= eps) | (coo.row == coo.col)
+    return csr_matrix((coo.data[keep], (coo.row[keep], coo.col[keep])), shape=graph.shape)
+
+
+def _label(graphs, n, eps, min_samples):
+    """구별 캐시 그래프를 eps 로 잘라 DBSCAN, (전체 라벨, 그래프에 포함된 행 여부)"""
+    labels = np.full(n, -1)
+    covered = np.zeros(n, dtype=bool)
+    next_label = 0
+    for _, g, positions in graphs:
+        lab = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(_cut(g, eps))
+        clustered = lab >= 0
+        labels[positions[clustered]] = lab[clustered] + next_label
+        covered[positions] = True
+        next_label += int(lab.max()) + 1 if clustered.any() else 0
+    return labels, covered
+
+
+def _ari(labels, covered, truth):
+    """정답 대비 ARI (노이즈는 각자 다른 군집으로 간주)"""
+    pred = labels[covered].copy()
+    true = truth[covered].copy()
+    offset = max(int(pred.max(initial=0)), int(true.max(initial=0))) + 1
+    for arr in (pred, true):
+        noise = arr < 0
+        arr[noise] = offset + np.arange(noise.sum())
+    return round(float(adjusted_rand_score(true, pred)), 4)
+
+
+def _label_ari(graphs, n, truth, eps, min_samples):
+    labels, covered = _label(graphs, n, eps, min_samples)
+    return _ari(labels, covered, truth)
+
+
+def sweep(df, vectors, truth, level, eps_values, min_samples_values, max_radius, refresh=False):
+    spec = LEVELS[level]
+    graphs = district_graphs(df, vectors, spec["graph"], max_radius, refresh)
+    report = []
+    for min_samples in min_samples_values or [spec["min_samples"]]:
+        for eps in eps_values:
+            threshold = 1.0 - eps if spec.get("similarity") else eps
+            if threshold > max_radius:
+                print(f"⚠️ eps {threshold} 가 캐시 반경 {max_radius} 보다 큽니다. --max-radius 를 늘려 다시 계산하세요.")
+                continue
+            started = time.perf_counter()
+            labels, covered = _label(graphs, len(df), threshold, min_samples)
+
+            sizes = np.bincount(labels[covered & (labels >= 0)]) if (labels >= 0).any() else np.zeros(0, dtype=int)
+            row = {
+                "level": level, "eps": eps, "min_samples": min_samples,
+                "clusters": int((sizes > 0).sum()),
+                "noise_ratio": round(float((labels[covered] < 0).mean()), 4),
+                "largest": int(sizes.max()) if len(sizes) else 0,
+                "mean_size": round(float(sizes[sizes > 0].mean()), 2) if (sizes > 0).any() else 0.0,
+                "sec": round(time.perf_counter() - started, 3),
+            }
+            if truth is not None:
+                row["ari"] = _ari(labels, covered, truth)
+            report.append(row)
+            print(json.dumps(row, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["propose", "sweep"])
+    parser.add_argument("--levels", nargs="+", choices=list(LEVELS), default=list(LEVELS), help="propose 대상 수준")
+    parser.add_argument("--level", choices=list(LEVELS), default="daily", help="sweep 대상 수준")
+    parser.add_argument("--eps", type=float, nargs="+", default=[0.10, 0.12, 0.15, 0.18, 0.20],
+                        help="sweep 할 eps (daily_merge 는 코사인 유사도)")
+    parser.add_argument("--min-samples", type=int, nargs="+", help="sweep 할 min_samples (기본: 수준의 현재 값)")
+    parser.add_argument("--max-radius", type=float, default=DEFAULT_MAX_RADIUS, help="캐시할 이웃 거리 상한")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="DB 에서 읽을 최근 기간 (일)")
+    parser.add_argument("--synthetic", type=int, help="DB 대신 합성 데이터 n건 사용")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 그래프를 다시 계산")
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        df, vectors, truth = load_synthetic(args.synthetic, args.seed)
+    else:
+        df, vectors, truth = load_db(args.days)
+    print(f"📥 민원 {len(df)}건 / 구 {df['district_id'].nunique()}개")
+
+    if args.command == "propose":
+        result = propose(df, vectors, args.levels, args.max_radius, truth, args.refresh)
+    else:
+        result = sweep(df, vectors, truth, args.level, args.eps, args.min_samples, args.max_radius, args.refresh)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,29 @@
+"""민원 군집화 엔진 (crawling/clustering)
+
+공용 커널과 작업별 파이프라인을 한 패키지로 묶음. 성능 개선은 여기서 한 번만 하면 모든 작업에 반영된다.
+
+    kernels           : 하이브리드/키워드/텍스트 거리, 희소 이웃 그래프
+    vector_io         : pgvector binary COPY -> float32 행렬
+    store             : 사건 일괄 저장, 민원 연결, 사건 민원 수 갱신
+    parallel          : 그룹 단위 프로세스 병렬 실행기 (공유 메모리)
+    incremental_dbscan: 점 상태 기반 증분 DBSCAN
+    initial           : 초기 3단계 군집화 (구 + 대상 그룹)
+    daily             : 신규 민원 병합/군집화 + 사건 상태 동기화 (1회 실행 / 데몬)
+    incident          : 사건 중심점 매칭 기반 증분 군집화
+
+실행 (crawling 디렉터리에서):
+    python -m clustering initial [--workers N]
+    python -m clustering incremental [--pipeline daily|incident]
+    python -m clustering daemon [--mode listen|poll]
+"""
+from .db import DB_CONFIG, get_db_connection, get_engine
+from .kernels import (
+    cross_keyword_distance,
+    hybrid_radius_graph,
+    jaccard_similarity,
+    radius_neighbors,
+    text_distance,
+    use_sparse_graph,
+)
+from .store import add_incident_members, link_complaints, save_incidents
+from .vector_io import EMBEDDING_DIM, copy_vectors, load_normalization_vectors
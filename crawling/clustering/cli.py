@@ -0,0 +1,94 @@
+import argparse
+import logging
+
+from . import daily, incident, initial
+from .db import get_db_connection
+from .parallel import default_workers
+
+
+# ==========================================
+# 군집화 CLI (python -m clustering <mode>)
+# ==========================================
+#   initial     : 미연결 민원 전체 3단계 초기 군집화
+#   incremental : 신규 민원 1회 처리 (daily: 병합/군집화 + 상태 동기화, incident: 중심점 매칭)
+#   daemon      : daily 파이프라인 상주 실행 (LISTEN/NOTIFY 또는 poll)
+
+
+def _add_daily_options(parser):
+    parser.add_argument("--merge-mode", choices=["index", "ann"], default=daily.MERGE_MODE,
+                        help="index: 메모리 사건 인덱스 (기본), ann: pgvector 최근접 쿼리")
+    parser.add_argument("--workers", type=int, default=daily.CLUSTER_WORKERS,
+                        help=f"구별 군집화 프로세스 수 (기본 {daily.CLUSTER_WORKERS}, 이 서버 권장 {default_workers()})")
+    parser.add_argument("--engine", choices=["batch", "incremental"], default=daily.CLUSTER_ENGINE,
+                        help="batch: 남은 민원만 매번 DBSCAN (기본), incremental: 점 상태 기반 증분 DBSCAN")
+    parser.add_argument("--status-sync", choices=["incremental", "full"], default=daily.STATUS_SYNC,
+                        help="incremental: 변경된 사건만 상태 전환 (기본, 009 마이그레이션 필요), full: 매 주기 전체 사건 검사")
+    parser.add_argument("--rebuild-state", action="store_true",
+                        help="증분 DBSCAN 점 상태(cluster_points)를 다시 계산하고 종료")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="사건 미종결 카운터를 다시 집계하고 전체 상태 검사 후 종료")
+
+
+def _configure_daily(args):
+    daily.MERGE_MODE = args.merge_mode
+    daily.STATUS_SYNC = args.status_sync
+    daily.CLUSTER_ENGINE = args.engine
+    daily.CLUSTER_WORKERS = max(1, args.workers)
+
+
+def _run_maintenance(args):
+    """--rebuild-state / --reconcile 이면 실행하고 True"""
+    if not (args.rebuild_state or args.reconcile):
+        return False
+    conn = get_db_connection()
+    try:
+        if args.rebuild_state:
+            daily.incremental_engine.rebuild_state(conn)
+        if args.reconcile:
+            daily.reconcile_incident_counts(conn)
+    finally:
+        conn.close()
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m clustering", description="민원 군집화 엔진")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_initial = sub.add_parser("initial", help="초기 민원 군집화 (구 + 대상 그룹별 3단계)")
+    p_initial.add_argument("--workers", type=int, default=default_workers(),
+                           help="그룹별 군집화 프로세스 수 (기본: 코어 수, 최대 8 / 1이면 순차 실행)")
+
+    p_incremental = sub.add_parser("incremental", help="신규 민원 1회 처리")
+    p_incremental.add_argument("--pipeline", choices=["daily", "incident"], default="daily",
+                               help="daily: 병합/구별 군집화 + 상태 동기화 (기본), incident: 사건 중심점 매칭")
+    _add_daily_options(p_incremental)
+
+    p_daemon = sub.add_parser("daemon", help="실시간 민원 군집화 데몬")
+    p_daemon.add_argument("--mode", dest="run_mode", choices=["listen", "poll"], default="listen",
+                          help="listen: NOTIFY 기반 (기본), poll: CHECK_INTERVAL초마다 조회")
+    _add_daily_options(p_daemon)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+
+    if args.mode == "initial":
+        initial.run_initial_clustering(workers=max(1, args.workers))
+        return 0
+
+    _configure_daily(args)
+    if _run_maintenance(args):
+        return 0
+
+    if args.mode == "incremental":
+        if args.pipeline == "incident":
+            incident.run_incremental_clustering()
+        else:
+            daily.run_daily_job()
+        return 0
+
+    daily.run_daemon(args.run_mode)
+    return 0
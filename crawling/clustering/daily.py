@@ -0,0 +1,819 @@
+import psycopg2
+import psycopg2.extensions
+import psycopg2.errors
+import pandas as pd
+import numpy as np
+import time
+import logging
+import select
+import sys
+import warnings
+from datetime import datetime
+from sklearn.cluster import DBSCAN
+from sklearn.metrics.pairwise import cosine_similarity
+from psycopg2.extras import execute_values
+
+from .kernels import hybrid_radius_graph, jaccard_similarity, text_distance, use_sparse_graph
+from .store import add_incident_members, link_complaints, save_incidents
+from .db import get_db_connection, get_engine
+from .incremental_dbscan import IncrementalDBSCAN
+from .parallel import run_groups
+from .quality import QualityAccumulator, save_run
+from .vector_io import load_normalization_vectors
+
+# 경고 메시지 숨기기
+warnings.filterwarnings("ignore")
+
+# ==========================================
+# 1. 설정
+# ==========================================
+
+CHECK_INTERVAL = 10  # 실행 주기 (초, poll 모드)
+
+# listen 모드 (LISTEN/NOTIFY, db/migrations/006_complaint_normalized_notify.sql 필요)
+NOTIFY_CHANNEL = "complaint_normalized"
+DEBOUNCE_SECONDS = 2         # 마지막 알림 후 이 시간 동안 조용하면 배치 실행
+MAX_BATCH_WAIT_SECONDS = 10  # 알림이 계속 와도 첫 알림 후 이 시간 안에는 실행
+FALLBACK_POLL_SECONDS = 300  # 놓친 알림 대비 전체 조회 주기
+RECONNECT_SECONDS = 5
+# 신규 군집화 거리 행렬: dense(n x n) / sparse(eps 이내 이웃 쌍만) / auto(큰 구만 sparse)
+GRAPH_MODE = "auto"
+# 신규 군집화 엔진: batch(매 주기 남은 민원만 DBSCAN) / incremental(cluster_points 상태 기반 증분 DBSCAN)
+# incremental 은 db/migrations/007_cluster_points.sql 적용 후 --rebuild-state 1회 실행 필요
+CLUSTER_ENGINE = "batch"
+# incremental 엔진 점 상태(이웃 수) 재구성 주기 (데몬만). 이웃 수는 더하기만 하므로 창 밖으로 나간 점을 빼기 위해 필요
+STATE_REBUILD_SECONDS = 6 * 3600
+# 구별 군집화 프로세스 수 (1이면 현재 프로세스에서 순서대로, --workers 로 변경)
+CLUSTER_WORKERS = 1
+# 신규 군집화 품질(clustering_runs) 기록 주기 (데몬만). 배치마다 기록하지 않고 이 구간의 배치를 합쳐 1행
+QUALITY_FLUSH_SECONDS = 3600
+
+# 기존 사건 인덱스 (병합 후보: 최근 INDEX_WINDOW_DAYS일 내 생성된 사건)
+INDEX_WINDOW_DAYS = 30
+INDEX_FULL_RELOAD_SECONDS = 3600  # 주기적 전체 재로딩 (외부 수정/삭제 보정)
+INDEX_WATERMARK_LAG_SECONDS = 60  # 늦게 커밋된 연결을 놓치지 않도록 변경분 조회 구간을 겹침
+
+# 병합 후보 탐색: index(메모리 사건 인덱스, 사건별 대표 민원과 비교) / ann(pgvector 최근접 쿼리, 소속 민원 top-k)
+MERGE_MODE = "index"
+MERGE_THRESHOLD = 0.85
+MERGE_ANN_TOP_K = 20       # 신규 민원마다 DB에서 받아올 최근접 사건 소속 민원 수
+MERGE_ANN_EF_SEARCH = 100  # HNSW 탐색 후보 수 (LIMIT 보다 커야 함)
+
+# 사건 상태 동기화: incremental(트리거 카운터 + 변경 큐, db/migrations/009_incident_open_counts.sql 필요) / full(매 주기 전체 사건 검사)
+STATUS_SYNC = "incremental"
+STATUS_RECONCILE_SECONDS = 3600  # 카운터 재집계 + 전체 상태 검사 주기 (트리거 밖 수정 보정)
+
+# ==========================================
+# 2. 거리 계산 로직
+# ==========================================
+
+def calculate_hybrid_distance(embeddings, keywords_list, alpha=0.6):
+    n = len(embeddings)
+    if n == 0: return np.zeros((0, 0), dtype=np.float32)
+    
+    emb_sim = cosine_similarity(np.asarray(embeddings, dtype=np.float32))
+    key_sim = jaccard_similarity(keywords_list)  # 희소 행렬곱 기반 Jaccard (float32)
+            
+    dist = 1 - ((emb_sim * alpha) + (key_sim * (1 - alpha)))
+    dist[dist < 0] = 0
+    return dist
+
+def calculate_text_distance(texts, eps=0.25):
+    return text_distance(texts, eps=eps)
+
+# ==========================================
+# 3. 핵심 로직: 병합 & 신규 생성
+# ==========================================
+
+class IncidentIndex:
+    """최근 30일 사건의 대표 벡터/키워드/구를 메모리에 유지 (데몬 수명 동안 재사용)
+
+    - 대표 민원: 사건별 가장 먼저 접수된 민원 (기존 drop_duplicates 방식과 동일)
+    - 처음 한 번 전체 로드 후에는 매 주기 변경분만 반영
+        * incident_linked_at 이 워터마크 이후인 민원의 사건 (신규 병합/생성, 재연결)
+        * 마지막으로 본 id 보다 큰 신규 사건
+        * opened_at + 30일이 지난 사건은 메모리에서 제거 (DB 조회 없음)
+    - INDEX_FULL_RELOAD_SECONDS 마다 전체 재로딩으로 누락분(삭제, 외부 수정 등) 보정
+    """
+
+    _SELECT = """
+        SELECT DISTINCT ON (i.id)
+               i.id AS incident_id, i.district_id, n.id AS norm_id, n.keywords_jsonb,
+               EXTRACT(EPOCH FROM (i.opened_at + INTERVAL '{days} days' - NOW())) AS ttl_seconds
+        FROM incidents i
+        JOIN complaints c ON c.incident_id = i.id
+        JOIN complaint_normalizations n ON n.complaint_id = c.id
+        WHERE i.opened_at > NOW() - INTERVAL '{days} days' {{where}}
+        -- 종결된 사건(CLOSED)도 병합 대상에 포함 (병합 시 상태를 OPEN으로 바꿈)
+        ORDER BY i.id, c.created_at ASC
+    """.format(days=INDEX_WINDOW_DAYS)
+
+    def __init__(self):
+        self.entries = {}          # incident_id -> (district_id, 정규화 벡터, 키워드 set, 만료 시각(monotonic))
+        self.max_incident_id = 0
+        self.linked_since = None   # DB 기준 워터마크 (incident_linked_at)
+        self.loaded_at = None
+        self._by_district = None   # district_id -> (incident_ids, 벡터 행렬, 키워드 리스트), 변경 시 재구성
+
+    def refresh(self, conn):
+        """전체 로드(최초/주기) 또는 변경분 반영"""
+        now = time.monotonic()
+        if self.loaded_at is None or now - self.loaded_at > INDEX_FULL_RELOAD_SECONDS:
+            self._full_load(conn)
+            return
+        self._expire(now)
+        self._apply_deltas(conn)
+
+    def _full_load(self, conn):
+        with conn.cursor() as cur:
+            cur.execute("SELECT NOW(), COALESCE(MAX(id), 0) FROM incidents")
+            db_now, max_id = cur.fetchone()
+            cur.execute(self._SELECT.format(where=""))
+            rows = cur.fetchall()
+        vectors, _ = load_normalization_vectors(conn, [r[2] for r in rows])
+        conn.commit()
+        self.load(rows, vectors)
+        self.max_incident_id = max_id
+        self.linked_since = db_now
+        self.loaded_at = time.monotonic()
+        logging.info(f"📇 [사건 인덱스] 전체 로드: 사건 {len(self.entries)}개")
+
+    def load(self, rows, vectors):
+        """조회 결과 rows(_SELECT 열 순서)와 임베딩으로 인덱스 전체 교체 (DB 조회 없음)"""
+        self.entries = {}
+        self._by_district = None
+        self._upsert(rows, vectors)
+
+    def _apply_deltas(self, conn):
+        with conn.cursor() as cur:
+            # 트랜잭션 시작 시각(NOW())으로 기록된 연결을 놓치지 않도록 워터마크를 여유 있게 겹침
+            cur.execute("""
+                SELECT NOW(), COALESCE(MAX(id), %(max_id)s) FROM incidents WHERE id > %(max_id)s
+            """, {"max_id": self.max_incident_id})
+            db_now, max_id = cur.fetchone()
+            cur.execute("""
+                SELECT DISTINCT incident_id FROM complaints
+                WHERE incident_linked_at > %(since)s - %(lag)s * INTERVAL '1 second' AND incident_id IS NOT NULL
+                UNION
+                SELECT id FROM incidents WHERE id > %(max_id)s
+            """, {"since": self.linked_since, "lag": INDEX_WATERMARK_LAG_SECONDS, "max_id": self.max_incident_id})
+            changed = [r[0] for r in cur.fetchall()]
+            rows = []
+            if changed:
+                cur.execute(self._SELECT.format(where="AND i.id = ANY(%s)"), (changed,))
+                rows = cur.fetchall()
+        vectors, _ = load_normalization_vectors(conn, [r[2] for r in rows])
+        conn.commit()
+
+        self.max_incident_id = max_id
+        self.linked_since = db_now
+        if not changed:
+            return
+        # 조건(30일, 소속 민원)을 더 이상 만족하지 않는 사건은 제거
+        for iid in set(changed) - {r[0] for r in rows}:
+            if self.entries.pop(iid, None) is not None:
+                self._by_district = None
+        self._upsert(rows, vectors)
+        logging.info(f"📇 [사건 인덱스] 변경 사건 {len(rows)}개 반영 (총 {len(self.entries)}개)")
+
+    def _upsert(self, rows, vectors):
+        """rows[k] 의 임베딩은 vectors[k] (load_normalization_vectors 결과, float32)"""
+        now = time.monotonic()
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        for (iid, district_id, _, kws, ttl), vec in zip(rows, vectors):
+            self.entries[iid] = (district_id, vec, set(kws) if kws else set(), now + float(ttl))
+        if rows:
+            self._by_district = None
+
+    def _expire(self, now):
+        expired = [iid for iid, entry in self.entries.items() if entry[3] <= now]
+        for iid in expired:
+            del self.entries[iid]
+        if expired:
+            self._by_district = None
+            logging.info(f"📇 [사건 인덱스] 30일 경과 사건 {len(expired)}개 제외")
+
+    def candidates(self, district_id):
+        """구별 (사건 id 배열, 정규화 벡터 행렬, 키워드 set 리스트), 사건 id 오름차순"""
+        if self._by_district is None:
+            groups = {}
+            for iid in sorted(self.entries):
+                d_id, vec, kws, _ = self.entries[iid]
+                groups.setdefault(d_id, ([], [], []))
+                groups[d_id][0].append(iid)
+                groups[d_id][1].append(vec)
+                groups[d_id][2].append(kws)
+            self._by_district = {
+                d_id: (np.array(ids), np.vstack(vecs), kws) for d_id, (ids, vecs, kws) in groups.items()
+            }
+        return self._by_district.get(district_id)
+
+    def best_matches(self, new_df, vectors):
+        """민원별 최적 사건 {민원 id: (사건 id, 점수)}, 0.85 이상 + 키워드 1개 이상 공유 (DB 조회 없음)"""
+        matches = {}
+        for idx, row in new_df.iterrows():
+            my_k = set(row['keywords_jsonb']) if row['keywords_jsonb'] else set()
+            candidates = self.candidates(row['district_id'])
+            if candidates is None: continue
+            cand_ids, cand_embs, cand_kws = candidates
+
+            my_emb = vectors[row['_row']]
+            norm = np.linalg.norm(my_emb)
+            sim_scores = cand_embs @ (my_emb / norm) if norm > 0 else np.zeros(len(cand_ids), dtype=np.float32)
+
+            # 0.85 이상 + 키워드 1개 이상 공유하는 사건 중 최고점 (동점이면 id가 작은 사건)
+            passed = np.where(sim_scores >= MERGE_THRESHOLD)[0]
+            passed = [i for i in passed if my_k & cand_kws[i]]
+            if not passed: continue
+            best = passed[int(np.argmax(sim_scores[passed]))]
+            matches[row['id']] = (int(cand_ids[best]), float(sim_scores[best]))
+        return matches
+
+
+# 데몬 수명 동안 유지되는 사건 인덱스
+incident_index = IncidentIndex()
+
+# 증분 DBSCAN (신규 군집화와 같은 eps / min_samples / 가중치)
+incremental_engine = IncrementalDBSCAN(eps=0.15, min_samples=2, emb_weight=0.6, window_days=INDEX_WINDOW_DAYS)
+
+def _best_matches_from_index(conn, new_df, vectors):
+    """메모리 사건 인덱스(사건별 대표 민원)와 비교해 민원별 최적 사건 {민원 id: (사건 id, 점수)}"""
+    incident_index.refresh(conn)
+    if not incident_index.entries:
+        return {}
+
+    logging.info(f"🔍 [비교] 기존 사건 {len(incident_index.entries)}개와 유사도 분석 중...")
+    return incident_index.best_matches(new_df, vectors)
+
+# 민원별 최근접 사건 소속 민원 top-k (LATERAL 안의 ORDER BY ... LIMIT 이 HNSW 인덱스를 탐)
+# - 정렬: 001 마이그레이션의 halfvec HNSW 인덱스 (idx_cn_embedding_halfvec), 점수: 원본 vector 코사인
+# - 신규 민원 벡터는 DB 에 이미 있으므로 id 만 보냄
+_ANN_SQL = """
+    SELECT q.complaint_id, m.incident_id, m.similarity, m.keywords_jsonb
+    FROM (VALUES %s) AS q(complaint_id, norm_id, district_id)
+    JOIN complaint_normalizations qn ON qn.id = q.norm_id
+    CROSS JOIN LATERAL (
+        SELECT c.incident_id, n.keywords_jsonb, 1 - (n.embedding <=> qn.embedding) AS similarity
+        FROM complaint_normalizations n
+        JOIN complaints c ON c.id = n.complaint_id
+        JOIN incidents i ON i.id = c.incident_id
+        WHERE i.district_id = q.district_id
+          AND i.opened_at > NOW() - INTERVAL '{days} days'
+        ORDER BY n.embedding::halfvec(1024) <=> qn.embedding::halfvec(1024)
+        LIMIT {k}
+    ) m
+""".format(days=INDEX_WINDOW_DAYS, k=MERGE_ANN_TOP_K)
+
+def _best_matches_from_ann(conn, new_df):
+    """pgvector 최근접 쿼리 1회로 민원별 최적 사건 {민원 id: (사건 id, 점수)}
+
+    사건 소속 민원 중 가장 가까운 top-k 와 비교 (대표 민원 1건이 아니라 소속 민원 전체가 후보).
+    파이썬은 0.85 / 키워드 공유 규칙만 적용하므로 활성 사건 수와 무관하게 신규 민원 수에만 비례.
+    """
+    # 구 미상(NULL) 민원은 index 모드와 같이 병합 대상에서 제외 (신규 군집화에서 구 0 으로 처리)
+    rows = [
+        (int(cid), int(nid), int(did))
+        for cid, nid, did in new_df[['id', 'norm_id', 'district_id']].itertuples(index=False, name=None)
+        if not pd.isna(did)
+    ]
+    if not rows:
+        return {}
+
+    with conn.cursor() as cur:
+        # 구/기간 필터로 걸러지는 이웃이 많아도 k개를 채우도록 반복 스캔 (pgvector 0.8+, 없으면 기본 스캔)
+        cur.execute("SAVEPOINT ann_settings")
+        try:
+            cur.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+            cur.execute("SET LOCAL hnsw.ef_search = %s", (MERGE_ANN_EF_SEARCH,))
+        except psycopg2.Error:
+            cur.execute("ROLLBACK TO SAVEPOINT ann_settings")
+        # 한 문장(page_size=전체)으로 모든 신규 민원을 조회
+        found = execute_values(cur, _ANN_SQL, rows, template="(%s::bigint, %s::bigint, %s::bigint)",
+                               page_size=len(rows), fetch=True)
+
+    logging.info(f"🔍 [비교] 신규 민원 {len(rows)}건의 최근접 사건 민원 {len(found)}건 조회")
+    my_keywords = {
+        cid: set(k) if k else set() for cid, k in new_df[['id', 'keywords_jsonb']].itertuples(index=False, name=None)
+    }
+    best = {}
+    for cid, iid, sim, kws in found:
+        if sim is None or sim < MERGE_THRESHOLD: continue
+        if not (my_keywords.get(cid, set()) & set(kws or ())): continue
+        # 최고점 우선, 동점이면 id가 작은 사건
+        if cid not in best or (sim, -iid) > (best[cid][1], -best[cid][0]):
+            best[cid] = (int(iid), float(sim))
+    return best
+
+def try_merge_to_existing_incidents(conn, new_df, vectors):
+    """기존 사건과 유사하면 병합 (CLOSED된 사건이라도 유사하면 병합 후 OPEN으로 부활 가능)
+
+    new_df 의 _row 열이 vectors(float32 임베딩 행렬)의 행 번호
+    후보 탐색은 MERGE_MODE 에 따라 메모리 사건 인덱스('index') 또는 pgvector 최근접 쿼리('ann')
+    """
+    try:
+        if MERGE_MODE == "ann":
+            matches = _best_matches_from_ann(conn, new_df)
+        else:
+            matches = _best_matches_from_index(conn, new_df, vectors)
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"기존 사건 조회 중 에러: {e}")
+        return new_df
+
+    if not matches:
+        return new_df
+
+    merged = [
+        (int(complaint_id), int(best_inc_id), float(best_score))
+        for complaint_id, (best_inc_id, best_score) in matches.items()
+        if best_inc_id and best_score >= MERGE_THRESHOLD
+    ]
+    if not merged:
+        return new_df
+    merged_ids, incident_ids, scores = zip(*merged)
+
+    cursor = conn.cursor()
+    try:
+        # 1. 민원 업데이트 (UPDATE 1회)
+        link_complaints(cursor, merged_ids, incident_ids, scores)
+        # 2. 사건 업데이트 (민원 수 증가)
+        # [중요] 신규 민원이 추가되면, 혹시 종결(CLOSED)되었던 사건도 다시 대응중(OPEN)으로 바뀌어야 함
+        add_incident_members(cursor, incident_ids, reopen=True)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"  ❌ 병합 실패: {e}")
+        return new_df
+    finally:
+        cursor.close()
+
+    for complaint_id, best_inc_id, best_score in merged:
+        logging.info(f"  🔗 [병합 성공] 민원 #{complaint_id} -> 사건 #{best_inc_id} (점수: {best_score:.2f})")
+    
+    return new_df[~new_df['id'].isin(merged_ids)]
+
+def cluster_district(embeddings, keywords_list, graph_mode=GRAPH_MODE):
+    """구 하나의 DBSCAN 라벨 (parallel 워커에서도 실행되므로 DB/전역 상태를 건드리지 않음)"""
+    # 큰 구는 eps 이내 이웃 쌍만 담은 희소 그래프로 (n x n 행렬 대신)
+    if use_sparse_graph(len(embeddings), graph_mode):
+        l1_dist = hybrid_radius_graph(embeddings, keywords_list, eps=0.15, emb_weight=0.6)
+    else:
+        l1_dist = calculate_hybrid_distance(embeddings, keywords_list, alpha=0.6)
+    return DBSCAN(eps=0.15, min_samples=2, metric='precomputed').fit_predict(l1_dist)
+
+# 신규 군집화 품질 누적 (QUALITY_FLUSH_SECONDS 구간마다 clustering_runs 에 1행)
+_daily_quality = QualityAccumulator()
+_daily_quality_started = None  # 현재 구간 첫 배치의 시작 시각
+_daily_quality_batches = 0
+_quality_flush_seconds = 0  # 0 이면 배치마다 기록 (1회 실행), run_daemon 에서 설정
+
+
+def cluster_remaining_complaints(conn, df, vectors, workers=1):
+    """남은 민원을 구별로 군집화 후 한 번에 저장 (workers > 1 이면 구별 계산을 프로세스 풀에서 병렬 실행)"""
+    global _daily_quality, _daily_quality_started, _daily_quality_batches
+    if df.empty: return
+
+    logging.info(f"🧩 [신규 군집화] 남은 민원 {len(df)}건 처리 중...")
+    started_at = datetime.now()
+    cursor = conn.cursor()
+    
+    df['district_id'] = df['district_id'].fillna(0)
+    grouped = df.groupby('district_id')
+    to_save = []  # (df, is_noise) - 구별 군집화가 끝난 뒤 한 번에 저장
+    groups = {}
+    jobs = []
+
+    for dist_id, group in grouped:
+        if len(group) == 0: continue
+        
+        if len(group) == 1:
+            to_save.append((group, True))
+            continue
+
+        keywords_list = [k if k else [] for k in group['keywords_jsonb'].tolist()]
+        groups[dist_id] = group
+        jobs.append((dist_id, group['_row'].values, (keywords_list, GRAPH_MODE)))
+
+    labels = run_groups(vectors, jobs, cluster_district, workers=workers)
+
+    for dist_id, group in groups.items():
+        l1_labels = labels[dist_id]
+        for l1_lab in set(l1_labels):
+            l1_indices = np.where(l1_labels == l1_lab)[0]
+            l1_df = group.iloc[l1_indices]
+            to_save.append((l1_df, l1_lab == -1))
+
+    try:
+        created = save_incidents(cursor, to_save, title_max_len=100, keyword_count=5, empty_keywords="")
+        for inc in created[created['count'] > 1].itertuples():
+            logging.info(f"  🆕 [사건 생성] #{inc.incident_id} : {inc.title} ({inc.count}건)")
+    except Exception as e:
+        logging.error(f"  ❌ 사건 저장 실패: {e}")
+        raise
+
+    conn.commit()
+    cursor.close()
+
+    # 배치 품질 누적 (군집별 중심점 거리 / 크기 / 노이즈만, 실루엣은 배치가 작아 생략)
+    if _daily_quality_started is None:
+        _daily_quality_started = started_at
+    for part_df, is_noise in to_save:
+        if is_noise:
+            _daily_quality.add_noise(len(part_df))
+        else:
+            _daily_quality.add_cluster(vectors[part_df['_row'].values])
+    _daily_quality_batches += 1
+    if (datetime.now() - _daily_quality_started).total_seconds() >= _quality_flush_seconds:
+        save_run(conn, "daily", _daily_quality.summary(), _daily_quality_started,
+                 params={"eps": 0.15, "min_samples": 2, "graph_mode": GRAPH_MODE, "workers": workers,
+                         "batches": _daily_quality_batches})
+        _daily_quality = QualityAccumulator()
+        _daily_quality_started = None
+        _daily_quality_batches = 0
+
+# ==========================================
+# 5. [수정됨] 상태 동기화 함수 (2단계 로직)
+# ==========================================
+# 1. CLOSED (종결): 모든 민원이 'CLOSED' 또는 'CANCELED'인 경우
+# 2. OPEN (대응중): 하나라도 끝나지 않은 민원('RECEIVED', 'IN_PROGRESS' 등)이 있는 경우
+#
+# incremental 모드: 민원 상태/소속이 바뀔 때 트리거가 사건별 미종결 수(incident_complaint_counts)를 갱신하고
+# 0 을 넘나든 사건만 incident_status_queue 에 넣는다. 매 주기 큐에 있는 사건만 전환하므로
+# 비용이 변경된 민원 수에 비례. STATUS_RECONCILE_SECONDS 마다 카운터 재집계 + 전체 검사로 보정.
+
+_last_reconcile = None
+
+
+def _full_status_sync(cursor):
+    """전체 사건 대상 상태 동기화 (기존 방식), 전환된 사건 수 (closed, reopened) 반환"""
+    # 1. [종결 처리] (OPEN -> CLOSED)
+    # 조건: 현재 OPEN인데, 소속된 모든 민원이 (CLOSED or CANCELED) 상태일 때
+    cursor.execute("""
+        UPDATE incidents i
+        SET status = 'CLOSED', closed_at = NOW()
+        WHERE i.status = 'OPEN'
+        AND NOT EXISTS (
+            SELECT 1 FROM complaints c 
+            WHERE c.incident_id = i.id 
+            AND c.status NOT IN ('CLOSED', 'CANCELED')
+        )
+        AND EXISTS (SELECT 1 FROM complaints c WHERE c.incident_id = i.id)
+    """)
+    closed = cursor.rowcount
+
+    # 2. [대응중 복구] (CLOSED -> OPEN)
+    # 조건: 현재 CLOSED인데, 끝나지 않은 민원이 하나라도 생겼을 때 (재접수, 신규병합 등)
+    cursor.execute("""
+        UPDATE incidents i
+        SET status = 'OPEN', closed_at = NULL
+        WHERE i.status = 'CLOSED'
+        AND EXISTS (
+            SELECT 1 FROM complaints c 
+            WHERE c.incident_id = i.id 
+            AND c.status NOT IN ('CLOSED', 'CANCELED')
+        )
+    """)
+    return closed, cursor.rowcount
+
+
+def _queued_status_sync(cursor):
+    """큐에 쌓인 사건만 카운터 기준으로 전환, (검사한 사건 수, closed, reopened) 반환
+
+    큐에서 꺼낸 뒤 같은 트랜잭션에서 전환하므로 실패(롤백) 시 큐가 그대로 남는다.
+    """
+    cursor.execute("DELETE FROM incident_status_queue RETURNING incident_id")
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return 0, 0, 0
+
+    cursor.execute("""
+        UPDATE incidents i
+        SET status = 'CLOSED', closed_at = NOW()
+        FROM incident_complaint_counts k
+        WHERE i.id = ANY(%s) AND k.incident_id = i.id
+        AND i.status = 'OPEN' AND k.open_count = 0 AND k.total_count > 0
+    """, (ids,))
+    closed = cursor.rowcount
+
+    cursor.execute("""
+        UPDATE incidents i
+        SET status = 'OPEN', closed_at = NULL
+        FROM incident_complaint_counts k
+        WHERE i.id = ANY(%s) AND k.incident_id = i.id
+        AND i.status = 'CLOSED' AND k.open_count > 0
+    """, (ids,))
+    return len(ids), closed, cursor.rowcount
+
+
+def _recount_incidents(cursor, incident_ids):
+    """지정 사건들의 카운터를 민원 테이블 기준으로 다시 집계 (카운터 행 잠금 후 재집계)
+
+    카운터 행을 FOR UPDATE 로 잡으면 그 사건을 건드린 트랜잭션이 모두 커밋될 때까지 기다리고,
+    이후 트리거는 우리 커밋 뒤에 +-1 을 얹는다. 다음 문장의 집계는 잠금 이후 스냅샷이므로 어긋나지 않는다.
+    """
+    # 카운터 행이 없는 사건은 0 으로 만들어 두고 (동시에 트리거가 만든 행이면 그대로) 함께 잠금
+    cursor.execute("""
+        INSERT INTO incident_complaint_counts (incident_id)
+        SELECT i.id FROM incidents i WHERE i.id = ANY(%s)
+        ON CONFLICT (incident_id) DO NOTHING
+    """, (incident_ids,))
+    cursor.execute("""
+        SELECT incident_id FROM incident_complaint_counts
+        WHERE incident_id = ANY(%s)
+        ORDER BY incident_id
+        FOR UPDATE
+    """, (incident_ids,))
+    cursor.execute("""
+        UPDATE incident_complaint_counts k
+        SET total_count = a.total_count,
+            open_count  = a.open_count,
+            updated_at  = NOW()
+        FROM (
+            SELECT ids.incident_id,
+                   COUNT(c.id) AS total_count,
+                   COUNT(c.id) FILTER (WHERE c.status NOT IN ('CLOSED', 'CANCELED')) AS open_count
+            FROM unnest(%s::bigint[]) AS ids(incident_id)
+            LEFT JOIN complaints c ON c.incident_id = ids.incident_id
+            GROUP BY ids.incident_id
+        ) a
+        WHERE k.incident_id = a.incident_id
+        AND (k.total_count <> a.total_count OR k.open_count <> a.open_count)
+    """, (incident_ids,))
+    return cursor.rowcount
+
+
+def reconcile_incident_counts(conn):
+    """카운터를 민원 테이블 기준으로 다시 집계하고 전체 상태 검사 (트리거 밖 수정/누락 보정)
+
+    테이블 잠금 없이 불일치 후보만 찾고, 후보 사건의 카운터 행만 잠가 다시 집계한다.
+    전체 상태 검사는 별도 트랜잭션으로 실행하므로 재집계 동안 민원 쓰기가 막히지 않는다.
+    """
+    cursor = conn.cursor()
+    try:
+        # 1. 불일치 후보 (잠금 없음, 동시 변경 때문에 실제로는 맞는 사건이 섞일 수 있음 -> 2에서 다시 확인)
+        cursor.execute("""
+            WITH actual AS (
+                SELECT c.incident_id,
+                       COUNT(*) AS total_count,
+                       COUNT(*) FILTER (WHERE c.status NOT IN ('CLOSED', 'CANCELED')) AS open_count
+                FROM complaints c
+                JOIN incidents i ON i.id = c.incident_id
+                GROUP BY c.incident_id
+            )
+            SELECT COALESCE(a.incident_id, k.incident_id)
+            FROM actual a
+            FULL JOIN incident_complaint_counts k ON k.incident_id = a.incident_id
+            WHERE k.incident_id IS NULL
+               OR COALESCE(a.total_count, 0) <> k.total_count
+               OR COALESCE(a.open_count, 0) <> k.open_count
+        """)
+        candidates = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+
+        # 2. 후보 사건만 행 잠금 후 재집계 (짧은 트랜잭션)
+        if candidates:
+            fixed = _recount_incidents(cursor, candidates)
+            conn.commit()
+            if fixed:
+                logging.warning(f"  🧮 [상태 재집계] 카운터 불일치 {fixed}개 사건 보정")
+
+        # 3. 전체 상태 검사 (별도 트랜잭션)
+        # 큐를 먼저 비운 뒤 검사하므로, 검사 이후 커밋된 변경으로 들어온 큐 항목은 남아 다음 주기에 처리됨
+        cursor.execute("DELETE FROM incident_status_queue")
+        closed, reopened = _full_status_sync(cursor)
+        if closed or reopened:
+            logging.info(f"  🧮 [상태 재집계] 종결 {closed}개 / 복구 {reopened}개 사건 전환")
+        conn.commit()
+    except Exception as e:
+        logging.error(f"상태 재집계 중 에러: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def sync_incident_status(conn):
+    """민원 상태에 따른 사건 상태 동기화 (STATUS_SYNC 모드)"""
+    global _last_reconcile, STATUS_SYNC
+
+    if STATUS_SYNC == "incremental":
+        now = time.monotonic()
+        if _last_reconcile is None or now - _last_reconcile >= STATUS_RECONCILE_SECONDS:
+            try:
+                reconcile_incident_counts(conn)
+                _last_reconcile = now
+                return
+            except psycopg2.errors.UndefinedTable:
+                logging.warning("⚠️ incident_complaint_counts 테이블 없음 (009 마이그레이션 미적용), 전체 동기화로 전환")
+                STATUS_SYNC = "full"
+            except Exception:
+                # 재집계 실패는 다음 주기에 재시도하고 이번 주기는 큐만 처리
+                pass
+
+    cursor = conn.cursor()
+    try:
+        if STATUS_SYNC == "incremental":
+            checked, closed, reopened = _queued_status_sync(cursor)
+            if checked:
+                logging.info(f"  🔎 [상태 동기화] 변경 사건 {checked}개 검사")
+        else:
+            closed, reopened = _full_status_sync(cursor)
+        if closed > 0:
+            logging.info(f"  🏁 [상태 동기화] {closed}개 사건 -> '종결(CLOSED)'로 변경")
+        if reopened > 0:
+            logging.info(f"  🔄 [상태 동기화] {reopened}개 사건 -> '대응중(OPEN)'으로 복구")
+
+        conn.commit()
+    except Exception as e:
+        logging.error(f"상태 동기화 중 에러: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
+# ==========================================
+# 6. 실행 루프
+# ==========================================
+
+_last_state_rebuild = None  # None 이면 주기 재구성 안 함 (1회 실행), run_daemon 에서 설정
+
+
+def maybe_rebuild_state(conn):
+    """incremental 엔진 데몬이면 STATE_REBUILD_SECONDS 마다 cluster_points 이웃 수/core 여부를 다시 계산"""
+    global _last_state_rebuild
+    if CLUSTER_ENGINE != "incremental" or _last_state_rebuild is None:
+        return
+    now = time.monotonic()
+    if now - _last_state_rebuild < STATE_REBUILD_SECONDS:
+        return
+    try:
+        incremental_engine.rebuild_state(conn)
+        _last_state_rebuild = now
+    except Exception as e:
+        # 실패하면 다음 주기에 재시도, 이번 주기는 기존 상태로 진행
+        conn.rollback()
+        logging.error(f"점 상태 재구성 중 에러: {e}")
+
+def run_daily_job(complaint_ids=None):
+    """미연결 민원 병합/군집화 + 상태 동기화
+
+    Args:
+        complaint_ids: 알림으로 받은 민원 id 목록 (None이면 미연결 민원 전체)
+    """
+    conn = get_db_connection()
+    try:
+        sql = """
+            SELECT n.complaint_id as id, n.core_request, n.id as norm_id,
+                   n.keywords_jsonb, n.district_id, n.target_object, 
+                   d.name as district_name
+            FROM complaint_normalizations n
+            JOIN complaints c ON n.complaint_id = c.id
+            LEFT JOIN districts d ON n.district_id = d.id
+            WHERE c.incident_id IS NULL 
+        """
+        params = None
+        if complaint_ids is not None:
+            sql += " AND n.complaint_id = ANY(%(ids)s)"
+            params = {"ids": list(complaint_ids)}
+        
+        try:
+            new_df = pd.read_sql(sql, get_engine(), params=params)
+            # 임베딩은 텍스트 파싱 대신 binary COPY 로 float32 행렬에 바로 적재
+            vectors, _ = load_normalization_vectors(conn, new_df['norm_id'].values)
+            new_df['_row'] = np.arange(len(new_df))
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"데이터 조회 실패: {e}")
+            return
+
+        if not new_df.empty:
+            logging.info(f"⚡ 신규 민원 {len(new_df)}건 감지! 분석 시작...")
+            
+            if CLUSTER_ENGINE == "incremental":
+                maybe_rebuild_state(conn)
+                # 기존 사건 연결/노이즈 승격/사건 병합을 밀도 기준으로 한 번에 처리 (대표 민원 병합 단계 없음)
+                incremental_engine.update(conn, new_df, vectors, title_max_len=100, keyword_count=5, empty_keywords="")
+            else:
+                remaining_df = try_merge_to_existing_incidents(conn, new_df, vectors)
+                
+                if not remaining_df.empty:
+                    cluster_remaining_complaints(conn, remaining_df, vectors, workers=CLUSTER_WORKERS)
+                
+            logging.info("✅ 분석 및 처리 완료.")
+        
+        # 데이터 유무와 상관없이 항상 상태 동기화 수행
+        sync_incident_status(conn)
+
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"❌ 전체 로직 에러: {e}")
+    finally:
+        conn.close()
+
+def run_status_sync():
+    """상태 동기화만 실행 (listen 모드에서 알림과 별개로 CHECK_INTERVAL 마다)"""
+    conn = get_db_connection()
+    try:
+        sync_incident_status(conn)
+    finally:
+        conn.close()
+
+def print_progress_bar(duration):
+    width = 30
+    for i in range(duration):
+        time.sleep(1)
+        progress = int((i + 1) / duration * width)
+        bar = '█' * progress + '-' * (width - progress)
+        sys.stdout.write(f"\r⏳ 대기 중... [{bar}] {duration - i - 1}초 ")
+        sys.stdout.flush()
+    sys.stdout.write("\r" + " " * 80 + "\r") 
+
+def _drain_notifies(conn, pending):
+    conn.poll()
+    while conn.notifies:
+        payload = conn.notifies.pop(0).payload
+        if payload.isdigit():
+            pending.add(int(payload))
+
+def _wait_readable(conn, timeout):
+    """timeout초 안에 알림 소켓이 읽을 수 있게 되면 True"""
+    return select.select([conn], [], [], max(timeout, 0)) != ([], [], [])
+
+def listen_loop():
+    """LISTEN/NOTIFY 기반 실행 루프
+
+    알림이 오면 DEBOUNCE_SECONDS 동안 조용해질 때까지(최대 MAX_BATCH_WAIT_SECONDS) 모아서
+    해당 민원들만 처리. 알림이 없으면 FALLBACK_POLL_SECONDS 마다 전체 조회로 누락분 보정.
+    사건 상태 동기화는 알림과 관계없이 CHECK_INTERVAL 마다 실행 (poll 모드와 같은 지연).
+    """
+    while True:
+        listen_conn = None
+        try:
+            listen_conn = get_db_connection()
+            listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with listen_conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            logging.info(f"👂 [LISTEN] '{NOTIFY_CHANNEL}' 채널 대기 중")
+
+            # 시작/재연결 직후에는 그 사이 놓친 민원을 전체 조회로 처리
+            run_daily_job()
+            last_full_run = last_status_sync = time.monotonic()
+
+            while True:
+                now = time.monotonic()
+                until_fallback = FALLBACK_POLL_SECONDS - (now - last_full_run)
+                # 민원 상태 변경(백엔드)은 알림이 오지 않으므로 상태 동기화는 CHECK_INTERVAL 마다 따로 실행
+                until_status = CHECK_INTERVAL - (now - last_status_sync)
+                if not _wait_readable(listen_conn, min(until_fallback, until_status)):
+                    if FALLBACK_POLL_SECONDS - (time.monotonic() - last_full_run) <= 0:
+                        logging.info("⏰ [Fallback] 주기 전체 조회")
+                        run_daily_job()
+                        last_full_run = last_status_sync = time.monotonic()
+                    else:
+                        run_status_sync()
+                        last_status_sync = time.monotonic()
+                    continue
+
+                pending = set()
+                _drain_notifies(listen_conn, pending)
+                batch_started = time.monotonic()
+                while True:
+                    wait = min(DEBOUNCE_SECONDS, batch_started + MAX_BATCH_WAIT_SECONDS - time.monotonic())
+                    if wait <= 0 or not _wait_readable(listen_conn, wait):
+                        break
+                    _drain_notifies(listen_conn, pending)
+
+                if pending:
+                    logging.info(f"🔔 [NOTIFY] 민원 {len(pending)}건 묶어서 처리")
+                    run_daily_job(pending)
+                    last_status_sync = time.monotonic()
+        except psycopg2.OperationalError as e:
+            logging.error(f"LISTEN 연결 끊김, {RECONNECT_SECONDS}초 후 재연결: {e}")
+            time.sleep(RECONNECT_SECONDS)
+        finally:
+            if listen_conn is not None and not listen_conn.closed:
+                listen_conn.close()
+
+def run_daemon(mode="listen"):
+    """실시간 군집화 데몬 (listen: NOTIFY 기반, poll: CHECK_INTERVAL초마다 조회)"""
+    global _last_state_rebuild, _quality_flush_seconds
+    # 데몬이 꺼져 있던 동안 창 밖으로 나간 점이 있으므로 첫 주기에 바로 재구성
+    _last_state_rebuild = time.monotonic() - STATE_REBUILD_SECONDS
+    _quality_flush_seconds = QUALITY_FLUSH_SECONDS
+    print("\n" + "="*50)
+    print("🤖 [Daily Cluster] 실시간 민원 군집화 가동")
+    print(f"   - 모드: 2단계 상태 관리 (OPEN / CLOSED, {STATUS_SYNC})")
+    if mode == "listen":
+        print(f"   - 실행: LISTEN {NOTIFY_CHANNEL} (debounce {DEBOUNCE_SECONDS}초, fallback {FALLBACK_POLL_SECONDS}초)")
+    else:
+        print(f"   - 주기: {CHECK_INTERVAL}초")
+    print(f"   - 병합 후보: {MERGE_MODE}" if CLUSTER_ENGINE == "batch" else "   - 엔진: 증분 DBSCAN")
+    print(f"   - 군집화 워커: {CLUSTER_WORKERS}개")
+    print("="*50 + "\n")
+
+    if mode == "listen":
+        listen_loop()
+    else:
+        while True:
+            run_daily_job()
+            print_progress_bar(CHECK_INTERVAL)
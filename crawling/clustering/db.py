@@ -0,0 +1,31 @@
+import os
+from functools import lru_cache
+
+import psycopg2
+from sqlalchemy import create_engine
+
+
+# ==========================================
+# DB 접속 설정 (군집화 작업 공용)
+# ==========================================
+# 스크립트마다 따로 두던 DB_CONFIG 를 한 곳으로 모음. 서버마다 다른 값(비밀번호 등)은 환경 변수로 덮어씀.
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "dbname": os.getenv("DB_NAME", "postgres"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "0000"),
+    "port": os.getenv("DB_PORT", "5432"),
+}
+
+
+def get_db_connection():
+    return psycopg2.connect(**DB_CONFIG)
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """pd.read_sql 용 SQLAlchemy 엔진 (프로세스당 1개)"""
+    db_url = (f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
+              f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
+    return create_engine(db_url)
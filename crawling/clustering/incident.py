@@ -0,0 +1,385 @@
+from psycopg2.extras import execute_values
+import pandas as pd
+import numpy as np
+import json
+import ast
+from sklearn.cluster import DBSCAN
+from sklearn.metrics.pairwise import cosine_distances
+from collections import Counter
+from datetime import datetime
+
+from .db import get_db_connection
+from .kernels import cross_keyword_distance, hybrid_radius_graph, use_sparse_graph
+from .quality import QualityAccumulator, cosine_silhouette, save_run
+from .store import add_incident_members, insert_incidents, link_complaints
+from .vector_io import EMBEDDING_DIM, copy_vectors, load_normalization_vectors
+
+# ==========================================
+# 1. 설정
+# ==========================================
+# 신규 사건 DBSCAN 거리 행렬: dense(n x n) / sparse(eps 이내 이웃 쌍만) / auto(큰 배치만 sparse)
+GRAPH_MODE = "auto"
+
+# 중심점 매칭: 신규 민원을 이 행 수만큼 묶어 사건 중심점 전체와 한 번에 거리 계산
+MATCH_BLOCK_SIZE = 1024
+# Anchoring: 민원 수가 이 값 미만인 사건만 중심점을 갱신
+ANCHOR_LIMIT = 10
+
+# ==========================================
+# 2. 데이터 파싱 유틸리티
+# ==========================================
+def parse_keywords(val):
+    if not val: return set()
+    raw_set = set()
+    if isinstance(val, str):
+        try: raw_set = set(json.loads(val))
+        except: 
+            try: raw_set = set(ast.literal_eval(val))
+            except: raw_set = set()
+    else:
+        raw_set = set(val)
+    return {word for word in raw_set if len(word) > 1}
+
+# ==========================================
+# 3. 거리 계산 로직 (하이브리드)
+# ==========================================
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+class CentroidMatcher:
+    """사건 중심점 행렬 기반 매칭 (기존 민원 x 사건 이중 루프 대체)
+
+    거리 = 0.7 * 코사인 거리 + 0.3 * 키워드 거리 (둘 다 키워드 없으면 0.5, 한쪽만 없으면 1)
+    - 신규 민원 MATCH_BLOCK_SIZE 건마다 정규화 중심점 행렬과 행렬곱 1회 + 희소 키워드 Jaccard 1회
+    - 배정은 접수 순서대로: 블록 안에서 앞 민원 때문에 중심점이 바뀐(Anchoring) 사건만 다시 계산
+    - 동점이면 사건 id 가 작은 쪽 (기존 dict 순회 순서와 동일)
+    """
+
+    def __init__(self, incident_ids, vectors, keyword_sets, counts, anchored=None):
+        order = np.argsort(np.asarray(incident_ids), kind="stable")
+        self.ids = np.asarray(incident_ids)[order]
+        self.vecs = np.asarray(vectors, dtype=np.float32)[order].copy()
+        self.unit = _unit_rows(self.vecs)
+        self.kws = [keyword_sets[i] for i in order]
+        self.counts = np.asarray(counts, dtype=np.int64)[order].copy()
+        if anchored is None:
+            anchored = self.counts >= ANCHOR_LIMIT
+        self.anchored = np.asarray(anchored, dtype=bool)[order].copy()
+        self.position = {int(iid): j for j, iid in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _distances(self, vecs, kws, cols=None):
+        unit = self.unit if cols is None else self.unit[cols]
+        base_kws = self.kws if cols is None else [self.kws[c] for c in cols]
+        sem_dist = np.clip(1.0 - (_unit_rows(vecs) @ unit.T).astype(np.float64), 0.0, 2.0)
+        key_dist = cross_keyword_distance(kws, base_kws, keyword_mode="incident")
+        return sem_dist * 0.7 + key_dist * 0.3
+
+    def _row_distances(self, vec, kws, cols):
+        """민원 1건 x 일부 사건 (블록 안에서 중심점이 바뀐 사건 재계산용, 희소 행렬 대신 set 연산)"""
+        norm = np.linalg.norm(vec)
+        unit = vec / norm if norm > 0 else vec
+        sem_dist = np.clip(1.0 - (self.unit[cols] @ unit).astype(np.float64), 0.0, 2.0)
+        key_dist = np.empty(len(cols), dtype=np.float64)
+        for k, c in enumerate(cols):
+            other = self.kws[c]
+            if not kws and not other: key_dist[k] = 0.5
+            elif not kws or not other: key_dist[k] = 1.0
+            else: key_dist[k] = 1.0 - len(kws & other) / len(kws | other)
+        return sem_dist * 0.7 + key_dist * 0.3
+
+    def _absorb(self, j, vec):
+        # [솔루션 1] Anchoring: ANCHOR_LIMIT 개 미만일 때만 학습, 그 뒤론 고정
+        count = self.counts[j]
+        self.counts[j] = count + 1
+        if not self.anchored[j] and count < ANCHOR_LIMIT:
+            self.vecs[j] = (self.vecs[j] * count + vec) / (count + 1)
+            self.unit[j] = _unit_rows(self.vecs[j:j + 1])[0]
+            self.anchored[j] = count + 1 >= ANCHOR_LIMIT
+            return True
+        return False
+
+    def assign(self, vectors, keyword_sets, threshold):
+        """접수 순서대로 가장 가까운 사건에 배정
+
+        Returns:
+            [(행 위치, 사건 id, 거리)] - threshold 이하로 배정된 민원만
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        assigned = []
+        if len(self.ids) == 0:
+            return assigned
+
+        for start in range(0, len(vectors), MATCH_BLOCK_SIZE):
+            stop = min(start + MATCH_BLOCK_SIZE, len(vectors))
+            block = self._distances(vectors[start:stop], keyword_sets[start:stop])
+            dirty = set()
+            for r in range(stop - start):
+                row = block[r]
+                if dirty:
+                    cols = np.fromiter(dirty, dtype=np.int64)
+                    row[cols] = self._row_distances(vectors[start + r], keyword_sets[start + r], cols)
+                j = int(np.argmin(row))
+                dist = float(row[j])
+                if dist < 1.0 and dist <= threshold:
+                    assigned.append((start + r, self.ids[j], dist))
+                    if self._absorb(j, vectors[start + r]):
+                        dirty.add(j)
+        return assigned
+
+def calculate_jaccard_matrix(keywords_list):
+    """DBSCAN용 매트릭스 계산 (누락되었던 함수 복구)"""
+    n = len(keywords_list)
+    dist_matrix = np.ones((n, n))
+    for i in range(n):
+        for j in range(i, n):
+            set1 = keywords_list[i]
+            set2 = keywords_list[j]
+            if not set1 and not set2: dist = 0.5
+            elif not set1 or not set2: dist = 1.0 
+            else:
+                inter = len(set1.intersection(set2))
+                union = len(set1.union(set2))
+                dist = 1.0 - (inter / union if union else 0)
+            dist_matrix[i, j] = dist
+            dist_matrix[j, i] = dist
+    return dist_matrix
+
+# ==========================================
+# 4. 타이틀 및 키워드 생성
+# ==========================================
+def generate_title_only(group):
+    sorted_group = group.sort_values('received_at')
+    raw_summary = sorted_group.iloc[0]['core_request']
+    return raw_summary.replace('\n', ' ').strip() if raw_summary else "요약 정보 없음"
+
+def get_representative_keyword(keywords_list):
+    all_kws = [kw for sub in keywords_list for kw in sub]
+    if not all_kws: return "민원"
+    top_kw = Counter(all_kws).most_common(1)[0][0]
+    return str(top_kw).replace('[','').replace(']','').replace("'","").strip()
+
+def cluster_new_incidents(vectors, kws_list, graph_mode=GRAPH_MODE):
+    """중심점에 배정되지 않은 민원끼리 DBSCAN (eps 0.13, min_samples 1) 라벨"""
+    if use_sparse_graph(len(vectors), graph_mode):
+        final_dist = hybrid_radius_graph(vectors, kws_list, eps=0.13, emb_weight=0.7, keyword_mode="incident")
+    else:
+        sem_dist = cosine_distances(vectors)
+
+        # [수정] 누락되었던 함수 호출 복구
+        key_dist = calculate_jaccard_matrix(kws_list)
+
+        final_dist = (sem_dist * 0.7) + (key_dist * 0.3)
+    
+    dbscan = DBSCAN(eps=0.13, min_samples=1, metric='precomputed')
+    return dbscan.fit_predict(final_dist)
+
+# ==========================================
+# 5. 사건 중심점 저장소 (incident_centroids)
+# ==========================================
+# 매 실행마다 소속 민원 전체를 읽어 평균을 내는 대신, 배정할 때마다 같은 트랜잭션에서 중심점을 갱신해 둠
+# (db/migrations/008_incident_centroids.sql). 시작 시에는 메타 조회 1회 + 벡터 binary COPY 1회로 읽음.
+
+_ACTIVE_CENTROIDS = """
+    FROM incident_centroids ic
+    JOIN incidents i ON i.id = ic.incident_id
+    WHERE i.status != 'CLOSED'
+"""
+
+def _vector_literal(vec):
+    return "[" + ",".join(f"{x:.8g}" for x in vec) + "]"
+
+def save_centroids(cur, incident_ids, vectors, keyword_sets, counts, anchored):
+    """사건 중심점 upsert (호출한 쪽 트랜잭션 안에서 실행, 커밋은 호출한 쪽)"""
+    rows = [
+        (int(iid), _vector_literal(vec), json.dumps(sorted(kws), ensure_ascii=False), int(cnt), bool(anc))
+        for iid, vec, kws, cnt, anc in zip(incident_ids, vectors, keyword_sets, counts, anchored)
+    ]
+    if not rows:
+        return
+    execute_values(cur, """
+        INSERT INTO incident_centroids (incident_id, centroid, keywords, member_count, anchored)
+        VALUES %s
+        ON CONFLICT (incident_id) DO UPDATE
+        SET centroid = EXCLUDED.centroid, keywords = EXCLUDED.keywords,
+            member_count = EXCLUDED.member_count, anchored = EXCLUDED.anchored, updated_at = NOW()
+    """, rows, template="(%s, %s::vector, %s::jsonb, %s, %s)", page_size=500)
+
+def member_centroids(incident_of, vectors, keyword_sets):
+    """소속 민원으로 사건별 (사건 id, 평균 벡터, 키워드 합집합, 민원 수) 계산"""
+    incident_ids, inverse = np.unique(np.asarray(incident_of), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(incident_ids))
+    sums = np.zeros((len(incident_ids), vectors.shape[1]), dtype=np.float64)
+    if len(inverse):
+        # 사건 순으로 정렬 후 구간 합 (np.add.at 보다 빠름)
+        order = np.argsort(inverse, kind="stable")
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(inverse[order])) + 1])
+        sums = np.add.reduceat(vectors[order].astype(np.float64), starts, axis=0)
+    centroid_kws = [set() for _ in incident_ids]
+    for pos, kws in zip(inverse, keyword_sets):
+        centroid_kws[pos] |= kws
+    return incident_ids, (sums / np.maximum(counts, 1)[:, None]).astype(np.float32), centroid_kws, counts
+
+def backfill_centroids(conn):
+    """중심점 행이 없는 활성 사건(다른 스크립트가 만든 사건 등)만 소속 민원 평균으로 채움"""
+    missing = pd.read_sql("""
+        SELECT i.id FROM incidents i
+        LEFT JOIN incident_centroids ic ON ic.incident_id = i.id
+        WHERE i.status != 'CLOSED' AND ic.incident_id IS NULL
+    """, conn)['id'].tolist()
+    if not missing:
+        return 0
+
+    active_df = pd.read_sql("""
+        SELECT c.incident_id, n.id as norm_id, n.keywords_jsonb
+        FROM complaints c
+        JOIN complaint_normalizations n ON c.id = n.complaint_id
+        WHERE c.incident_id = ANY(%(ids)s) AND c.status != 'CLOSED' 
+    """, conn, params={"ids": missing})
+    # 임베딩은 binary COPY 로 float32 행렬에 바로 적재 (텍스트 json 파싱 없음)
+    active_vectors, _ = load_normalization_vectors(conn, active_df['norm_id'].values)
+    active_df['kws'] = active_df['keywords_jsonb'].apply(parse_keywords)
+
+    incident_ids, centroids, centroid_kws, counts = member_centroids(
+        active_df['incident_id'].to_numpy(), active_vectors, active_df['kws'].tolist()
+    )
+    with conn.cursor() as cur:
+        save_centroids(cur, incident_ids, centroids, centroid_kws, counts, counts >= ANCHOR_LIMIT)
+    conn.commit()
+    return len(incident_ids)
+
+def load_centroids(conn):
+    """활성 사건 중심점으로 CentroidMatcher 생성"""
+    meta = pd.read_sql(
+        "SELECT ic.incident_id, ic.keywords, ic.member_count, ic.anchored" + _ACTIVE_CENTROIDS, conn
+    )
+    keys, matrix, valid = copy_vectors(
+        conn, "SELECT ic.incident_id::bigint, ic.centroid" + _ACTIVE_CENTROIDS, dim=EMBEDDING_DIM
+    )
+    # 두 조회 사이에 바뀐 행은 양쪽에 모두 있는 사건만 사용
+    pos = pd.Index(keys).get_indexer(meta['incident_id'].to_numpy())
+    ok = pos >= 0
+    ok[ok] = valid[pos[ok]]
+    meta, pos = meta[ok], pos[ok]
+    return CentroidMatcher(
+        meta['incident_id'].to_numpy(),
+        matrix[pos],
+        [{kw for kw in kws if len(kw) > 1} if kws else set() for kws in meta['keywords']],
+        meta['member_count'].to_numpy(),
+        meta['anchored'].to_numpy(),
+    )
+
+# ==========================================
+# 6. 메인 로직: 증분 업데이트 (Anchoring & Global Clustering)
+# ==========================================
+def run_incremental_clustering():
+    conn = get_db_connection()
+    cur = conn.cursor()
+    started_at = datetime.now()
+    print(f"🚀 [Upgrade] 부서 통합 & 중심점 고정(Anchoring) 로직 시작 ({datetime.now()})")
+
+    # 1. 활성 사건 중심점 로드 (저장된 중심점, 없는 사건만 소속 민원으로 채움)
+    backfilled = backfill_centroids(conn)
+    if backfilled:
+        print(f"   👉 중심점 없는 사건 {backfilled}개 초기화.")
+    matcher = load_centroids(conn)
+            
+    print(f"   👉 활성화된 사건 {len(matcher)}개 로드 완료.")
+
+    # 2. 신규 민원 로드
+    sql_new = """
+        SELECT c.id, c.created_at as received_at, n.id as norm_id, n.keywords_jsonb, n.core_request
+        FROM complaints c
+        JOIN complaint_normalizations n ON c.id = n.complaint_id
+        WHERE c.incident_id IS NULL AND n.embedding IS NOT NULL
+        ORDER BY c.created_at, c.id
+    """
+    new_df = pd.read_sql(sql_new, conn)
+    if new_df.empty:
+        print("🎉 신규 민원 없음. 종료.")
+        conn.close(); return
+
+    new_vectors, _ = load_normalization_vectors(conn, new_df['norm_id'].values)
+    new_df['vec'] = list(new_vectors)
+    new_df['kws'] = new_df['keywords_jsonb'].apply(parse_keywords)
+
+    print(f"   👉 신규 민원 {len(new_df)}건 처리 시작 (부서 구분 없음)")
+
+    # 3. 매칭 및 중심점 고정 (Anchoring) - 접수 순서대로, 중심점 행렬과 일괄 거리 계산
+    MATCH_THRESHOLD = 0.15 
+
+    assignments = matcher.assign(new_vectors, new_df['kws'].tolist(), MATCH_THRESHOLD)
+    assigned_positions = set()
+    touched = {}  # 중심점 행 위치 -> 새로 붙은 민원 키워드
+    for pos, best_match_id, _ in assignments:
+        assigned_positions.add(pos)
+        # 다음 실행에서 쓸 키워드 합집합 (이번 실행 중 매칭에는 반영하지 않음, 기존과 동일)
+        touched.setdefault(matcher.position[int(best_match_id)], set()).update(new_df['kws'].iloc[pos])
+
+    # DB 업데이트 (민원 연결 UPDATE 1회 + 사건별 민원 수/마지막 발생 시각 UPDATE 1회)
+    if assignments:
+        positions, match_ids, dists = zip(*assignments)
+        assigned = new_df.iloc[list(positions)]
+        link_complaints(cur, assigned['id'], match_ids, 1.0 - np.asarray(dists))
+        add_incident_members(cur, match_ids, occurred_at=assigned['received_at'])
+
+    assigned_count = len(assignments)
+    unassigned_indices = [idx for pos, idx in enumerate(new_df.index) if pos not in assigned_positions]
+
+    # 배정과 같은 트랜잭션에서 중심점(벡터/키워드/민원 수/고정 여부) 갱신
+    cols = sorted(touched)
+    save_centroids(cur, matcher.ids[cols], matcher.vecs[cols], [matcher.kws[j] | touched[j] for j in cols],
+                   matcher.counts[cols], matcher.anchored[cols])
+    conn.commit()
+
+    # 4. 신규 사건 생성 (Global DBSCAN)
+    remaining_df = new_df.loc[unassigned_indices].copy()
+    new_incidents_count = 0
+    quality = QualityAccumulator()
+
+    if not remaining_df.empty:
+        # [솔루션 2] groupby 제거 -> 전체 군집화
+        vectors = np.stack(remaining_df['vec'].values)
+        labels = cluster_new_incidents(vectors, remaining_df['kws'].tolist())
+        
+        remaining_df['cluster_label'] = labels
+        clusters = [remaining_df[labels == label] for label in sorted(set(labels)) if label != -1]
+
+        # 사건 INSERT 1회 (id 를 미리 받아 군집 순서와 대응) + 민원 연결 UPDATE 1회
+        rows = [
+            (generate_title_only(cluster), len(cluster), cluster['received_at'].min(), cluster['received_at'].max(),
+             json.dumps([get_representative_keyword(cluster['kws'].tolist())]))
+            for cluster in clusters
+        ]
+        new_iids = insert_incidents(cur, "title, status, complaint_count, opened_at, closed_at, keywords",
+                                    rows, "(%s, 'OPEN', %s, %s, %s, %s)")
+        if rows:
+            link_complaints(cur, pd.concat([c['id'] for c in clusters]),
+                            np.repeat(new_iids, [len(c) for c in clusters]), 0.95)
+        new_centroids = [  # (사건 id, 평균 벡터, 키워드 합집합, 민원 수)
+            (iid, vectors[labels == label].mean(axis=0), set().union(*cluster['kws'].tolist()), len(cluster))
+            for iid, label, cluster in zip(new_iids, sorted(set(labels) - {-1}), clusters)
+        ]
+        new_incidents_count = len(new_iids)
+
+        if new_centroids:
+            iids, vecs, kws, cnts = zip(*new_centroids)
+            save_centroids(cur, iids, vecs, kws, cnts, [c >= ANCHOR_LIMIT for c in cnts])
+        conn.commit()
+
+        # 신규 사건 품질 (중심점 거리 / 크기 + 코사인 표본 실루엣)
+        for label in sorted(set(labels) - {-1}):
+            quality.add_cluster(vectors[labels == label])
+        quality.add_silhouette(cosine_silhouette(vectors, labels))
+
+    summary = quality.summary()
+    summary["assigned"] = assigned_count
+    save_run(conn, "incident", summary, started_at,
+             params={"match_threshold": MATCH_THRESHOLD, "eps": 0.13, "anchor_limit": ANCHOR_LIMIT})
+
+    cur.close(); conn.close()
+    print(f"\n✅ [완료] 병합: {assigned_count}건 / 신규 생성: {new_incidents_count}개")
@@ -0,0 +1,408 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from .incident import ANCHOR_LIMIT, parse_keywords, save_centroids
+from .kernels import hybrid_radius_graph, radius_neighbors
+from .store import link_complaints, save_incidents
+from .vector_io import EMBEDDING_DIM, copy_vectors, load_normalization_vectors
+
+
+# ==========================================
+# 증분 DBSCAN (daily --engine incremental)
+# ==========================================
+# 매 주기 남은 민원만 새로 군집화하는 대신, 점마다 이웃 수/core 여부를 cluster_points 테이블에 남겨 두고
+# 신규 점이 들어올 때 바뀌는 부분만 반영한다. (Ester et al. 1998, Incremental DBSCAN)
+#   - 군집 = 사건(incidents). 노이즈 점은 기존과 같이 민원 1건짜리 사건
+#   - 신규 점 주변 이웃 수를 갱신 → min_samples 에 도달한 점은 core 로 승격
+#   - core 끼리 이웃이 되면 두 사건은 density-connected → 한 사건으로 병합 (민원 많은 사건이 남음)
+#   - core 가 아닌 신규 점/노이즈 점은 가장 가까운 core 의 사건에 border 로 붙음
+#   - 병합/연결로 바뀐 사건의 incident_centroids 행(incident 파이프라인 중심점)도 같은 트랜잭션에서 갱신
+# 상태 테이블: db/migrations/007_cluster_points.sql, 최초 1회 rebuild_state() 로 채움
+# 이웃 수는 더하기만 하므로 창 밖으로 나간 점/삭제된 점이 빠지지 않는다 -> 데몬이 주기적으로 rebuild_state() 실행
+
+DEFAULT_EPS = 0.15
+DEFAULT_MIN_SAMPLES = 2
+DEFAULT_EMB_WEIGHT = 0.6
+DEFAULT_WINDOW_DAYS = 30
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+class IncrementalDBSCAN:
+    """cluster_points 상태를 이용한 증분 DBSCAN
+
+    거리는 daily 신규 군집화와 같은 하이브리드 거리
+    (emb_weight * 코사인 거리 + (1 - emb_weight) * 키워드 Jaccard 거리), 이웃 수는 자기 자신 포함.
+    최근 window_days 일 안에 접수된 민원만 기존 점으로 불러와 신규 점의 이웃 후보로 쓴다.
+    저장된 neighbor_count 는 신규 점이 들어올 때 더하기만 하므로, 창 밖으로 나간 점이나 삭제된 점이
+    이웃 수에서 빠지지 않아 is_core 가 실제보다 많아질 수 있다. rebuild_state() 로 다시 계산해 보정한다
+    (daily 데몬은 STATE_REBUILD_SECONDS 마다 실행).
+    """
+
+    _LOAD_SQL = """
+        SELECT DISTINCT ON (p.complaint_id)
+               p.complaint_id AS id, n.id AS norm_id, p.district_id, c.incident_id,
+               n.keywords_jsonb, p.neighbor_count, p.is_core, i.complaint_count
+        FROM cluster_points p
+        JOIN complaints c ON c.id = p.complaint_id
+        JOIN complaint_normalizations n ON n.complaint_id = c.id
+        JOIN incidents i ON i.id = c.incident_id
+        WHERE p.district_id = ANY(%(districts)s)
+          AND c.created_at > NOW() - %(days)s * INTERVAL '1 day'
+        ORDER BY p.complaint_id, n.id DESC
+    """
+
+    def __init__(self, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES,
+                 emb_weight=DEFAULT_EMB_WEIGHT, window_days=DEFAULT_WINDOW_DAYS):
+        self.eps = eps
+        self.min_samples = min_samples
+        self.emb_weight = emb_weight
+        self.window_days = window_days
+
+    # ------------------------------------------
+    # 상태 로드
+    # ------------------------------------------
+    def _load_points(self, conn, districts):
+        existing = pd.read_sql_query(
+            self._LOAD_SQL, conn, params={"districts": [int(d) for d in districts], "days": self.window_days}
+        )
+        vectors, _ = load_normalization_vectors(conn, existing['norm_id'].values)
+        return existing, vectors
+
+    # ------------------------------------------
+    # 구 하나 갱신 (DB 접근 없음)
+    # ------------------------------------------
+    def _update_district(self, old, old_vecs, new, new_vecs):
+        """구 하나의 증분 갱신 계획
+
+        Returns:
+            dict - points: 상태를 저장할 점 [(complaint_id, district_id, neighbor_count, is_core)]
+                   attach: 기존 사건에 붙일 신규 민원 [(complaint_id, incident_id, score)]
+                   absorb: 병합되어 없어질 사건 {사건 id: 남는 사건 id}
+                   create: 새 사건으로 저장할 (신규 민원 위치 배열, is_noise)
+        """
+        m, k = len(old), len(new)
+        old_kws = [kw if kw else [] for kw in old['keywords_jsonb'].tolist()]
+        new_kws = [kw if kw else [] for kw in new['keywords_jsonb'].tolist()]
+        base_vecs = np.vstack([old_vecs, new_vecs]) if m else new_vecs
+        base_kws = old_kws + new_kws
+
+        # 1. 신규 점과 (기존 + 신규) 점 사이의 eps 이웃 (전역 번호: 기존 0..m-1, 신규 m..m+k-1)
+        qi, bj, dist = radius_neighbors(new_vecs, new_kws, base_vecs, base_kws, self.eps, self.emb_weight)
+        not_self = bj != qi + m
+        qi, bj, dist = qi[not_self], bj[not_self], dist[not_self]
+
+        # 2. 이웃 수 갱신 (자기 자신 포함)
+        new_count = 1 + np.bincount(qi, minlength=k)
+        old_count = old['neighbor_count'].to_numpy(dtype=np.int64) + np.bincount(bj[bj < m], minlength=m)[:m]
+        count = np.concatenate([old_count, new_count])
+        is_core = count >= self.min_samples
+        old_core = old['is_core'].to_numpy(dtype=bool)
+        promoted = np.flatnonzero(is_core[:m] & ~old_core)
+
+        edges_a = [qi + m]
+        edges_b = [bj]
+        edges_d = [dist]
+        # 3. 새로 core 가 된 기존 점은 기존 점과의 이웃 관계도 필요
+        if len(promoted):
+            pi, pj, pd_ = radius_neighbors(old_vecs[promoted], [old_kws[i] for i in promoted],
+                                           old_vecs, old_kws, self.eps, self.emb_weight)
+            keep = pj != promoted[pi]
+            edges_a.append(promoted[pi[keep]])
+            edges_b.append(pj[keep])
+            edges_d.append(pd_[keep])
+        ea, eb, ed = np.concatenate(edges_a), np.concatenate(edges_b), np.concatenate(edges_d)
+
+        # 4. 노드: 기존 점은 소속 사건, 신규 점은 자기 자신
+        incident_of = old['incident_id'].to_numpy(dtype=np.int64)
+        incident_size = dict(zip(incident_of.tolist(), old['complaint_count'].astype(int).tolist()))
+
+        def node(i):
+            return ("inc", int(incident_of[i])) if i < m else ("new", int(i))
+
+        uf = _UnionFind()
+        for i in range(m, m + k):
+            uf.find(node(i))
+        core_edge = is_core[ea] & is_core[eb]
+        for a, b in zip(ea[core_edge], eb[core_edge]):
+            uf.union(node(a), node(b))
+
+        # 5. core 가 아닌 신규 점 / 노이즈 점(민원 1건 사건)은 가장 가까운 core 의 사건에 border 로 붙음
+        border_of = {}
+        for a, b, d in zip(ea, eb, ed):
+            for x, c in ((a, b), (b, a)):
+                if is_core[x] or not is_core[c]:
+                    continue
+                if x < m and incident_size.get(int(incident_of[x]), 0) > 1:
+                    continue  # 이미 군집 소속인 border 는 그대로
+                if x not in border_of or d < border_of[x][1]:
+                    border_of[x] = (c, d)
+        for x, (c, _) in border_of.items():
+            uf.union(uf.find(node(c)), node(x))
+
+        # 신규 점별 가장 가까운 이웃 거리 (연결 점수)
+        nearest = np.full(k, np.inf)
+        np.minimum.at(nearest, qi, dist)
+
+        # 6. 컴포넌트별로 남을 사건 결정
+        components = {}
+        for i in range(m, m + k):
+            components.setdefault(uf.find(node(i)), []).append(i - m)
+        merged_incidents = {}
+        for key in list(uf.parent):
+            if key[0] == "inc":
+                merged_incidents.setdefault(uf.find(key), []).append(key[1])
+
+        plan = {"attach": [], "absorb": {}, "create": []}
+        for root, members in merged_incidents.items():
+            survivor = max(members, key=lambda iid: (incident_size.get(iid, 0), -iid))
+            for iid in members:
+                if iid != survivor:
+                    plan["absorb"][iid] = survivor
+            for pos in components.pop(root, []):
+                score = 1.0 - nearest[pos] if np.isfinite(nearest[pos]) else 0.0
+                plan["attach"].append((int(new['id'].iloc[pos]), survivor, float(score)))
+        for members in components.values():
+            positions = np.array(sorted(members))
+            plan["create"].append((positions, len(positions) == 1 and not is_core[m + positions[0]]))
+
+        # 7. 상태 저장 대상: 신규 점 + 이웃 수가 바뀐 기존 점
+        changed = np.flatnonzero(old_count != old['neighbor_count'].to_numpy(dtype=np.int64))
+        ids = np.concatenate([old['id'].to_numpy(dtype=np.int64)[changed], new['id'].to_numpy(dtype=np.int64)])
+        districts = np.concatenate([old['district_id'].to_numpy(dtype=np.int64)[changed],
+                                    new['district_id'].to_numpy(dtype=np.int64)])
+        plan["points"] = list(zip(ids.tolist(), districts.tolist(),
+                                  np.concatenate([old_count[changed], new_count]).tolist(),
+                                  np.concatenate([is_core[:m][changed], is_core[m:]]).tolist()))
+        return plan
+
+    # ------------------------------------------
+    # 사건 중심점 갱신 (incident_centroids)
+    # ------------------------------------------
+    @staticmethod
+    def _update_centroids(conn, cursor, absorb, attach, new_df, vectors):
+        """병합으로 남는 사건과 신규 민원이 붙은 사건의 중심점 행 갱신 (호출한 쪽 트랜잭션, 사건 DELETE 전에 호출)
+
+        남는 사건 중심점 = 병합되는 사건들의 민원 수 가중 평균 (남는 사건이 고정(anchored)이면 그대로),
+        키워드 합집합, 민원 수 합. 붙은 신규 민원은 incident 파이프라인과 같은 Anchoring 규칙으로 반영.
+        중심점 행이 하나도 없는 사건은 건드리지 않음 (incident 실행 시 backfill_centroids 가 채움).
+        """
+        affected = sorted(set(absorb) | set(absorb.values()) | {iid for _, iid, _ in attach})
+        if not affected:
+            return 0
+        cursor.execute("SELECT to_regclass('incident_centroids')")
+        if cursor.fetchone()[0] is None:
+            return 0  # 008 마이그레이션 미적용
+        cursor.execute("""
+            SELECT incident_id, keywords, member_count, anchored FROM incident_centroids
+            WHERE incident_id = ANY(%s) ORDER BY incident_id FOR UPDATE
+        """, (affected,))
+        meta = {int(iid): (set(kws or []), int(cnt), bool(anc)) for iid, kws, cnt, anc in cursor.fetchall()}
+        if not meta:
+            return 0
+        keys, matrix, valid = copy_vectors(
+            conn, "SELECT incident_id::bigint, centroid FROM incident_centroids WHERE incident_id = ANY(%s)",
+            (affected,), dim=EMBEDDING_DIM,
+        )
+        centroid = {int(k): matrix[i].astype(np.float64) for i, k in enumerate(keys) if valid[i]}
+
+        # 1. 병합: 남는 사건별로 (남는 사건 + 흡수되는 사건) 중심점 행을 합침
+        groups = {iid: [iid] for iid in affected if iid not in absorb}
+        for src, dst in absorb.items():
+            groups[dst].append(src)
+        state = {}  # 남는 사건 -> [중심점, 민원 수, 키워드, 고정 여부]
+        for survivor, members in groups.items():
+            rows = [m for m in members if m in meta and m in centroid]
+            if not rows:
+                continue
+            counts = np.array([meta[m][1] for m in rows], dtype=np.float64)
+            if survivor in rows and meta[survivor][2]:
+                vec = centroid[survivor]
+            else:
+                vec = np.average([centroid[m] for m in rows], axis=0, weights=np.maximum(counts, 1))
+            total = int(counts.sum())
+            anchored = (survivor in rows and meta[survivor][2]) or total >= ANCHOR_LIMIT
+            state[survivor] = [vec, total, set().union(*(meta[m][0] for m in rows)), anchored]
+
+        # 2. 신규 민원 연결: incident 파이프라인 CentroidMatcher._absorb 와 같은 규칙
+        row_of = dict(zip(new_df['id'].astype(np.int64).tolist(), new_df['_row'].tolist()))
+        kws_of = dict(zip(new_df['id'].astype(np.int64).tolist(), new_df['keywords_jsonb'].tolist()))
+        for cid, iid, _ in attach:
+            if iid not in state:
+                continue
+            vec, count, kws, anchored = state[iid]
+            if not anchored and count < ANCHOR_LIMIT:
+                vec = (vec * count + vectors[row_of[cid]]) / (count + 1)
+            count += 1
+            state[iid] = [vec, count, kws | parse_keywords(kws_of[cid]), anchored or count >= ANCHOR_LIMIT]
+
+        if state:
+            iids = list(state)
+            save_centroids(cursor, iids, [state[i][0] for i in iids], [state[i][2] for i in iids],
+                           [state[i][1] for i in iids], [state[i][3] for i in iids])
+        return len(state)
+
+    def _plan(self, old_all, old_vectors, new_df, vectors):
+        """구별 갱신 계획을 합쳐 (points, attach, absorb, to_create) 반환 (DB 접근 없음)
+
+        incident 파이프라인이 만든 사건은 여러 구에 걸칠 수 있으므로, 한 구에서 흡수된 사건에
+        다른 구의 신규 민원이 붙는 경우가 있다. 구별 병합을 사건 단위로 합쳐 최종 사건을 정하고
+        attach 대상도 최종 사건으로 바꾼다 (삭제될 사건에 연결하지 않도록).
+        """
+        points, attach, pairs, to_create = [], [], [], []
+        for dist_id, new in new_df.groupby('district_id'):
+            in_district = (old_all['district_id'] == dist_id).to_numpy()
+            old = old_all[in_district].reset_index(drop=True)
+            plan = self._update_district(old, old_vectors[in_district], new.reset_index(drop=True),
+                                         vectors[new['_row'].values])
+            points += plan["points"]
+            attach += plan["attach"]
+            pairs += list(plan["absorb"].items())
+            to_create += [(new.iloc[positions], is_noise) for positions, is_noise in plan["create"]]
+
+        # 구마다 다른 사건으로 흡수될 수 있으므로(X→Y, X→Z) 병합 쌍을 묶어 컴포넌트별로 남을 사건 1개 선택
+        incident_size = dict(zip(old_all['incident_id'].astype(np.int64).tolist(),
+                                 old_all['complaint_count'].astype(int).tolist()))
+        uf = _UnionFind()
+        for src, dst in pairs:
+            uf.union(int(src), int(dst))
+        members = {}
+        for iid in list(uf.parent):
+            members.setdefault(uf.find(iid), []).append(iid)
+        absorb = {}
+        for group in members.values():
+            survivor = max(group, key=lambda iid: (incident_size.get(iid, 0), -iid))
+            absorb.update({iid: survivor for iid in group if iid != survivor})
+        attach = [(cid, absorb.get(iid, iid), score) for cid, iid, score in attach]
+        return points, attach, absorb, to_create
+
+    # ------------------------------------------
+    # 전체 갱신 (단일 트랜잭션)
+    # ------------------------------------------
+    def update(self, conn, new_df, vectors, **title_options):
+        """신규 민원을 기존 점 상태에 반영하고 incidents/complaints 를 증분 갱신
+
+        Args:
+            new_df: 사건이 없는 신규 민원 (id, norm_id, keywords_jsonb, district_id, district_name, core_request, _row)
+            vectors: new_df['_row'] 가 가리키는 임베딩 행렬
+            title_options: 새 사건 제목 옵션 (save_incidents)
+        """
+        if new_df.empty:
+            return
+        new_df = new_df.copy()
+        new_df['district_id'] = new_df['district_id'].fillna(0).astype(np.int64)
+        old_all, old_vectors = self._load_points(conn, new_df['district_id'].unique())
+        old_all['district_id'] = old_all['district_id'].fillna(0).astype(np.int64)
+        # 이번 배치 민원이 이미 상태에 있으면(재처리) 기존 점에서 제외
+        keep = ~old_all['id'].isin(new_df['id']).to_numpy()
+        old_all, old_vectors = old_all[keep].reset_index(drop=True), old_vectors[keep]
+
+        points, attach, absorb, to_create = self._plan(old_all, old_vectors, new_df, vectors)
+
+        cursor = conn.cursor()
+        try:
+            # 흡수되는 사건의 중심점 행은 사건 DELETE 때 cascade 로 지워지므로 먼저 남는 사건에 합침
+            self._update_centroids(conn, cursor, absorb, attach, new_df, vectors)
+            if absorb:
+                execute_values(cursor, """
+                    UPDATE complaints c
+                    SET incident_id = v.survivor, incident_linked_at = NOW()
+                    FROM (VALUES %s) AS v(absorbed, survivor)
+                    WHERE c.incident_id = v.absorbed
+                """, list(absorb.items()), template="(%s::bigint, %s::bigint)", page_size=10000)
+                cursor.execute("DELETE FROM incidents WHERE id = ANY(%s)", (list(absorb),))
+            if attach:
+                cids, iids, scores = zip(*attach)
+                link_complaints(cursor, cids, iids, scores)
+
+            touched = sorted({iid for _, iid, _ in attach} | set(absorb.values()))
+            if touched:
+                # 신규 민원이 추가된 사건은 대응중(OPEN)으로 (기존 병합 로직과 동일)
+                cursor.execute("""
+                    UPDATE incidents i
+                    SET complaint_count = s.cnt, status = 'OPEN'
+                    FROM (SELECT incident_id, COUNT(*) AS cnt FROM complaints
+                          WHERE incident_id = ANY(%(ids)s) GROUP BY incident_id) s
+                    WHERE i.id = s.incident_id
+                """, {"ids": touched})
+
+            created = save_incidents(cursor, to_create, **title_options)
+
+            execute_values(cursor, """
+                INSERT INTO cluster_points (complaint_id, district_id, neighbor_count, is_core)
+                VALUES %s
+                ON CONFLICT (complaint_id) DO UPDATE
+                SET district_id = EXCLUDED.district_id, neighbor_count = EXCLUDED.neighbor_count,
+                    is_core = EXCLUDED.is_core, updated_at = NOW()
+            """, points, template="(%s::bigint, %s::bigint, %s, %s)", page_size=10000)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        logging.info(
+            f"  🧮 [증분 DBSCAN] 기존 사건 연결 {len(attach)}건 / 사건 병합 {len(absorb)}개 / "
+            f"새 사건 {len(created)}개 / 점 상태 {len(points)}건 갱신"
+        )
+        for inc in created[created['count'] > 1].itertuples():
+            logging.info(f"  🆕 [사건 생성] #{inc.incident_id} : {inc.title} ({inc.count}건)")
+
+    # ------------------------------------------
+    # 상태 재구성 (최초 1회 / 파라미터 변경 시)
+    # ------------------------------------------
+    def rebuild_state(self, conn):
+        """최근 window_days 일 동안 사건에 연결된 민원의 이웃 수/core 여부를 처음부터 다시 계산
+
+        incidents/complaints 는 건드리지 않고 cluster_points 만 다시 채운다.
+        """
+        points = pd.read_sql_query("""
+            SELECT DISTINCT ON (c.id)
+                   c.id, n.id AS norm_id, COALESCE(n.district_id, 0) AS district_id, n.keywords_jsonb
+            FROM complaints c
+            JOIN complaint_normalizations n ON n.complaint_id = c.id
+            WHERE c.incident_id IS NOT NULL
+              AND c.created_at > NOW() - %(days)s * INTERVAL '1 day'
+            ORDER BY c.id, n.id DESC
+        """, conn, params={"days": self.window_days})
+        vectors, _ = load_normalization_vectors(conn, points['norm_id'].values)
+
+        rows = []
+        for dist_id, group in points.groupby('district_id'):
+            positions = group.index.to_numpy()
+            kws = [kw if kw else [] for kw in group['keywords_jsonb'].tolist()]
+            graph = hybrid_radius_graph(vectors[positions], kws, eps=self.eps, emb_weight=self.emb_weight)
+            # 그래프는 대각선(자기 자신)을 항상 포함하므로 행별 원소 수 = 이웃 수
+            counts = np.diff(graph.indptr)
+            rows += [(int(cid), int(dist_id), int(cnt), bool(cnt >= self.min_samples))
+                     for cid, cnt in zip(group['id'], counts)]
+
+        with conn.cursor() as cur:
+            # TRUNCATE 는 ACCESS EXCLUSIVE 잠금으로 읽기까지 막으므로 같은 트랜잭션에서 DELETE 후 다시 채움
+            cur.execute("DELETE FROM cluster_points")
+            execute_values(cur, """
+                INSERT INTO cluster_points (complaint_id, district_id, neighbor_count, is_core) VALUES %s
+            """, rows, page_size=10000)
+        conn.commit()
+        logging.info(f"  🧮 [증분 DBSCAN] 점 상태 {len(rows)}건 재구성 (core {sum(r[3] for r in rows)}건)")
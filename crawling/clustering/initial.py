@@ -0,0 +1,237 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from sklearn.cluster import DBSCAN
+from sklearn.metrics.pairwise import cosine_similarity
+
+from .db import get_db_connection
+from .kernels import hybrid_radius_graph, jaccard_similarity, text_distance, use_sparse_graph
+from .store import save_incidents
+from .parallel import run_groups
+from .quality import QualityAccumulator, precomputed_silhouette, save_run
+from .vector_io import load_normalization_vectors
+
+
+
+# ==========================================
+# 1. 설정
+# ==========================================
+
+# 대형 군집 기준
+LARGE_CLUSTER_THRESHOLD = 30
+
+# Level 3: 경계 쌍 SequenceMatcher 재확인 여부 (False면 n-gram 근사 거리만 사용)
+TEXT_EXACT_RECHECK = True
+
+# Level 1/2 거리 행렬: dense(n x n) / sparse(eps 이내 이웃 쌍만) / auto(큰 그룹만 sparse)
+GRAPH_MODE = "auto"
+
+
+# 하이브리드 거리 계산
+def calculate_hybrid_distance(embeddings, keywords_list, alpha=0.6):
+    emb_sim = cosine_similarity(np.asarray(embeddings, dtype=np.float32))
+    key_sim = jaccard_similarity(keywords_list)  # 희소 행렬곱 기반 Jaccard (float32)
+
+    dist = 1 - ((emb_sim * alpha) + (key_sim * (1 - alpha)))
+
+    dist[dist < 0] = 0
+
+    return dist
+
+
+# 텍스트 거리 계산 (Level 3)
+# 문자 n-gram 근사 거리를 한 번에 계산하고, eps 경계 근처 쌍만 SequenceMatcher 로 재확인
+def calculate_text_distance(texts, eps=0.25):
+    return text_distance(texts, eps=eps, exact_recheck=TEXT_EXACT_RECHECK)
+
+
+# 그룹(구 + 대상) 하나의 3단계 군집화
+# parallel 워커에서도 실행되므로 DataFrame/DB 없이 그룹 내 위치(index 배열)만 돌려줌
+def cluster_group(embeddings, keywords_list, texts, graph_mode=GRAPH_MODE):
+    """
+    Returns:
+        {'parts': [(그룹 내 위치 배열, is_noise)], 'noise': 노이즈 수, 'clusters': 군집 수,
+         'silhouette': Level 3 표본 실루엣 값들}
+    """
+    parts = []
+    noise = 0
+    clusters = 0
+    silhouette = []
+
+    # === Level 1: 하이브리드 군집화 ===
+    if use_sparse_graph(len(embeddings), graph_mode):
+        l1_dist = hybrid_radius_graph(embeddings, keywords_list, eps=0.11, emb_weight=0.6)
+    else:
+        l1_dist = calculate_hybrid_distance(embeddings, keywords_list, alpha=0.6)
+    l1_labels = DBSCAN(eps=0.11, min_samples=2, metric='precomputed').fit_predict(l1_dist)
+
+    for l1_lab in set(l1_labels):
+        l1_indices = np.where(l1_labels == l1_lab)[0]
+        if l1_lab == -1:
+            parts.append((l1_indices, True))
+            noise += len(l1_indices)
+            continue
+
+        final_groups = []
+
+        # === Level 2: 대형 군집 분할 ===
+        if len(l1_indices) >= LARGE_CLUSTER_THRESHOLD:
+            l2_emb = embeddings[l1_indices]
+            l2_kw = [keywords_list[i] for i in l1_indices]
+            if use_sparse_graph(len(l2_emb), graph_mode):
+                l2_dist = hybrid_radius_graph(l2_emb, l2_kw, eps=0.17, emb_weight=0.5)
+            else:
+                l2_dist = calculate_hybrid_distance(l2_emb, l2_kw, alpha=0.5)
+            l2_labels = DBSCAN(eps=0.17, min_samples=2, metric='precomputed').fit_predict(l2_dist)
+
+            for l2_lab in set(l2_labels):
+                l2_indices = l1_indices[np.where(l2_labels == l2_lab)[0]]
+                if l2_lab == -1:
+                    parts.append((l2_indices, True))
+                    noise += len(l2_indices)
+                else:
+                    final_groups.append(l2_indices)
+        else:
+            final_groups.append(l1_indices)
+
+        # === Level 3: 텍스트 최종 필터링 ===
+        for candidate in final_groups:
+            if len(candidate) < 2:
+                parts.append((candidate, True))
+                continue
+
+            text_dist_matrix = calculate_text_distance([texts[i] for i in candidate], eps=0.25)
+            l3_labels = DBSCAN(eps=0.25, min_samples=2, metric='precomputed').fit_predict(text_dist_matrix)
+
+            # 실루엣은 후보 그룹당 표본 GROUP_SILHOUETTE_SAMPLE 개 점만 (노이즈 제외, 군집 2개 이상일 때만 값이 나옴)
+            silhouette.extend(precomputed_silhouette(text_dist_matrix, l3_labels).tolist())
+
+            for l3_lab in set(l3_labels):
+                l3_indices = candidate[np.where(l3_labels == l3_lab)[0]]
+                if l3_lab == -1:
+                    parts.append((l3_indices, True))
+                    noise += len(l3_indices)
+                else:
+                    parts.append((l3_indices, False))
+                    clusters += 1
+
+    return {'parts': parts, 'noise': noise, 'clusters': clusters, 'silhouette': silhouette}
+
+
+# ==========================================
+# 2. 메인 로직
+# ==========================================
+
+def run_initial_clustering(workers=1):
+    """미연결 민원 전체를 구 + 대상 그룹별 3단계로 군집화해 사건 생성"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    started_at = datetime.now()
+
+    print(f"🚀 [Start] 3단계 정밀 필터링(Text Deep Check) 군집화 ({datetime.now()})")
+
+    try:
+        # 데이터 로드
+        sql = """
+            SELECT n.complaint_id as id, n.core_request, n.id as norm_id,
+                   n.keywords_jsonb, n.district_id, n.target_object, d.name as district_name
+            FROM complaint_normalizations n
+            JOIN complaints c ON n.complaint_id = c.id
+            LEFT JOIN districts d ON n.district_id = d.id
+            WHERE c.incident_id IS NULL AND n.is_current = true
+        """
+
+        df = pd.read_sql(sql, conn)
+        if df.empty: return
+
+        # 임베딩은 binary COPY 로 float32 행렬에 한 번에 적재 (행 번호 = _row)
+        vectors, _ = load_normalization_vectors(conn, df['norm_id'].values)
+        df['_row'] = np.arange(len(df))
+
+        # 전처리
+        df['district_id'] = df['district_id'].fillna(0)
+        df['target_object'] = df['target_object'].fillna('기타')
+        df['district_name'] = df['district_name'].fillna('서울시')
+
+        # 3단계 군집화
+        grouped = df.groupby(['district_id', 'target_object'])
+
+       
+        total_clusters = 0
+        total_noise = 0
+
+        quality = QualityAccumulator()
+        to_save = []  # (df, is_noise) - 군집화가 모두 끝난 뒤 한 번에 저장
+
+
+        groups = {}
+        jobs = []
+        for (dist_id, target), group in grouped:
+            if len(group) < 2:
+                to_save.append((group, True))
+                total_noise += 1
+
+                continue
+
+            keywords_list = [k if k else [] for k in group['keywords_jsonb'].tolist()]
+            groups[(dist_id, target)] = group
+            jobs.append(((dist_id, target), group['_row'].values,
+                         (keywords_list, group['core_request'].tolist(), GRAPH_MODE)))
+
+        # 그룹별 3단계 군집화 (큰 그룹부터, workers > 1 이면 프로세스 풀에서 병렬)
+        results = run_groups(vectors, jobs, cluster_group, workers=workers)
+
+        for key, group in groups.items():
+            result = results[key]
+            for indices, is_noise in result['parts']:
+                to_save.append((group.iloc[indices], is_noise))
+            total_noise += result['noise']
+            total_clusters += result['clusters']
+            quality.add_silhouette(result['silhouette'])
+
+        # 사건 INSERT 1회 + 민원 연결 UPDATE 1회
+        save_incidents(cursor, to_save, title_max_len=150, keyword_count=1, empty_keywords="민원")
+        conn.commit()
+
+        # 스트리밍 품질 지표 (군집별 중심점 거리 / 크기 / 노이즈, O(n * dim))
+        for part_df, is_noise in to_save:
+            if is_noise:
+                quality.add_noise(len(part_df))
+            else:
+                quality.add_cluster(vectors[part_df['_row'].values])
+        summary = quality.summary()
+        save_run(conn, "initial", summary, started_at,
+                 params={"eps": [0.11, 0.17, 0.25], "large_cluster_threshold": LARGE_CLUSTER_THRESHOLD,
+                         "graph_mode": GRAPH_MODE, "text_exact_recheck": TEXT_EXACT_RECHECK, "workers": workers})
+
+        # === 최종 리포트 ===
+        avg_score = summary['silhouette'] if summary['silhouette'] is not None else 0
+        print("\n" + "="*50)
+        print("📊 [최종 군집화 성적표]")
+        print(f"✅ 생성된 사건(Incidents): {total_clusters}개")
+        print(f"🧹 걸러진 단독민원(Noise): {total_noise}개 (비율 {summary['noise_ratio']})")
+        if summary['silhouette'] is not None:
+            low, high = summary['silhouette_ci']
+            print(f"🎯 평균 정확도(Silhouette Score): {avg_score:.4f} "
+                  f"(95% 신뢰구간 {low:.4f} ~ {high:.4f}, 표본 {summary['silhouette_n']}개)")
+        else:
+            print("🎯 평균 정확도(Silhouette Score): 계산할 군집 없음")
+        print(f"📏 중심점까지 평균 거리: {summary['intra_centroid_distance']} / "
+              f"군집 크기 중앙값 {summary['size_p50']}, 90% {summary['size_p90']}, 최대 {summary['size_max']}")
+
+        if avg_score > 0.5: print("   🌟 [판정] 아주 훌륭합니다! (군집들이 아주 단단하게 뭉쳤음)")
+
+        elif avg_score > 0.3: print("   ✨ [판정] 양호합니다. (다양한 민원이 잘 분류됨)")
+
+        else: print("   ⚠️ [판정] 군집 점수는 낮지만, 이는 1개의 대형 군집으로 완벽히 묶였거나 데이터가 파편화된 경우일 수 있습니다.")
+
+        print("="*50 + "\n")
+
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ 에러 발생: {e}")
+
+    finally:
+        cursor.close()
+        conn.close()
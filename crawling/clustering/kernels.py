@@ -0,0 +1,271 @@
+from difflib import SequenceMatcher
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.neighbors import sort_graph_by_row_values
+
+# Level 3 텍스트 거리: 근사 거리가 [eps - 아래 폭, eps + 위 폭] 안이면 SequenceMatcher 로 재계산 (아래, 위)
+# Dice 거리는 SequenceMatcher 거리보다 대체로 커서(합성 데이터에서 차이 -0.10 ~ +0.27) 위쪽 폭을 넓게 잡음.
+# 차이가 이 폭을 넘는 쌍은 eps 판정이 바뀔 수 있으므로 bench_clustering.py --check-text 로 확인
+TEXT_RECHECK_MARGIN = (0.12, 0.3)
+
+# 희소 이웃 그래프: GRAPH_MODE='auto' 일 때 이 크기 이상 그룹만 희소 그래프 사용
+SPARSE_GRAPH_MIN_SIZE = 2000
+# 블록 단위 코사인 계산 시 한 번에 만드는 유사도 원소 수 (float32 기준 약 64MB)
+GRAPH_BLOCK_ELEMENTS = 16_000_000
+
+
+# ==========================================
+# 군집화 공용 계산 커널 (daily / initial 공용)
+# ==========================================
+
+def keyword_matrix(keywords_list):
+    """키워드 리스트들을 희소 이진 문서-단어 행렬(CSR, n x 어휘수)로 한 번만 인코딩
+
+    같은 문서 안의 중복 키워드는 한 번만 셈 (set 기준과 동일)
+    """
+    vocab = {}
+    indptr = [0]
+    indices = []
+    for kws in keywords_list:
+        cols = {vocab.setdefault(k, len(vocab)) for k in (kws or ())}
+        indices.extend(sorted(cols))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.int32)
+    return csr_matrix((data, indices, indptr), shape=(len(keywords_list), max(len(vocab), 1)))
+
+
+def jaccard_similarity(keywords_list, dtype=np.float32):
+    """키워드 Jaccard 유사도 행렬 (기존 set 이중 루프와 같은 값)
+
+    - 교집합 크기: 희소 행렬곱 X @ X.T
+    - 합집합 크기: |A| + |B| - |A ∩ B| (행 합으로 계산)
+    - 합집합이 0(둘 다 키워드 없음)이면 0.0, 대각선은 항상 1.0
+    """
+    n = len(keywords_list)
+    if n == 0:
+        return np.zeros((0, 0), dtype=dtype)
+
+    x = keyword_matrix(keywords_list)
+    inter = (x @ x.T).toarray()
+    sizes = np.asarray(x.sum(axis=1)).ravel()
+    union = sizes[:, None] + sizes[None, :] - inter
+
+    sim = np.zeros((n, n), dtype=dtype)
+    np.divide(inter, union, out=sim, where=union > 0)
+    np.fill_diagonal(sim, 1.0)
+    return sim
+
+
+def cross_keyword_distance(query_kws, base_kws, keyword_mode="jaccard"):
+    """query x base 키워드 거리 행렬 (float64, 희소 행렬곱 한 번)
+
+    keyword_mode 규칙은 _keyword_distance_pairs 와 같음 ('incident': 둘 다 비면 0.5, 한쪽만 비면 1)
+    """
+    nq, nb = len(query_kws), len(base_kws)
+    if nq == 0 or nb == 0:
+        return np.ones((nq, nb), dtype=np.float64)
+    x = keyword_matrix(list(query_kws) + list(base_kws))
+    q, b = x[:nq], x[nq:]
+    inter = (q @ b.T).toarray().astype(np.float64)
+    q_sizes = np.asarray(q.sum(axis=1)).ravel().astype(np.float64)
+    b_sizes = np.asarray(b.sum(axis=1)).ravel().astype(np.float64)
+    union = q_sizes[:, None] + b_sizes[None, :] - inter
+
+    dist = np.ones((nq, nb), dtype=np.float64)
+    np.subtract(1.0, inter / np.maximum(union, 1), out=dist, where=union > 0)
+    if keyword_mode == "incident":
+        q_empty, b_empty = q_sizes == 0, b_sizes == 0
+        dist[np.ix_(q_empty, b_empty)] = 0.5
+        dist[np.ix_(q_empty, ~b_empty)] = 1.0
+        dist[np.ix_(~q_empty, b_empty)] = 1.0
+    return dist
+
+
+def exact_text_distance(texts):
+    """SequenceMatcher ratio 기반 텍스트 거리 (기존 Level 3 방식, 모든 쌍 비교)"""
+    n = len(texts)
+    dist = np.zeros((n, n), dtype=np.float32)
+    for i in range(n):
+        for j in range(i + 1, n):
+            dist[i, j] = dist[j, i] = 1.0 - SequenceMatcher(None, texts[i], texts[j]).ratio()
+    return dist
+
+
+def text_distance(texts, eps=0.25, margin=TEXT_RECHECK_MARGIN, exact_recheck=True):
+    """문자 n-gram Dice 계수 기반 텍스트 거리 (Level 3 용, SequenceMatcher 근사)
+
+    - 텍스트마다 문자 1~2-gram 집합을 희소 이진 행렬로 한 번만 만들고,
+      교집합은 행렬곱, 크기는 행 합으로 구해 Dice = 2|A∩B| / (|A|+|B|) 를 모든 쌍에 계산
+      (ratio = 2M/T 와 같은 꼴이라 TF-IDF 코사인보다 SequenceMatcher 와의 오차가 작음)
+    - exact_recheck=True 면 근사 거리가 [eps - margin[0], eps + margin[1]] 안에 든 경계 쌍만
+      SequenceMatcher 로 다시 계산 (범위 밖 쌍은 근사값 사용, 근사 오차가 margin 안이면 eps 판정이 같음)
+    - 입력은 Level 1/2 를 거친 후보 그룹이라 작아서 n x n 행렬을 그대로 만듦 (DBSCAN precomputed 입력)
+    """
+    texts = [str(t) if t else "" for t in texts]
+    n = len(texts)
+    if n == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    try:
+        x = CountVectorizer(analyzer="char_wb", ngram_range=(1, 2), binary=True,
+                            lowercase=False, dtype=np.int32).fit_transform(texts)
+    except ValueError:
+        # 모두 빈 문자열 등 어휘가 없으면 원래 방식
+        return exact_text_distance(texts)
+
+    inter = (x @ x.T).toarray()
+    sizes = np.asarray(x.sum(axis=1)).ravel()
+    total = sizes[:, None] + sizes[None, :]
+    dist = np.ones((n, n), dtype=np.float32)
+    np.divide(2 * inter, total, out=dist, where=total > 0)
+    dist = 1.0 - dist
+    # 빈 문자열끼리는 SequenceMatcher 와 같이 거리 0
+    empty = sizes == 0
+    if empty.any():
+        dist[np.ix_(empty, empty)] = 0.0
+    np.fill_diagonal(dist, 0.0)
+
+    below, above = margin
+    if exact_recheck and (below > 0 or above > 0):
+        rows, cols = np.nonzero(np.triu((dist >= eps - below) & (dist <= eps + above), k=1))
+        for i, j in zip(rows, cols):
+            dist[i, j] = dist[j, i] = 1.0 - SequenceMatcher(None, texts[i], texts[j]).ratio()
+    return dist
+
+
+def use_sparse_graph(n, mode="auto"):
+    """dense / sparse / auto(그룹 크기가 SPARSE_GRAPH_MIN_SIZE 이상이면 sparse)"""
+    if mode == "sparse":
+        return True
+    if mode == "dense":
+        return False
+    return n >= SPARSE_GRAPH_MIN_SIZE
+
+
+def _keyword_distance_pairs(x, sizes, rows, cols, keyword_mode):
+    """후보 쌍 (rows[k], cols[k]) 의 키워드 거리만 계산
+
+    - 'jaccard' : 1 - Jaccard (daily / initial, 자기 자신은 0, 둘 다 비면 1)
+    - 'incident': incident.calculate_jaccard_matrix 규칙 (둘 다 비면 0.5, 한쪽만 비면 1)
+    """
+    inter = np.asarray(x[rows].multiply(x[cols]).sum(axis=1)).ravel().astype(np.float64)
+    union = sizes[rows] + sizes[cols] - inter
+    key_dist = np.ones(len(rows), dtype=np.float64)
+    np.subtract(1.0, inter / np.maximum(union, 1), out=key_dist, where=union > 0)
+    if keyword_mode == "incident":
+        empty_r, empty_c = sizes[rows] == 0, sizes[cols] == 0
+        key_dist[empty_r & empty_c] = 0.5
+        key_dist[empty_r ^ empty_c] = 1.0
+    else:
+        key_dist[rows == cols] = 0.0
+    return key_dist
+
+
+def hybrid_radius_graph(embeddings, keywords_list, eps, emb_weight, keyword_mode="jaccard"):
+    """거리 eps 이하 쌍만 담은 희소 거리 그래프 (DBSCAN(metric='precomputed') 입력용 CSR)
+
+    거리 d = emb_weight * (1 - cos) + (1 - emb_weight) * 키워드 거리 는
+    키워드 거리 >= 0 이므로 d <= eps 이면 반드시 cos >= 1 - eps / emb_weight.
+    정규화 임베딩을 행 블록 단위로 곱해 이 조건을 만족하는 쌍만 후보로 남기고,
+    후보 쌍에 대해서만 키워드 거리를 계산해 최종 d <= eps 인 쌍을 저장한다.
+    메모리는 n^2 이 아니라 이웃 쌍 수에 비례. 거리 0 인 쌍도 명시적으로 저장(이웃으로 인식)한다.
+
+    keyword_mode='incident' 는 cosine_distances 와 같이 자기 자신과의 코사인 거리를 0 으로 본다.
+    """
+    n = len(embeddings)
+    if n == 0:
+        return csr_matrix((0, 0), dtype=np.float64)
+
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    emb = np.divide(emb, norms, out=np.zeros_like(emb), where=norms > 0)
+
+    x = keyword_matrix(keywords_list)
+    sizes = np.asarray(x.sum(axis=1)).ravel().astype(np.float64)
+
+    # 코사인 하한 (float32 오차 여유 1e-6)
+    min_cos = 1.0 - eps / emb_weight - 1e-6
+    block = max(1, min(n, GRAPH_BLOCK_ELEMENTS // n))
+    all_rows, all_cols, all_dist = [], [], []
+
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        # 상삼각(j >= i)만 계산하고 나중에 대칭으로 채움
+        sims = emb[start:stop] @ emb[start:].T
+        if keyword_mode == "incident":
+            np.fill_diagonal(sims, 1.0)
+        r, c = np.nonzero(sims >= min_cos)
+        keep = c >= r
+        r, c = r[keep], c[keep]
+        cos = sims[r, c].astype(np.float64)
+        rows, cols = r + start, c + start
+
+        dist = emb_weight * (1.0 - cos) + (1.0 - emb_weight) * _keyword_distance_pairs(
+            x, sizes, rows, cols, keyword_mode
+        )
+        np.maximum(dist, 0.0, out=dist)
+        # 대각선은 eps 를 넘어도 저장 (DBSCAN 이 빈 대각선을 거리 0 으로 채우지 않도록, dense 와 같은 판정)
+        within = (dist <= eps) | (rows == cols)
+        all_rows.append(rows[within])
+        all_cols.append(cols[within])
+        all_dist.append(dist[within])
+
+    rows = np.concatenate(all_rows)
+    cols = np.concatenate(all_cols)
+    dist = np.concatenate(all_dist)
+    off = rows != cols
+    graph = coo_matrix(
+        (np.concatenate([dist, dist[off]]), (np.concatenate([rows, cols[off]]), np.concatenate([cols, rows[off]]))),
+        shape=(n, n),
+    ).tocsr()
+    return sort_graph_by_row_values(graph, warn_when_not_sorted=False)
+
+
+def radius_neighbors(query_emb, query_kws, base_emb, base_kws, eps, emb_weight):
+    """query 각 점과 base 점 사이에서 하이브리드 거리 eps 이하인 쌍 (증분 군집화용, 'jaccard' 키워드 거리)
+
+    hybrid_radius_graph 와 같은 코사인 하한으로 후보를 먼저 거르고 후보 쌍만 키워드 거리를 계산.
+
+    Returns:
+        (query 행 번호, base 행 번호, 거리) - query 와 base 가 같은 점이어도 그대로 포함
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+    nq, nb = len(query_emb), len(base_emb)
+    if nq == 0 or nb == 0:
+        return empty
+
+    def _normalize(emb):
+        emb = np.asarray(emb, dtype=np.float32)
+        norms = np.linalg.norm(emb, axis=1, keepdims=True)
+        return np.divide(emb, norms, out=np.zeros_like(emb), where=norms > 0)
+
+    q, b = _normalize(query_emb), _normalize(base_emb)
+    # 같은 어휘로 인코딩해야 교집합 계산 가능 → 합쳐서 만든 뒤 분리
+    x = keyword_matrix(list(query_kws) + list(base_kws))
+    sizes = np.asarray(x.sum(axis=1)).ravel().astype(np.float64)
+
+    min_cos = 1.0 - eps / emb_weight - 1e-6
+    block = max(1, min(nq, GRAPH_BLOCK_ELEMENTS // nb))
+    all_rows, all_cols, all_dist = [], [], []
+
+    for start in range(0, nq, block):
+        stop = min(start + block, nq)
+        sims = q[start:stop] @ b.T
+        r, c = np.nonzero(sims >= min_cos)
+        cos = sims[r, c].astype(np.float64)
+        rows = r + start
+        # keyword_matrix 안에서 base 행은 nq 만큼 뒤에 있음 (_keyword_distance_pairs 의 자기 자신 규칙이 섞이지 않게 다른 행 번호)
+        dist = emb_weight * (1.0 - cos) + (1.0 - emb_weight) * _keyword_distance_pairs(
+            x, sizes, rows, c + nq, "jaccard"
+        )
+        np.maximum(dist, 0.0, out=dist)
+        within = dist <= eps
+        all_rows.append(rows[within])
+        all_cols.append(c[within])
+        all_dist.append(dist[within])
+
+    if not all_rows:
+        return empty
+    return np.concatenate(all_rows), np.concatenate(all_cols), np.concatenate(all_dist)
@@ -0,0 +1,99 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+
+# ==========================================
+# 그룹(구 / 구+대상) 단위 병렬 군집화 실행기 (daily / initial 공용)
+# ==========================================
+# - 임베딩 행렬은 공유 메모리에 한 번만 올리고, 워커는 이름으로 붙어서 행 번호만 받아 읽음 (pickle 복사 없음)
+# - 큰 그룹부터 제출해 마지막에 큰 그룹 하나만 남아 코어가 노는 일을 줄임
+# - 워커는 라벨 계산만 하고 결과를 돌려줌, DB 저장은 호출한 프로세스(단일 writer)가 한 번에 수행
+
+# 워커 프로세스 안에서 공유 메모리에 붙은 임베딩 행렬
+_worker_shm = None
+_worker_vectors = None
+_worker_limits = None
+
+
+def default_workers():
+    """--workers 기본값 (코어 수, 최대 8)"""
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def _attach(name, shape, dtype, blas_threads):
+    global _worker_shm, _worker_vectors, _worker_limits
+    # 워커마다 BLAS 스레드를 코어 수 / 워커 수로 제한 (과다 구독 방지)
+    _worker_limits = threadpool_limits(limits=blas_threads)
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    _worker_vectors = np.ndarray(shape, dtype=dtype, buffer=_worker_shm.buf)
+
+
+def _run_in_worker(func, key, rows, args):
+    started = time.perf_counter()
+    result = func(_worker_vectors[rows], *args)
+    return key, result, time.perf_counter() - started
+
+
+def run_groups(vectors, groups, func, workers=1):
+    """그룹별로 func(임베딩 행렬, *args) 를 실행
+
+    Args:
+        vectors: 전체 임베딩 행렬 (float32, n x dim)
+        groups: [(key, rows, args)] - rows 는 vectors 의 행 번호 배열, args 는 func 에 넘길 나머지 인자 튜플
+        func: 모듈 최상위 함수 (워커에서 import 되어야 함)
+        workers: 프로세스 수 (1 이하이거나 그룹이 1개면 현재 프로세스에서 순서대로 실행)
+
+    Returns:
+        {key: result}
+    """
+    # 큰 그룹부터 (Longest Processing Time first)
+    order = sorted(groups, key=lambda g: len(g[1]), reverse=True)
+    results = {}
+    timings = []
+    started = time.perf_counter()
+
+    if workers <= 1 or len(order) <= 1:
+        for key, rows, args in order:
+            t0 = time.perf_counter()
+            results[key] = func(vectors[rows], *args)
+            timings.append((key, len(rows), time.perf_counter() - t0))
+            logging.info(f"  ⏱️ [그룹] {key}: {len(rows)}건 {timings[-1][2]:.2f}초")
+    else:
+        vectors = np.ascontiguousarray(vectors)
+        shm = shared_memory.SharedMemory(create=True, size=max(vectors.nbytes, 1))
+        try:
+            np.ndarray(vectors.shape, dtype=vectors.dtype, buffer=shm.buf)[:] = vectors
+            n_workers = min(workers, len(order))
+            blas_threads = max(1, (os.cpu_count() or 1) // n_workers)
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_attach,
+                initargs=(shm.name, vectors.shape, vectors.dtype, blas_threads),
+            ) as pool:
+                sizes = {}
+                futures = []
+                for key, rows, args in order:
+                    sizes[key] = len(rows)
+                    futures.append(pool.submit(_run_in_worker, func, key, np.asarray(rows), args))
+                for future in as_completed(futures):
+                    key, result, seconds = future.result()
+                    results[key] = result
+                    timings.append((key, sizes[key], seconds))
+                    logging.info(f"  ⏱️ [그룹] {key}: {sizes[key]}건 {seconds:.2f}초")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    wall = time.perf_counter() - started
+    busy = sum(t[2] for t in timings)
+    logging.info(
+        f"  ⏱️ [병렬 군집화] 그룹 {len(timings)}개, 워커 {max(1, min(workers, len(order)))}개, "
+        f"경과 {wall:.2f}초 (그룹 합계 {busy:.2f}초)"
+    )
+    return results
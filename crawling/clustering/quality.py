@@ -0,0 +1,174 @@
+import json
+import logging
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+# ==========================================
+# 군집 품질 지표 (표본 실루엣 + 스트리밍 지표) / clustering_runs 기록
+# ==========================================
+# - 실루엣: 전체 n x n 대신 표본 m개 점에서 전체 점까지의 거리(m x n)만으로 a(i), b(i)를 계산.
+#   점별 값의 평균과 정규근사 95% 신뢰구간을 함께 보고 (표본 수가 고정이므로 비용이 O(m * n))
+# - 스트리밍: 군집이 만들어질 때마다 중심점까지 평균 코사인 거리, 크기, 노이즈 수만 누적 (O(n * dim))
+# - 실행마다 요약을 clustering_runs 테이블에 남김 (db/migrations/010_clustering_runs.sql)
+
+SILHOUETTE_SAMPLE = 1000   # 실행 전체 실루엣 표본 수
+GROUP_SILHOUETTE_SAMPLE = 200  # 그룹(Level 3 후보 등) 하나당 표본 수
+SIZE_BUCKETS = [(1, 1), (2, 4), (5, 9), (10, 29), (30, 99), (100, None)]
+
+
+def silhouette_values(dist_rows, labels, sample_positions):
+    """표본 점들의 실루엣 값 (sklearn.silhouette_samples 와 같은 정의)
+
+    Args:
+        dist_rows: 표본 점 -> 전체 점 거리 (m x n)
+        labels: 전체 점 라벨 (노이즈 -1 은 제외하고 넘길 것)
+        sample_positions: 표본 점의 labels 내 위치 (m)
+
+    군집이 하나뿐이면 빈 배열, 크기 1 군집의 점은 0 (sklearn 규칙)
+    """
+    labels = np.asarray(labels)
+    uniq, inverse = np.unique(labels, return_inverse=True)
+    if len(uniq) < 2 or len(sample_positions) == 0:
+        return np.zeros(0)
+
+    onehot = csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), inverse)), shape=(len(labels), len(uniq)))
+    sums = np.asarray(onehot.T.dot(np.asarray(dist_rows, dtype=np.float64).T).T)  # m x k
+    counts = np.bincount(inverse, minlength=len(uniq)).astype(np.float64)
+
+    own = inverse[sample_positions]
+    rows = np.arange(len(sample_positions))
+    own_count = counts[own]
+    a = np.divide(sums[rows, own], own_count - 1, out=np.zeros(len(rows)), where=own_count > 1)
+
+    mean_other = sums / counts
+    mean_other[rows, own] = np.inf
+    b = mean_other.min(axis=1)
+
+    denom = np.maximum(a, b)
+    s = np.divide(b - a, denom, out=np.zeros(len(rows)), where=denom > 0)
+    s[own_count <= 1] = 0.0
+    return s
+
+
+def _sample(n, size, seed):
+    if n <= size:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=size, replace=False))
+
+
+def precomputed_silhouette(dist, labels, sample_size=GROUP_SILHOUETTE_SAMPLE, seed=0):
+    """미리 계산된 거리 행렬(dense)에서 노이즈를 뺀 표본 실루엣 값"""
+    labels = np.asarray(labels)
+    keep = np.flatnonzero(labels != -1)
+    sample = keep[_sample(len(keep), sample_size, seed)]
+    return silhouette_values(np.asarray(dist)[np.ix_(sample, keep)], labels[keep], np.searchsorted(keep, sample))
+
+
+def cosine_silhouette(vectors, labels, sample_size=SILHOUETTE_SAMPLE, seed=0):
+    """임베딩 코사인 거리 기준 표본 실루엣 값 (거리 행렬은 표본 행만 계산)"""
+    labels = np.asarray(labels)
+    keep = np.flatnonzero(labels != -1)
+    sample = keep[_sample(len(keep), sample_size, seed)]
+    emb = _unit(vectors[keep])
+    dist_rows = 1.0 - _unit(vectors[sample]) @ emb.T
+    return silhouette_values(np.maximum(dist_rows, 0.0), labels[keep], np.searchsorted(keep, sample))
+
+
+def summarize_silhouette(values):
+    """(평균, 95% 신뢰구간 하한, 상한, 표본 수) - 표본이 없으면 None"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None, None, None, 0
+    mean = float(values.mean())
+    half = 1.96 * float(values.std(ddof=1)) / np.sqrt(len(values)) if len(values) > 1 else 0.0
+    return mean, float(mean - half), float(mean + half), len(values)
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class QualityAccumulator:
+    """군집이 만들어질 때마다 누적하는 스트리밍 품질 지표
+
+        acc = QualityAccumulator()
+        acc.add_cluster(member_vectors)   # 군집 하나
+        acc.add_noise(n)                  # 노이즈(단독 민원) 수
+        acc.add_silhouette(values)        # 표본 실루엣 값 (선택)
+        acc.summary()
+    """
+
+    def __init__(self):
+        self.sizes = []
+        self.centroid_dist_sum = 0.0   # 군집 소속 점의 중심점까지 코사인 거리 합
+        self.noise = 0
+        self.silhouette = []
+
+    def add_cluster(self, member_vectors):
+        emb = _unit(member_vectors)
+        centroid = emb.mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        if norm > 0:
+            centroid = centroid / norm
+        self.centroid_dist_sum += float(np.maximum(1.0 - emb @ centroid, 0.0).sum())
+        self.sizes.append(len(emb))
+
+    def add_noise(self, count):
+        self.noise += int(count)
+
+    def add_silhouette(self, values):
+        self.silhouette.extend(np.asarray(values, dtype=np.float64).tolist())
+
+    def summary(self):
+        sizes = np.asarray(self.sizes, dtype=np.int64)
+        clustered = int(sizes.sum())
+        total = clustered + self.noise
+        mean, low, high, n = summarize_silhouette(
+            self.silhouette if len(self.silhouette) <= SILHOUETTE_SAMPLE
+            else np.random.default_rng(0).choice(self.silhouette, size=SILHOUETTE_SAMPLE, replace=False)
+        )
+        buckets = {}
+        for lo, hi in SIZE_BUCKETS:
+            key = f"{lo}+" if hi is None else (str(lo) if lo == hi else f"{lo}-{hi}")
+            mask = sizes >= lo if hi is None else (sizes >= lo) & (sizes <= hi)
+            buckets[key] = int(mask.sum())
+        return {
+            "n_points": total,
+            "n_clusters": len(sizes),
+            "noise_ratio": round(self.noise / total, 4) if total else None,
+            "intra_centroid_distance": round(self.centroid_dist_sum / clustered, 4) if clustered else None,
+            "size_mean": round(float(sizes.mean()), 2) if len(sizes) else None,
+            "size_p50": int(np.percentile(sizes, 50)) if len(sizes) else None,
+            "size_p90": int(np.percentile(sizes, 90)) if len(sizes) else None,
+            "size_max": int(sizes.max()) if len(sizes) else None,
+            "size_buckets": buckets,
+            "silhouette": round(mean, 4) if mean is not None else None,
+            "silhouette_ci": [round(low, 4), round(high, 4)] if mean is not None else None,
+            "silhouette_n": n,
+        }
+
+
+def save_run(conn, job, summary, started_at, params=None):
+    """실행 요약을 clustering_runs 에 기록 (테이블이 없거나 실패해도 군집화 결과에는 영향 없음)"""
+    try:
+        with conn.cursor() as cur:
+            ci = summary.get("silhouette_ci") or [None, None]
+            cur.execute("""
+                INSERT INTO clustering_runs (
+                    job, started_at, finished_at, n_points, n_clusters, noise_ratio,
+                    intra_centroid_distance, silhouette, silhouette_ci_low, silhouette_ci_high, silhouette_n,
+                    metrics, params
+                ) VALUES (%s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
+            """, (
+                job, started_at, summary["n_points"], summary["n_clusters"], summary["noise_ratio"],
+                summary["intra_centroid_distance"], summary["silhouette"], ci[0], ci[1], summary["silhouette_n"],
+                json.dumps(summary, ensure_ascii=False), json.dumps(params or {}, ensure_ascii=False),
+            ))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.warning(f"⚠️ clustering_runs 기록 실패 (010 마이그레이션 확인): {e}")
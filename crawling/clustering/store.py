@@ -0,0 +1,203 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+
+# ==========================================
+# 사건 일괄 저장 (daily / initial / incident 공용)
+# ==========================================
+
+def _group_frame(parts):
+    """(df, is_noise) 목록을 사건 단위 _gid 열이 붙은 하나의 DataFrame으로 합침
+
+    노이즈는 민원 1건 = 사건 1개, 군집은 df 전체 = 사건 1개
+    """
+    frames = []
+    next_gid = 0
+    for df, is_noise in parts:
+        if df is None or df.empty:
+            continue
+        if is_noise:
+            gids = np.arange(next_gid, next_gid + len(df))
+            next_gid += len(df)
+        else:
+            gids = next_gid
+            next_gid += 1
+        frames.append(df.assign(_gid=gids))
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def _top_keywords(all_df, top_k):
+    """사건별 최빈 키워드 top_k (동률이면 먼저 등장한 키워드 우선, Counter.most_common 과 같은 순서)"""
+    kw = all_df[['_gid', 'keywords_jsonb']].copy()
+    kw['keywords_jsonb'] = kw['keywords_jsonb'].map(lambda k: k if isinstance(k, list) and k else [])
+    kw = kw.explode('keywords_jsonb').dropna(subset=['keywords_jsonb'])
+    if kw.empty:
+        return pd.Series(dtype=object)
+    kw['_pos'] = np.arange(len(kw))
+    stats = (kw.groupby(['_gid', 'keywords_jsonb'], sort=False)['_pos']
+               .agg(['size', 'min'])
+               .reset_index()
+               .sort_values(['_gid', 'size', 'min'], ascending=[True, False, True]))
+    return stats.groupby('_gid').head(top_k).groupby('_gid')['keywords_jsonb'].agg(list)
+
+
+def _longest_request(all_df):
+    """사건별 가장 긴 core_request (같은 길이면 먼저 나온 문장)"""
+    req = all_df[['_gid', 'core_request']]
+    req = req[req['core_request'].map(lambda r: isinstance(r, str) and r != '')]
+    if req.empty:
+        return pd.Series(dtype=object)
+    lengths = req['core_request'].str.len()
+    idx = lengths.groupby(req['_gid']).idxmax()
+    return pd.Series(req.loc[idx.values, 'core_request'].values, index=idx.index)
+
+
+def build_incident_rows(parts, title_max_len=100, keyword_count=5,
+                        empty_keywords="", default_district_name="서울시"):
+    """사건별 제목/키워드/구/민원 수를 한 번에 계산
+
+    제목: "{구 이름} {최빈 키워드} 관련 {가장 긴 core_request}" 에서 특수문자 제거 후 title_max_len 자
+    keywords: 최빈 키워드 keyword_count 개를 ", "로 연결 (없으면 empty_keywords)
+
+    Returns:
+        (사건 DataFrame[_gid, title, count, keywords, district_id], 민원 DataFrame[_gid, id]) 또는 (None, None)
+    """
+    all_df = _group_frame(parts)
+    if all_df is None:
+        return None, None
+
+    first = all_df.groupby('_gid', sort=True).head(1).set_index('_gid')
+    incidents = pd.DataFrame(index=first.index)
+    incidents['count'] = all_df.groupby('_gid').size()
+
+    top = _top_keywords(all_df, keyword_count).reindex(incidents.index)
+    top = top.map(lambda k: k if isinstance(k, list) else [])
+    main_keyword = top.map(lambda k: str(k[0]) if k else "민원")
+    incidents['keywords'] = top.map(
+        lambda k: ", ".join(str(x) for x in k[:keyword_count]) if k else empty_keywords
+    )
+
+    summary = _longest_request(all_df).reindex(incidents.index).fillna("내용 없음")
+    dist_name = first['district_name'].map(lambda n: n if isinstance(n, str) and n else default_district_name)
+
+    title = dist_name + " " + main_keyword + " 관련 " + summary
+    title = title.str.replace(r'[^\w\s가-힣]', ' ', regex=True).str.split().str.join(' ')
+    incidents['title'] = title.str[:title_max_len].str.strip()
+
+    district = pd.to_numeric(first['district_id'], errors='coerce')
+    incidents['district_id'] = pd.Series([int(d) if d > 0 else None for d in district],
+                                         index=incidents.index, dtype=object)
+
+    return incidents.reset_index(), all_df[['_gid', 'id']]
+
+
+def link_complaints(cursor, complaint_ids, incident_ids, scores):
+    """민원 -> 사건 연결을 UPDATE 1회로 저장 (scores 는 민원별 배열 또는 공통 값)"""
+    complaint_ids = np.asarray(complaint_ids, dtype=np.int64)
+    if len(complaint_ids) == 0:
+        return
+    scores = np.broadcast_to(np.asarray(scores, dtype=np.float64), complaint_ids.shape)
+    execute_values(cursor, """
+        UPDATE complaints c
+        SET incident_id = v.incident_id, incident_linked_at = NOW(), incident_link_score = v.score
+        FROM (VALUES %s) AS v(complaint_id, incident_id, score)
+        WHERE c.id = v.complaint_id
+    """, list(zip(complaint_ids.tolist(), np.asarray(incident_ids, dtype=np.int64).tolist(), scores.tolist())),
+        template="(%s::bigint, %s::bigint, %s::float8)", page_size=10000)
+
+
+def add_incident_members(cursor, incident_ids, occurred_at=None, reopen=False):
+    """기존 사건에 붙은 민원 수만큼 complaint_count 증가 (사건별로 모아 UPDATE 1회)
+
+    Args:
+        incident_ids: 민원별 배정된 사건 id (같은 사건 반복 가능)
+        occurred_at: 민원별 접수 시각 (주면 last_occurred 를 사건별 최댓값으로 갱신)
+        reopen: True 면 종결된 사건도 대응중(OPEN)으로
+    """
+    if len(incident_ids) == 0:
+        return
+    members = pd.DataFrame({'incident_id': np.asarray(incident_ids, dtype=np.int64)})
+    if occurred_at is not None:
+        members['occurred_at'] = pd.to_datetime(pd.Series(list(occurred_at)))
+    grouped = members.groupby('incident_id')
+    summary = grouped.size().rename('n').to_frame()
+
+    sets = ["complaint_count = i.complaint_count + v.n"]
+    template = "(%s::bigint, %s::int)"
+    columns = "id, n"
+    if occurred_at is not None:
+        summary['last'] = grouped['occurred_at'].max()
+        sets.append("last_occurred = GREATEST(i.last_occurred, v.last)")
+        template = "(%s::bigint, %s::int, %s::timestamptz)"
+        columns += ", last"
+    if reopen:
+        sets.append("status = 'OPEN'")
+
+    rows = [
+        (int(iid), int(r.n)) + ((r.last.to_pydatetime(),) if occurred_at is not None else ())
+        for iid, r in zip(summary.index, summary.itertuples())
+    ]
+    execute_values(cursor, f"""
+        UPDATE incidents i
+        SET {", ".join(sets)}
+        FROM (VALUES %s) AS v({columns})
+        WHERE i.id = v.id
+    """, rows, template=template, page_size=10000)
+
+
+def insert_incidents(cursor, columns, rows, template):
+    """incidents 여러 행을 INSERT 1회로 저장하고 rows 순서대로 사건 id 반환
+
+    INSERT ... RETURNING 의 결과 순서는 보장되지 않으므로, id 를 시퀀스에서 먼저 받아 직접 넣는다.
+
+    Args:
+        columns: id 를 뺀 열 이름 (예: "title, status, complaint_count")
+        rows: 행 튜플 목록
+        template: 행 하나의 VALUES 템플릿 (id 자리는 제외, 예: "(%s, 'OPEN', %s)")
+    """
+    if not rows:
+        return []
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence('incidents', 'id')) FROM generate_series(1, %s)", (len(rows),)
+    )
+    ids = [r[0] for r in cursor.fetchall()]
+    execute_values(cursor, f"INSERT INTO incidents (id, {columns}) VALUES %s",
+                   [(iid,) + tuple(row) for iid, row in zip(ids, rows)],
+                   template="(%s, " + template.strip()[1:], page_size=10000)
+    return ids
+
+
+def save_incidents(cursor, parts, link_score=0.95, **title_options):
+    """여러 사건을 한 번에 저장 (INSERT 1회 + UPDATE 1회)
+
+    Args:
+        parts: (df, is_noise) 목록. df 는 id, core_request, keywords_jsonb, district_id, district_name 열 필요
+        title_options: build_incident_rows 인자 (title_max_len, keyword_count, empty_keywords)
+
+    Returns:
+        DataFrame[incident_id, title, count]: 생성된 사건
+    """
+    incidents, members = build_incident_rows(parts, **title_options)
+    if incidents is None:
+        return pd.DataFrame(columns=['incident_id', 'title', 'count'])
+
+    rows = [
+        (title, int(count), keywords, district_id)
+        for title, count, keywords, district_id in incidents[['title', 'count', 'keywords', 'district_id']]
+        .itertuples(index=False, name=None)
+    ]
+    incidents['incident_id'] = insert_incidents(
+        cursor, "title, status, complaint_count, keywords, district_id, opened_at",
+        rows, "(%s, 'OPEN', %s, %s, %s, NOW())",
+    )
+
+    links = members.merge(incidents[['_gid', 'incident_id']], on='_gid')
+    link_complaints(cursor, links['id'], links['incident_id'], link_score)
+
+    logging.info(f"  💾 [일괄 저장] 사건 {len(incidents)}개 / 민원 {len(links)}건 연결")
+    return incidents[['incident_id', 'title', 'count']]
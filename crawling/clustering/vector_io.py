@@ -0,0 +1,112 @@
+import io
+import logging
+import struct
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================
+# pgvector 임베딩 로더 (binary COPY -> float32 행렬)
+# ==========================================
+# 텍스트 형식('[0.1, 0.2, ...]')을 행마다 json.loads 하는 대신
+# COPY ... (FORMAT binary) 로 받아 pgvector 바이너리 형식(int16 차원, int16 예약, float4 x 차원, big-endian)을
+# 바로 float32 행렬에 채운다. 파이썬 객체(list of float)를 만들지 않음.
+
+EMBEDDING_DIM = 1024
+
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_BIGINT = struct.Struct(">q")
+_INT32 = struct.Struct(">i")
+_INT16 = struct.Struct(">h")
+_UINT16 = struct.Struct(">H")
+
+
+def copy_vectors(conn, query, params=None, dim=None):
+    """(bigint 키, vector) 두 열을 돌려주는 SELECT 를 binary COPY 로 읽음
+
+    Args:
+        query: "SELECT <bigint 키>, <vector 열> FROM ..." (키는 ::bigint 로 캐스팅할 것)
+        params: query 파라미터 (mogrify 로 바인딩)
+        dim: 기대 차원 (None 이면 첫 번째 NULL 이 아닌 값의 차원)
+
+    Returns:
+        (keys int64[n], matrix float32[n, dim], valid bool[n])
+        NULL 이거나 차원이 다른 행은 0 벡터 + valid=False
+    """
+    with conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode() if params is not None else query
+        out = io.BytesIO()
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", out)
+    data = out.getvalue()
+
+    if data[:11] != _COPY_SIGNATURE:
+        raise ValueError("binary COPY 헤더가 올바르지 않습니다.")
+    pos = 15
+    (ext_len,) = _INT32.unpack_from(data, pos)
+    pos += 4 + ext_len
+
+    keys, offsets, dims = [], [], []
+    while True:
+        (n_fields,) = _INT16.unpack_from(data, pos)
+        pos += 2
+        if n_fields == -1:
+            break
+        if n_fields != 2:
+            raise ValueError(f"키와 벡터 두 열만 조회해야 합니다. (열 {n_fields}개)")
+
+        (key_len,) = _INT32.unpack_from(data, pos)
+        pos += 4
+        if key_len != 8:
+            raise ValueError("키 열은 bigint 여야 합니다. (::bigint 캐스팅)")
+        keys.append(_BIGINT.unpack_from(data, pos)[0])
+        pos += key_len
+
+        (vec_len,) = _INT32.unpack_from(data, pos)
+        pos += 4
+        if vec_len == -1:
+            offsets.append(-1)
+            dims.append(-1)
+            continue
+        dims.append(_UINT16.unpack_from(data, pos)[0])
+        offsets.append(pos + 4)
+        pos += vec_len
+
+    dims = np.array(dims, dtype=np.int64)
+    if dim is None:
+        present = dims[dims >= 0]
+        dim = int(present[0]) if len(present) else EMBEDDING_DIM
+
+    matrix = np.zeros((len(keys), dim), dtype=np.float32)
+    valid = dims == dim
+    for i in np.flatnonzero(valid):
+        matrix[i] = np.frombuffer(data, dtype=">f4", count=dim, offset=offsets[i])
+    return np.array(keys, dtype=np.int64), matrix, valid
+
+
+def load_normalization_vectors(conn, normalization_ids, dim=EMBEDDING_DIM):
+    """complaint_normalizations.id 순서 그대로 임베딩 행렬 반환
+
+    Returns:
+        (matrix float32[n, dim], valid bool[n]) - 임베딩이 없거나 차원이 다른 행은 0 벡터 + valid=False
+    """
+    ids = np.asarray(normalization_ids, dtype=np.int64)
+    matrix = np.zeros((len(ids), dim), dtype=np.float32)
+    valid = np.zeros(len(ids), dtype=bool)
+    if len(ids) == 0:
+        return matrix, valid
+
+    keys, found, found_valid = copy_vectors(
+        conn,
+        "SELECT id::bigint, embedding FROM complaint_normalizations WHERE id = ANY(%s)",
+        (ids.tolist(),),
+        dim=dim,
+    )
+    pos = pd.Index(keys).get_indexer(ids)
+    hit = pos >= 0
+    matrix[hit] = found[pos[hit]]
+    valid[hit] = found_valid[pos[hit]]
+
+    if not valid.all():
+        logging.warning(f"⚠️ 임베딩 없음/차원 불일치 {int((~valid).sum())}건 (0 벡터로 처리)")
+    return matrix, valid
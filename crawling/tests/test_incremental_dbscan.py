@@ -0,0 +1,78 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clustering.incremental_dbscan import IncrementalDBSCAN  # noqa: E402
+
+
+def _unit(*components):
+    vec = np.zeros(8, dtype=np.float32)
+    for axis, value in components:
+        vec[axis] = value
+    return vec / np.linalg.norm(vec)
+
+
+def test_attach_follows_cross_district_merge():
+    """구 2에서 흡수된 사건 X 에 구 1 신규 민원이 붙으면 남는 사건 Y 로 연결되어야 함"""
+    # 사건 X(3건)는 구 1, 2 에 걸쳐 있고 사건 Y(5건)는 구 2 에만 있음
+    old = pd.DataFrame({
+        "id": [1, 2, 3],
+        "norm_id": [11, 12, 13],
+        "district_id": [1, 2, 2],
+        "incident_id": [100, 100, 200],
+        "keywords_jsonb": [["도로"], ["소음"], ["소음"]],
+        "neighbor_count": [2, 2, 2],
+        "is_core": [True, True, True],
+        "complaint_count": [3, 3, 5],
+    })
+    old_vectors = np.stack([_unit((0, 1.0)), _unit((1, 1.0)), _unit((1, 1.0), (2, 0.3))])
+    # 구 1 신규 민원은 X 의 구 1 점 옆, 구 2 신규 민원은 X 와 Y 의 구 2 점 사이 (X, Y 를 잇는 core)
+    new = pd.DataFrame({
+        "id": [10, 20],
+        "keywords_jsonb": [["도로"], ["소음"]],
+        "district_id": [1, 2],
+        "_row": [0, 1],
+    })
+    vectors = np.stack([_unit((0, 1.0), (3, 0.05)), _unit((1, 1.0), (2, 0.15))])
+
+    engine = IncrementalDBSCAN(eps=0.15, min_samples=2, emb_weight=0.6)
+    points, attach, absorb, to_create = engine._plan(old, old_vectors, new, vectors)
+
+    assert absorb == {100: 200}
+    assert sorted((cid, iid) for cid, iid, _ in attach) == [(10, 200), (20, 200)]
+    assert to_create == []
+
+
+def test_absorb_targets_one_survivor_across_districts():
+    """구마다 다른 사건으로 흡수되어도(X→Y, X→Z) 컴포넌트 전체가 사건 하나로 합쳐져야 함"""
+    old = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "norm_id": [11, 12, 13, 14],
+        "district_id": [1, 1, 2, 2],
+        "incident_id": [100, 200, 100, 300],
+        "keywords_jsonb": [["도로"], ["도로"], ["소음"], ["소음"]],
+        "neighbor_count": [2, 2, 2, 2],
+        "is_core": [True, True, True, True],
+        "complaint_count": [2, 4, 2, 6],
+    })
+    old_vectors = np.stack([
+        _unit((0, 1.0)), _unit((0, 1.0), (2, 0.3)),
+        _unit((1, 1.0)), _unit((1, 1.0), (3, 0.3)),
+    ])
+    new = pd.DataFrame({
+        "id": [10, 20],
+        "keywords_jsonb": [["도로"], ["소음"]],
+        "district_id": [1, 2],
+        "_row": [0, 1],
+    })
+    vectors = np.stack([_unit((0, 1.0), (2, 0.15)), _unit((1, 1.0), (3, 0.15))])
+
+    engine = IncrementalDBSCAN(eps=0.15, min_samples=2, emb_weight=0.6)
+    _, attach, absorb, _ = engine._plan(old, old_vectors, new, vectors)
+
+    assert absorb == {100: 300, 200: 300}
+    assert {iid for _, iid, _ in attach} == {300}
@@ -0,0 +1,42 @@
+-- 법령 코퍼스 테이블 (ai-server/data_preprocess/law_ingest.py 가 채움)
+-- 적용: psql -U postgres -d postgres -f db/migrations/000_law_corpus.sql
+-- 001(압축 인덱스) / 002(embedding_short) 가 law_chunks 에 인덱스와 컬럼을 추가하므로 그보다 먼저 적용한다.
+--
+-- 기존에 수동으로 만든 law_documents / law_chunks 가 있으면 빠진 컬럼만 추가한다.
+-- content_hash: 조문 번호 + 청크 본문의 SHA-256. 값이 같으면 재수집 시 임베딩을 건너뜀
+-- chunk_index : 긴 조문을 토큰 한도로 나눈 순번 (조문 하나 = 0번 청크 하나가 기본)
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS law_documents (
+    id BIGSERIAL PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    source_path TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS law_chunks (
+    id BIGSERIAL PRIMARY KEY,
+    document_id BIGINT NOT NULL REFERENCES law_documents(id) ON DELETE CASCADE,
+    article_no VARCHAR(50) NOT NULL,
+    chunk_index INT NOT NULL DEFAULT 0,
+    chunk_text TEXT NOT NULL,
+    content_hash CHAR(64),
+    token_count INT,
+    embedding vector(1024),
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+ALTER TABLE law_documents ADD COLUMN IF NOT EXISTS source_path TEXT;
+ALTER TABLE law_documents ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+ALTER TABLE law_chunks ADD COLUMN IF NOT EXISTS chunk_index INT NOT NULL DEFAULT 0;
+ALTER TABLE law_chunks ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+ALTER TABLE law_chunks ADD COLUMN IF NOT EXISTS token_count INT;
+ALTER TABLE law_chunks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+
+-- 문서는 제목으로 찾고, 청크는 (문서, 조문, 순번) 단위로 upsert
+CREATE INDEX IF NOT EXISTS idx_law_documents_title ON law_documents (title);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_law_chunks_article
+    ON law_chunks (document_id, article_no, chunk_index);
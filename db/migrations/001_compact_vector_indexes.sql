@@ -0,0 +1,33 @@
+-- 압축 벡터 인덱스 (ai-server database.py 의 halfvec / binary 검색 모드용)
+-- 적용: psql -U postgres -d postgres -f db/migrations/001_compact_vector_indexes.sql
+-- 선행: 000_law_corpus.sql (law_chunks 테이블)
+-- 요구사항: pgvector 0.7 이상 (halfvec, binary_quantize)
+--
+-- 원본 embedding(vector(1024), 4KB/행)은 그대로 두고, 압축 표현은 표현식 인덱스로만 유지한다.
+-- INSERT/UPDATE 시 Postgres가 자동으로 갱신하므로 Java/Python 저장 로직은 변경 불필요.
+--   - halfvec(1024)    : 2KB/행, 코사인 거리 거의 동일
+--   - bit(1024) 부호 비트 : 128B/행, Hamming 거리로 후보만 추린 뒤 원본 벡터로 재정렬
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- 유사 민원 (complaint_normalizations)
+CREATE INDEX IF NOT EXISTS idx_cn_embedding_halfvec
+    ON complaint_normalizations
+    USING hnsw ((embedding::halfvec(1024)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_cn_embedding_binary
+    ON complaint_normalizations
+    USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops);
+
+-- 법령 (law_chunks)
+CREATE INDEX IF NOT EXISTS idx_law_chunks_embedding_halfvec
+    ON law_chunks
+    USING hnsw ((embedding::halfvec(1024)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_law_chunks_embedding_binary
+    ON law_chunks
+    USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops);
+
+-- 인덱스 크기 확인:
+-- SELECT indexrelname, pg_size_pretty(pg_relation_size(indexrelid))
+-- FROM pg_stat_user_indexes WHERE indexrelname LIKE '%embedding%';
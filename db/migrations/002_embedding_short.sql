@@ -0,0 +1,81 @@
+-- Matryoshka 축약 벡터 (ai-server database.py 의 short 검색 모드용)
+-- 적용: psql -U postgres -d postgres -f db/migrations/002_embedding_short.sql  (backfill이 배치마다 COMMIT 하므로 -1 옵션 없이 실행)
+-- 선행: 000_law_corpus.sql (law_chunks 테이블)
+-- 요구사항: pgvector 0.7 이상 (subvector, l2_normalize)
+--
+-- text-embedding-3-large 벡터는 앞부분 차원만 잘라도 품질이 대부분 유지되므로
+-- 앞 256차원을 재정규화한 embedding_short 컬럼으로 1단계 후보를 찾고 1024차원 원본으로 재정렬한다.
+-- (1단계 인덱스 크기 1/4)
+--
+-- 컬럼은 트리거로 embedding 과 함께 채워지므로 Java/Python INSERT 문은 변경 불필요.
+-- 기존 행은 아래 backfill_embedding_short 프로시저로 배치 단위(커밋 분할)로 채운다.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE complaint_normalizations ADD COLUMN IF NOT EXISTS embedding_short vector(256);
+ALTER TABLE law_chunks ADD COLUMN IF NOT EXISTS embedding_short vector(256);
+
+CREATE OR REPLACE FUNCTION fill_embedding_short() RETURNS trigger AS $$
+BEGIN
+    IF NEW.embedding IS NULL THEN
+        NEW.embedding_short := NULL;
+    ELSE
+        NEW.embedding_short := l2_normalize(subvector(NEW.embedding, 1, 256))::vector(256);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cn_embedding_short ON complaint_normalizations;
+CREATE TRIGGER trg_cn_embedding_short
+    BEFORE INSERT OR UPDATE OF embedding ON complaint_normalizations
+    FOR EACH ROW EXECUTE FUNCTION fill_embedding_short();
+
+DROP TRIGGER IF EXISTS trg_law_chunks_embedding_short ON law_chunks;
+CREATE TRIGGER trg_law_chunks_embedding_short
+    BEFORE INSERT OR UPDATE OF embedding ON law_chunks
+    FOR EACH ROW EXECUTE FUNCTION fill_embedding_short();
+
+-- 기존 행 backfill (배치마다 커밋하여 긴 잠금 방지)
+CREATE OR REPLACE PROCEDURE backfill_embedding_short(batch_size int DEFAULT 5000)
+LANGUAGE plpgsql AS $$
+DECLARE
+    updated int;
+BEGIN
+    LOOP
+        UPDATE complaint_normalizations
+        SET embedding_short = l2_normalize(subvector(embedding, 1, 256))::vector(256)
+        WHERE id IN (
+            SELECT id FROM complaint_normalizations
+            WHERE embedding IS NOT NULL AND embedding_short IS NULL
+            LIMIT batch_size
+        );
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        COMMIT;
+        EXIT WHEN updated = 0;
+    END LOOP;
+
+    LOOP
+        UPDATE law_chunks
+        SET embedding_short = l2_normalize(subvector(embedding, 1, 256))::vector(256)
+        WHERE id IN (
+            SELECT id FROM law_chunks
+            WHERE embedding IS NOT NULL AND embedding_short IS NULL
+            LIMIT batch_size
+        );
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        COMMIT;
+        EXIT WHEN updated = 0;
+    END LOOP;
+END;
+$$;
+
+CALL backfill_embedding_short();
+
+CREATE INDEX IF NOT EXISTS idx_cn_embedding_short
+    ON complaint_normalizations
+    USING hnsw (embedding_short vector_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_law_chunks_embedding_short
+    ON law_chunks
+    USING hnsw (embedding_short vector_cosine_ops);
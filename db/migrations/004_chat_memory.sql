@@ -0,0 +1,15 @@
+-- ai-chat 대화 메모리 (ai-server app/services/conversation_memory.py)
+-- 적용: psql -U postgres -d postgres -f db/migrations/004_chat_memory.sql
+--
+-- 민원별 누적 요약 1행. summarized_until_log_id 까지의 complaint_chat_logs 가 summary 에 반영되어 있고,
+-- 그 이후 로그만 다음 요약 때 읽으므로 대화가 길어져도 매 턴 전체 기록을 다시 읽지 않는다.
+
+CREATE TABLE IF NOT EXISTS complaint_chat_memory (
+    complaint_id BIGINT PRIMARY KEY REFERENCES complaints(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_until_log_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- 최근 N턴 / 요약 이후 로그 조회용
+CREATE INDEX IF NOT EXISTS idx_chat_logs_complaint_id_id ON complaint_chat_logs (complaint_id, id);
@@ -0,0 +1,9 @@
+-- Daily_cluster 사건 인덱스 변경분 조회용 (crawling/Daily_cluster.py IncidentIndex)
+-- 적용: psql -U postgres -d postgres -f db/migrations/005_incident_link_index.sql
+--
+-- 매 주기 "워터마크 이후 연결된 민원의 사건"만 조회하므로 incident_linked_at 인덱스가 있으면
+-- 변경이 없는 주기는 인덱스 범위 스캔 한 번으로 끝난다.
+
+CREATE INDEX IF NOT EXISTS idx_complaints_incident_linked_at
+    ON complaints (incident_linked_at)
+    WHERE incident_id IS NOT NULL;
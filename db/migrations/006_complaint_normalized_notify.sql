@@ -0,0 +1,18 @@
+-- 정규화 완료 알림 (crawling/Daily_cluster.py listen 모드)
+-- 적용: psql -U postgres -d postgres -f db/migrations/006_complaint_normalized_notify.sql
+--
+-- complaint_normalizations INSERT 가 커밋되면 'complaint_normalized' 채널로 complaint_id 를 보낸다.
+-- 데몬은 LISTEN 으로 받아 짧게 모은 뒤(debounce) 해당 민원들만 군집화한다.
+-- 알림은 커밋 시점에만 전달되고, 롤백된 INSERT 는 알림이 가지 않는다.
+
+CREATE OR REPLACE FUNCTION notify_complaint_normalized() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('complaint_normalized', NEW.complaint_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_complaint_normalized_notify ON complaint_normalizations;
+CREATE TRIGGER trg_complaint_normalized_notify
+    AFTER INSERT ON complaint_normalizations
+    FOR EACH ROW EXECUTE FUNCTION notify_complaint_normalized();
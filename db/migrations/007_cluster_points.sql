@@ -0,0 +1,18 @@
+-- 증분 DBSCAN 점 상태 (crawling/incremental_dbscan.py, Daily_cluster.py --engine incremental)
+-- 적용: psql -U postgres -d postgres -f db/migrations/007_cluster_points.sql
+-- 적용 후 1회: python Daily_cluster.py --rebuild-state  (기존 사건 민원의 이웃 수/core 여부 계산)
+--
+-- 군집 소속은 complaints.incident_id 가 기준이고, 이 테이블은 DBSCAN 밀도 정보만 보관한다.
+--   neighbor_count : 하이브리드 거리 eps 이내 이웃 수 (자기 자신 포함)
+--   is_core        : neighbor_count >= min_samples
+
+CREATE TABLE IF NOT EXISTS cluster_points (
+    complaint_id   bigint PRIMARY KEY REFERENCES complaints(id) ON DELETE CASCADE,
+    district_id    bigint NOT NULL,          -- 구 미상은 0 (Daily_cluster 와 동일)
+    neighbor_count integer NOT NULL,
+    is_core        boolean NOT NULL,
+    updated_at     timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_cluster_points_district
+    ON cluster_points (district_id);
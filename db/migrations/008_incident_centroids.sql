@@ -0,0 +1,21 @@
+-- 사건 중심점 저장소 (crawling/incident_cluster.py)
+-- 적용: psql -U postgres -d postgres -f db/migrations/008_incident_centroids.sql
+--
+-- incident_cluster 는 민원을 사건에 배정할 때마다 같은 트랜잭션에서 이 테이블을 갱신하고,
+-- 시작 시 활성 사건 중심점을 한 번에 읽는다. (소속 민원 전체를 다시 읽어 평균을 내지 않음)
+-- 행이 없는 활성 사건은 첫 실행 때 소속 민원(종결 제외) 평균으로 채운다.
+--   centroid     : 평균 임베딩 (anchored 이후에는 고정)
+--   keywords     : 소속 민원 키워드 합집합 (jsonb 배열)
+--   member_count : 배정된 민원 수
+--   anchored     : member_count 가 ANCHOR_LIMIT(10)에 도달해 중심점이 고정되었는지
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS incident_centroids (
+    incident_id  bigint PRIMARY KEY REFERENCES incidents(id) ON DELETE CASCADE,
+    centroid     vector(1024) NOT NULL,
+    keywords     jsonb NOT NULL DEFAULT '[]'::jsonb,
+    member_count integer NOT NULL,
+    anchored     boolean NOT NULL DEFAULT false,
+    updated_at   timestamptz NOT NULL DEFAULT NOW()
+);
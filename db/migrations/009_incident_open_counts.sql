@@ -0,0 +1,86 @@
+-- 사건별 미종결 민원 수 증분 관리 (crawling/Daily_cluster.py sync_incident_status)
+-- 적용: psql -U postgres -d postgres -1 -f db/migrations/009_incident_open_counts.sql  (트리거 생성과 초기 집계를 한 트랜잭션으로)
+--
+-- 민원 INSERT / DELETE / status·incident_id 변경 시 트리거가 소속 사건의 카운터를 +-1 하고,
+-- 미종결 수가 0 을 넘나든 사건만 incident_status_queue 에 넣는다.
+-- 데몬은 매 주기 큐에 쌓인 사건만 OPEN/CLOSED 로 전환하므로 비용이 변경된 민원 수에만 비례한다.
+-- 카운터가 어긋나는 경우(트리거 밖에서 직접 수정 등)는 주기적 재집계(reconcile)가 바로잡는다.
+--   total_count : 소속 민원 수
+--   open_count  : 소속 민원 중 status 가 CLOSED / CANCELED 가 아닌 수 (NULL 은 미종결로 보지 않음, 기존 동기화 쿼리와 동일)
+
+CREATE TABLE IF NOT EXISTS incident_complaint_counts (
+    incident_id bigint PRIMARY KEY REFERENCES incidents(id) ON DELETE CASCADE,
+    total_count integer NOT NULL DEFAULT 0,
+    open_count  integer NOT NULL DEFAULT 0,
+    updated_at  timestamptz NOT NULL DEFAULT NOW()
+);
+
+-- 상태 전환을 검사할 사건 (중복 없이 한 번만)
+CREATE TABLE IF NOT EXISTS incident_status_queue (
+    incident_id bigint PRIMARY KEY REFERENCES incidents(id) ON DELETE CASCADE,
+    queued_at   timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_incident_counts(p_incident bigint, p_total integer, p_open integer) RETURNS void AS $$
+DECLARE
+    new_open integer;
+BEGIN
+    INSERT INTO incident_complaint_counts AS k (incident_id, total_count, open_count)
+    VALUES (p_incident, GREATEST(p_total, 0), GREATEST(p_open, 0))
+    ON CONFLICT (incident_id) DO UPDATE
+        SET total_count = k.total_count + p_total,
+            open_count  = k.open_count + p_open,
+            updated_at  = NOW()
+    RETURNING open_count INTO new_open;
+
+    -- 0 이 되었거나(CLOSED 후보) 0 에서 올라온 경우(OPEN 후보)만 큐에 넣음
+    IF new_open = 0 OR new_open = p_open THEN
+        INSERT INTO incident_status_queue (incident_id) VALUES (p_incident)
+        ON CONFLICT (incident_id) DO NOTHING;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION track_incident_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.incident_id IS NOT NULL THEN
+        PERFORM bump_incident_counts(
+            OLD.incident_id, -1,
+            CASE WHEN COALESCE(OLD.status NOT IN ('CLOSED', 'CANCELED'), false) THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.incident_id IS NOT NULL THEN
+        PERFORM bump_incident_counts(
+            NEW.incident_id, 1,
+            CASE WHEN COALESCE(NEW.status NOT IN ('CLOSED', 'CANCELED'), false) THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_incident_counts_insert_delete ON complaints;
+CREATE TRIGGER trg_incident_counts_insert_delete
+    AFTER INSERT OR DELETE ON complaints
+    FOR EACH ROW EXECUTE FUNCTION track_incident_counts();
+
+-- 상태나 소속 사건이 실제로 바뀐 UPDATE 만
+DROP TRIGGER IF EXISTS trg_incident_counts_update ON complaints;
+CREATE TRIGGER trg_incident_counts_update
+    AFTER UPDATE OF status, incident_id ON complaints
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.incident_id IS DISTINCT FROM NEW.incident_id)
+    EXECUTE FUNCTION track_incident_counts();
+
+-- 초기 집계 (기존 민원 기준)
+INSERT INTO incident_complaint_counts (incident_id, total_count, open_count)
+SELECT c.incident_id,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE c.status NOT IN ('CLOSED', 'CANCELED'))
+FROM complaints c
+JOIN incidents i ON i.id = c.incident_id
+GROUP BY c.incident_id
+ON CONFLICT (incident_id) DO UPDATE
+    SET total_count = EXCLUDED.total_count,
+        open_count  = EXCLUDED.open_count,
+        updated_at  = NOW();
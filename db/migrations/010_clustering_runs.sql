@@ -0,0 +1,27 @@
+-- 군집화 실행별 품질 기록 (crawling/clustering/quality.py save_run)
+-- 적용: psql -U postgres -d postgres -f db/migrations/010_clustering_runs.sql
+--
+-- initial / daily / incident 실행이 끝날 때마다 한 행. 실루엣은 표본 점 기준(전체 n x n 계산 없음)이라
+-- 평균과 95% 신뢰구간, 표본 수를 함께 남긴다. 나머지 지표(크기 분포 등)는 metrics 에 그대로 보관.
+--   intra_centroid_distance : 군집 소속 민원의 중심점까지 평균 코사인 거리
+--   params                  : 실행 파라미터 (eps, 워커 수 등)
+
+CREATE TABLE IF NOT EXISTS clustering_runs (
+    id                      bigserial PRIMARY KEY,
+    job                     text NOT NULL,             -- initial / daily / incident
+    started_at              timestamptz NOT NULL,
+    finished_at             timestamptz NOT NULL DEFAULT NOW(),
+    n_points                integer NOT NULL,
+    n_clusters              integer NOT NULL,
+    noise_ratio             real,
+    intra_centroid_distance real,
+    silhouette              real,
+    silhouette_ci_low       real,
+    silhouette_ci_high      real,
+    silhouette_n            integer NOT NULL DEFAULT 0,
+    metrics                 jsonb NOT NULL DEFAULT '{}'::jsonb,
+    params                  jsonb NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS idx_clustering_runs_job_started
+    ON clustering_runs (job, started_at DESC);